@@ -1,7 +1,16 @@
-from datetime import datetime
+import csv
+import json
+import random
+import sqlite3
+import time
+import fechas
 import hotel_db
 import re
 
+import migraciones
+from catalogo_habitaciones import CatalogoHabitaciones
+from disponibilidad import IndiceDisponibilidad, IntervalosHabitacion
+
 # =========================
 # Constantes de validación
 # =========================
@@ -12,6 +21,11 @@ MAX_APELLIDO = 25       # límite 25 caracteres
 MAX_DPI = 13            # máximo 13 dígitos
 MAX_NIT = 11            # máximo 11 dígitos (sin verificador K)
 
+ESTADO_RESERVA_NUEVA = "Confirmada"  # estado con el que se crean las reservas
+TAMANO_LOTE = 500                    # filas por transacción en crear_reservas_lote
+MAX_REINTENTOS_BLOQUEO = 5           # reintentos de crear_reserva y de cada bloque del lote ante SQLITE_BUSY
+ESPERA_BASE_REINTENTO = 0.05         # segundos; se duplica en cada reintento
+
 # =========================
 # Validadores adicionales
 # =========================
@@ -65,20 +79,69 @@ def validar_dpi_nit(datos: dict):
 # =========================
 def calcular_noches(fecha_ingreso, fecha_salida):
     try:
-        f1 = datetime.strptime(fecha_ingreso, "%Y-%m-%d")
-        f2 = datetime.strptime(fecha_salida, "%Y-%m-%d")
-        if f2 <= f1:
-            return None
-        return (f2 - f1).days
+        noches = fechas.a_dia(fecha_salida) - fechas.a_dia(fecha_ingreso)
     except ValueError:
         return None
+    return noches if noches > 0 else None
 
 def obtener_tipos_habitacion():
-    habitaciones = hotel_db.get_all_habitaciones()
-    return list({h[2] for h in habitaciones})  # índice 2 = tipo
+    """Tipos de habitación ordenados (desde el catálogo en memoria)."""
+    return obtener_catalogo_habitaciones().tipos()
 
 def obtener_precio_por_tipo(tipo):
-    return hotel_db.get_precio_por_tipo(tipo)
+    """Precio por noche más bajo del tipo (desde el catálogo en memoria), o None."""
+    return obtener_catalogo_habitaciones().precio_por_tipo(tipo)
+
+def obtener_rango_precios(tipo):
+    """(mínimo, máximo) del precio por noche del tipo, o None si no existe."""
+    return obtener_catalogo_habitaciones().rango_precios(tipo)
+
+def buscar_habitaciones_disponibles(tipo, fecha_ingreso, fecha_salida):
+    """
+    Retorna las habitaciones libres del tipo dado en [fecha_ingreso, fecha_salida)
+    como lista de dicts {id_habitacion, numero_habitacion, precio_por_noche}.
+    Retorna lista vacía si las fechas son inválidas.
+    """
+    if calcular_noches(fecha_ingreso, fecha_salida) is None:
+        return []
+    conn = hotel_db.get_connection()
+    filas = hotel_db.buscar_habitaciones_disponibles(conn, tipo or None, fecha_ingreso, fecha_salida)
+    return [
+        {"id_habitacion": f[0], "numero_habitacion": f[1], "precio_por_noche": float(f[2])}
+        for f in filas
+    ]
+
+# =========================
+# Catálogo de habitaciones
+# =========================
+_catalogos_habitaciones = {}  # DB_PATH -> CatalogoHabitaciones
+
+def obtener_catalogo_habitaciones() -> CatalogoHabitaciones:
+    """
+    Retorna el catálogo de habitaciones (uno por archivo de BD y proceso).
+    Se carga perezosamente y se recarga solo cuando la tabla cambia.
+    """
+    catalogo = _catalogos_habitaciones.get(hotel_db.DB_PATH)
+    if catalogo is None:
+        catalogo = CatalogoHabitaciones(hotel_db.DB_PATH)
+        _catalogos_habitaciones[hotel_db.DB_PATH] = catalogo
+    return catalogo
+
+# =========================
+# Índice de disponibilidad
+# =========================
+_indices_disponibilidad = {}  # DB_PATH -> IndiceDisponibilidad
+
+def obtener_indice_disponibilidad() -> IndiceDisponibilidad:
+    """
+    Retorna el índice de disponibilidad (uno por archivo de BD y proceso).
+    Se carga perezosamente en la primera consulta.
+    """
+    indice = _indices_disponibilidad.get(hotel_db.DB_PATH)
+    if indice is None:
+        indice = IndiceDisponibilidad(hotel_db.DB_PATH)
+        _indices_disponibilidad[hotel_db.DB_PATH] = indice
+    return indice
 
 # Hotel.py
 # Hotel.py
@@ -92,6 +155,9 @@ def crear_reserva(datos):
         - primer_nombre, primer_apellido: str
         - segundo_nombre, segundo_apellido: str (opcionales)
         - nit: str (opcional)
+    La verificación de disponibilidad y las inserciones (huésped y reserva) se
+    ejecutan como una sola unidad BEGIN IMMEDIATE: dos terminales no pueden
+    reservar la misma habitación y un fallo no deja huéspedes huérfanos.
     """
     # 1) Validación de fechas y cálculo de noches
     noches = calcular_noches(datos["fecha_ingreso"], datos["fecha_salida"])
@@ -104,10 +170,45 @@ def crear_reserva(datos):
         return False, "Número de habitación invalido"
     validar_numero_habitacion(numero_habitacion)
 
-    with hotel_db.get_connection() as conn:
-        # 3) Obtener habitación por número (id, tipo, precio, estado)
+    # 3) Validaciones de identidad (nombres y DPI/NIT)
+    try:
+        validar_nombres_apellidos(datos)  # requiere: primer_/segundo_ nombre/apellido
+        validar_dpi_nit(datos)            # requiere: dpi, nit
+    except ValueError as ve:
+        return False, str(ve)
+
+    # 4) Unidad de trabajo con reintentos acotados si la BD sigue bloqueada
+    conn = hotel_db.get_connection()
+    for intento in range(MAX_REINTENTOS_BLOQUEO):
+        try:
+            return _crear_reserva_atomica(conn, datos, numero_habitacion, noches)
+        except sqlite3.IntegrityError as e:
+            return False, _mensaje_integridad(e)
+        except sqlite3.OperationalError as e:
+            if not _es_bloqueo(e):
+                raise
+            if intento == MAX_REINTENTOS_BLOQUEO - 1:
+                return False, "La base de datos está ocupada. Intente de nuevo."
+            time.sleep(ESPERA_BASE_REINTENTO * (2 ** intento) * (1 + random.random()))
+
+def _mensaje_integridad(error: sqlite3.IntegrityError) -> str:
+    # La PK de room_night rechaza noches ya ocupadas aunque el índice no lo supiera
+    if "room_night" in str(error):
+        return "Habitación no disponible"
+    return "Reserva duplicada"
+
+def _es_bloqueo(error: sqlite3.OperationalError) -> bool:
+    mensaje = str(error).lower()
+    return "locked" in mensaje or "busy" in mensaje
+
+def _crear_reserva_atomica(conn, datos, numero_habitacion, noches):
+    indice = obtener_indice_disponibilidad()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Obtener habitación por número (id, tipo, precio, estado)
         hab = hotel_db.get_habitacion_por_numero(conn, numero_habitacion)
         if not hab:
+            conn.rollback()
             return False, "Número de habitación invalido"
 
         # Orden esperado: (id_habitacion, numero_habitacion, tipo, precio_por_noche, estado)
@@ -115,14 +216,13 @@ def crear_reserva(datos):
         numero_habitacion = hab[1]
         precio_por_noche = float(hab[3])
 
-        # 4) Validaciones de identidad (nombres y DPI/NIT)
-        try:
-            validar_nombres_apellidos(datos)  # requiere: primer_/segundo_ nombre/apellido
-            validar_dpi_nit(datos)            # requiere: dpi, nit
-        except ValueError as ve:
-            return False, str(ve)
+        # Disponibilidad con el lock de escritura tomado: ningún otro commit puede
+        # colarse entre esta verificación y la inserción.
+        if not indice.disponible(id_habitacion, datos["fecha_ingreso"], datos["fecha_salida"]):
+            conn.rollback()
+            return False, "Habitación no disponible"
 
-        # 5) Resolver id_huesped (buscar por DPI; crear si no existe)
+        # Resolver id_huesped (buscar por DPI; crear si no existe)
         huesped = hotel_db.get_huesped_por_dpi(conn, datos["dpi"])
         if huesped:
             id_huesped = huesped[0]  # id_huesped
@@ -138,40 +238,250 @@ def crear_reserva(datos):
                 datos.get("nit", None)
             )
 
-        # 6) Validar disponibilidad por fechas (usa id_habitacion + fechas reales)
-        disponible = hotel_db.validar_disponibilidad(
-            conn, id_habitacion, datos["fecha_ingreso"], datos["fecha_salida"]
-        )
-        if not disponible:
-            return False, "Habitación no disponible"
-
-        # 7) Calcular precio total
         total = noches * precio_por_noche
 
-        # 8) Estado de la reserva
-        estado_reserva = "Confirmada"  # ajusta según tu flujo
-
-        # 9) Insertar reserva acorde al esquema actual de la tabla 'reserva'
+        # Insertar reserva acorde al esquema actual de la tabla 'reserva'
         reserva_id = hotel_db.insert_reserva(
             conn,
             id_huesped,
             datos["dpi"],             # dpi_huesped
             id_habitacion,
             numero_habitacion,
-            estado_reserva,
+            ESTADO_RESERVA_NUEVA,
             datos["fecha_ingreso"],
             datos["fecha_salida"],
             total
         )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
 
+    indice.registrar(reserva_id, id_habitacion, datos["fecha_ingreso"], datos["fecha_salida"])
     return True, f"Reserva creada con éxito (ID: {reserva_id}). Total: {total:.2f}"
 
+def cancelar_reserva(id_reserva: int):
+    """
+    Cancela una reserva y libera sus noches en el índice de disponibilidad.
+    Retorna (exito, mensaje).
+    """
+    cancelada = hotel_db.cancelar_reserva(hotel_db.get_connection(), id_reserva)
+    if cancelada is None:
+        return False, "Reserva no encontrada o ya cancelada"
+    obtener_indice_disponibilidad().quitar(id_reserva)
+    return True, f"Reserva {id_reserva} cancelada"
+
+def modificar_reserva(id_reserva: int, fecha_ingreso: str, fecha_salida: str):
+    """
+    Cambia las fechas de una reserva, recalcula el total y regenera sus noches.
+    Retorna (exito, mensaje).
+    """
+    noches = calcular_noches(fecha_ingreso, fecha_salida)
+    if noches is None:
+        return False, "Fechas inválidas"
+
+    conn = hotel_db.get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        reserva = hotel_db.get_reserva(conn, id_reserva)
+        if not reserva or reserva[4] == hotel_db.ESTADO_CANCELADA:
+            conn.rollback()
+            return False, "Reserva no encontrada o cancelada"
+        hab = hotel_db.get_habitacion_por_numero(conn, reserva[3])
+        total = noches * float(hab[3])
+        # Las noches propias se liberan al actualizar; la PK de room_night
+        # rechaza el cambio si alguna noche nueva pertenece a otra reserva.
+        hotel_db.modificar_fechas_reserva(conn, id_reserva, fecha_ingreso, fecha_salida, total)
+        conn.commit()
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        return False, _mensaje_integridad(e)
+    except BaseException:
+        conn.rollback()
+        raise
+
+    indice = obtener_indice_disponibilidad()
+    indice.quitar(id_reserva)
+    indice.registrar(id_reserva, reserva[2], fecha_ingreso, fecha_salida)
+    return True, f"Reserva {id_reserva} modificada. Total: {total:.2f}"
+
+def ocupacion_del_dia(fecha: str):
+    """
+    Retorna {'ocupadas', 'libres'} para la noche 'YYYY-MM-DD'
+    (búsquedas por igualdad sobre 'room_night').
+    """
+    conn = hotel_db.get_connection()
+    return {
+        "ocupadas": hotel_db.contar_habitaciones_ocupadas(conn, fecha),
+        "libres": hotel_db.contar_habitaciones_libres(conn, fecha),
+    }
+
+# =========================
+# Carga masiva de reservas
+# =========================
+def leer_filas_reserva(ruta):
+    """
+    Lee un archivo .csv (con encabezados) o .jsonl fila por fila, sin cargarlo
+    completo en memoria. Cada fila es un dict con las llaves de crear_reserva;
+    las líneas JSONL mal formadas se entregan como None.
+    """
+    if str(ruta).lower().endswith(".jsonl"):
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    yield None
+    else:
+        with open(ruta, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+
+def _normalizar_fila(fila):
+    datos = {k: (str(v).strip() if v is not None else None) for k, v in fila.items()}
+    datos["nit"] = datos.get("nit") or None
+    datos["segundo_nombre"] = datos.get("segundo_nombre") or ""
+    datos["segundo_apellido"] = datos.get("segundo_apellido") or ""
+    return datos
+
+def _validar_fila_lote(datos, habitaciones):
+    """
+    Aplica las mismas validaciones que crear_reserva.
+    Retorna (id_habitacion, precio_total) o lanza ValueError con el mensaje.
+    """
+    noches = calcular_noches(datos.get("fecha_ingreso") or "", datos.get("fecha_salida") or "")
+    if noches is None:
+        raise ValueError("Fechas inválidas")
+    numero_habitacion = datos.get("numero_habitacion") or ""
+    validar_numero_habitacion(numero_habitacion)
+    hab = habitaciones.get(numero_habitacion)
+    if hab is None:
+        raise ValueError("Número de habitación invalido")
+    if not datos.get("dpi") or not datos.get("primer_nombre") or not datos.get("primer_apellido"):
+        raise ValueError("DPI, primer nombre y primer apellido son obligatorios")
+    validar_nombres_apellidos(datos)
+    validar_dpi_nit(datos)
+    id_habitacion, precio_por_noche = hab
+    return id_habitacion, noches * float(precio_por_noche)
+
+def _resultado_fila(fila, exito, mensaje, id_reserva=None):
+    return {"fila": fila, "exito": exito, "mensaje": mensaje, "id_reserva": id_reserva}
+
+def _insertar_bloque(conn, indice, bloque):
+    """
+    Inserta un bloque de filas ya validadas en una sola transacción, con los
+    mismos reintentos acotados que crear_reserva si la BD sigue bloqueada.
+    Si una fila viola una restricción, reintenta fila por fila para aislarla.
+    """
+    for intento in range(MAX_REINTENTOS_BLOQUEO):
+        try:
+            return _insertar_bloque_atomico(conn, indice, bloque)
+        except sqlite3.IntegrityError as e:
+            if len(bloque) > 1:
+                return [r for fila in bloque for r in _insertar_bloque(conn, indice, [fila])]
+            mensaje = _mensaje_integridad(e)
+        except sqlite3.OperationalError as e:
+            if not _es_bloqueo(e):
+                mensaje = f"Error de base de datos: {e}"
+            elif intento == MAX_REINTENTOS_BLOQUEO - 1:
+                mensaje = "La base de datos está ocupada. Intente de nuevo."
+            else:
+                time.sleep(ESPERA_BASE_REINTENTO * (2 ** intento) * (1 + random.random()))
+                continue
+        except sqlite3.Error as e:
+            mensaje = f"Error de base de datos: {e}"
+        return [_resultado_fila(num_fila, False, mensaje) for num_fila, _, _, _ in bloque]
+
+def _insertar_bloque_atomico(conn, indice, bloque):
+    """
+    Una transacción para el bloque. La disponibilidad se verifica con el lock
+    de escritura tomado, contra la BD (índice) y contra las filas aceptadas del
+    propio bloque. Ante un error de SQLite revierte y lo propaga.
+    """
+    resultados = []
+    aceptadas = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        del_bloque = {}  # id_habitacion -> IntervalosHabitacion con las filas aceptadas
+        for num_fila, datos, id_habitacion, total in bloque:
+            fecha_ingreso, fecha_salida = datos["fecha_ingreso"], datos["fecha_salida"]
+            propias = del_bloque.get(id_habitacion)
+            if (not indice.disponible(id_habitacion, fecha_ingreso, fecha_salida)
+                    or (propias is not None and propias.hay_solapamiento(fecha_ingreso, fecha_salida))):
+                resultados.append(_resultado_fila(num_fila, False, "Habitación no disponible"))
+                continue
+            if propias is None:
+                propias = del_bloque[id_habitacion] = IntervalosHabitacion()
+            propias.agregar(fecha_ingreso, fecha_salida, num_fila)
+            aceptadas.append((num_fila, datos, id_habitacion, total))
+
+        ids_reserva = []
+        if aceptadas:
+            hotel_db.insert_huespedes_lote(conn, [
+                (d["dpi"], d["primer_nombre"], d["segundo_nombre"],
+                 d["primer_apellido"], d["segundo_apellido"], d["nit"])
+                for _, d, _, _ in aceptadas
+            ])
+            ids_huesped = hotel_db.get_ids_huesped_por_dpi(conn, {d["dpi"] for _, d, _, _ in aceptadas})
+            ids_reserva = hotel_db.insert_reservas_lote(conn, [
+                (ids_huesped[d["dpi"]], d["dpi"], id_habitacion, d["numero_habitacion"],
+                 ESTADO_RESERVA_NUEVA, d["fecha_ingreso"], d["fecha_salida"], total)
+                for _, d, id_habitacion, total in aceptadas
+            ])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    for (num_fila, datos, id_habitacion, total), id_reserva in zip(aceptadas, ids_reserva):
+        indice.registrar(id_reserva, id_habitacion, datos["fecha_ingreso"], datos["fecha_salida"])
+        resultados.append(_resultado_fila(
+            num_fila, True, f"Reserva creada con éxito (ID: {id_reserva}). Total: {total:.2f}", id_reserva))
+    return resultados
+
+def crear_reservas_lote(filas, tamano_lote: int = TAMANO_LOTE):
+    """
+    Crea reservas a partir de un iterable de dicts (p. ej. leer_filas_reserva(ruta)).
+    Las filas se consumen en streaming y se insertan en transacciones de
+    'tamano_lote' filas (huéspedes y noches con executemany; las reservas, una
+    por INSERT para tomar cada id).
+    Retorna un reporte por fila: [{fila, exito, mensaje, id_reserva}], ordenado por fila.
+    """
+    conn = hotel_db.get_connection()
+    indice = obtener_indice_disponibilidad()
+    habitaciones = {h["numero_habitacion"]: (h["id_habitacion"], h["precio_por_noche"])
+                    for h in obtener_catalogo_habitaciones().habitaciones()}
+
+    reporte = []
+    bloque = []
+    for num_fila, fila in enumerate(filas, start=1):
+        if not isinstance(fila, dict):
+            reporte.append(_resultado_fila(num_fila, False, "Fila mal formada"))
+            continue
+        datos = _normalizar_fila(fila)
+        try:
+            id_habitacion, total = _validar_fila_lote(datos, habitaciones)
+        except ValueError as ve:
+            reporte.append(_resultado_fila(num_fila, False, str(ve)))
+            continue
+        bloque.append((num_fila, datos, id_habitacion, total))
+        if len(bloque) >= tamano_lote:
+            reporte.extend(_insertar_bloque(conn, indice, bloque))
+            bloque = []
+    if bloque:
+        reporte.extend(_insertar_bloque(conn, indice, bloque))
+
+    reporte.sort(key=lambda r: r["fila"])
+    return reporte
+
 # =========================
 # Inicialización de la BD
 # =========================
 def inicializar_sistema():
     """
-    Crea las tablas y llena datos iniciales.
+    Aplica las migraciones pendientes (tablas, datos iniciales e índices).
+    Si la BD ya está al día solo se consulta PRAGMA user_version.
     """
-    hotel_db.init_db()
-    hotel_db.seed_data()
+    migraciones.migrar(hotel_db.get_connection())
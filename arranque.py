@@ -0,0 +1,69 @@
+# arranque.py
+# Fases del arranque de la aplicación (main.py) y su duración.
+# Cada fase se cierra con marcar(); al mostrarse la primera ventana se agrega
+# una línea a ARCHIVO_LOG, para seguir el tiempo hasta el login en los
+# equipos de recepción:
+#
+#   2025-10-01 08:00:00 importar=85.2ms bd=0.4ms(al día) primera_ventana=140.9ms total=226.5ms
+
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import conexiones
+import version_esquema
+
+ARCHIVO_LOG = "arranque.log"
+
+
+def preparar_bd(db_path: str) -> bool:
+    """
+    Deja la BD lista para el login: esquema, datos iniciales y usuarios semilla
+    son migraciones, así que basta comparar PRAGMA user_version con la última.
+    Retorna True si ya estaba al día (camino rápido: sin DDL ni escrituras y
+    sin importar migraciones.py ni las capas de datos).
+    """
+    conn = conexiones.obtener_conexion(db_path)
+    if conn.execute("PRAGMA user_version;").fetchone()[0] >= version_esquema.ULTIMA_VERSION:
+        return True
+
+    import migraciones  # importa hotel_db, restaurante_db y datos: solo si hay que migrar
+
+    migraciones.migrar(conn)
+    return False
+
+
+class TiemposArranque:
+    """
+    Cronómetro de fases consecutivas.
+    - inicio: time.perf_counter() del comienzo (p. ej. antes de las importaciones).
+    - marcar(fase, nota): cierra la fase desde la marca anterior; retorna sus ms.
+    - registrar(): agrega la línea de este arranque a ARCHIVO_LOG.
+    """
+
+    def __init__(self, inicio: Optional[float] = None) -> None:
+        self.inicio = time.perf_counter() if inicio is None else inicio
+        self._ultima_marca = self.inicio
+        self.fases: List[Tuple[str, float, str]] = []  # (fase, ms, nota)
+
+    def marcar(self, fase: str, nota: str = "") -> float:
+        ahora = time.perf_counter()
+        ms = (ahora - self._ultima_marca) * 1000
+        self._ultima_marca = ahora
+        self.fases.append((fase, ms, nota))
+        return ms
+
+    def total_ms(self) -> float:
+        return (self._ultima_marca - self.inicio) * 1000
+
+    def linea(self) -> str:
+        fases = " ".join(f"{fase}={ms:.1f}ms" + (f"({nota})" if nota else "") for fase, ms, nota in self.fases)
+        return f"{datetime.now():%Y-%m-%d %H:%M:%S} {fases} total={self.total_ms():.1f}ms"
+
+    def registrar(self, ruta: str = ARCHIVO_LOG) -> None:
+        """Agrega la línea al registro de arranques; un error de escritura no detiene la aplicación."""
+        try:
+            with open(ruta, "a", encoding="utf-8") as f:
+                f.write(self.linea() + "\n")
+        except OSError as e:
+            print(f"[ERROR] registro de arranque: {e}")
@@ -0,0 +1,332 @@
+# bench_rendimiento.py
+# Benchmarks de las rutas críticas de Hotel, Restaurante y Usuarios.
+# Para cada escala (cantidad de reservas y de pedidos ya existentes) se crea
+# una BD temporal migrada, se llena con SQL por conjuntos y se mide cada
+# operación; los resultados se guardan en JSON. Con --comparar se contrastan
+# contra una línea base y se marcan las regresiones. Además se mide el
+# rendimiento de pedidos concurrentes con y sin ColaPedidos ('concurrencia').
+#
+# Uso:
+#   python bench_rendimiento.py --escalas 100,10000 --salida base.json
+#   python bench_rendimiento.py --escalas 100,10000 --comparar base.json --tolerancia 0.25
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+ESCALAS = (100, 10_000, 1_000_000)
+ITERACIONES = 200          # mediciones por operación (las de escritura usan la cuarta parte)
+TOLERANCIA = 0.20          # +20% sobre la mediana base se marca como regresión
+FECHA_BASE = "2000-01-01"  # inicio del historial generado
+DIAS_POR_ESTADIA = 4       # cada reserva generada ocupa un bloque de 4 días (1 a 3 noches)
+MAX_HABITACIONES_EXTRA = 800  # H200..H999 (formato HNNN)
+MAX_HUESPEDES = 10_000
+MESEROS = 8                # hilos que envían pedidos a la vez en la prueba de carga
+PEDIDOS_POR_MESERO = 50
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+def _medir(funcion, iteraciones):
+    """Ejecuta funcion(i) 'iteraciones' veces y retorna estadísticas en ms."""
+    tiempos = []
+    for i in range(iteraciones):
+        t0 = time.perf_counter()
+        funcion(i)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return {
+        "iteraciones": iteraciones,
+        "p50_ms": round(_percentil(tiempos, 50), 4),
+        "p95_ms": round(_percentil(tiempos, 95), 4),
+        "min_ms": round(min(tiempos), 4),
+        "media_ms": round(sum(tiempos) / len(tiempos), 4),
+    }
+
+
+# ---------------------------
+# Generación de datos
+# ---------------------------
+
+def _poblar(conn, escala):
+    """Agrega habitaciones, huéspedes, 'escala' reservas y 'escala' pedidos cobrados."""
+    import conexiones
+    import hotel_db
+
+    extra = min(MAX_HABITACIONES_EXTRA, escala // 1000)
+    with conexiones.unidad_de_trabajo(conn, "poblar"):
+        conn.execute("""
+            WITH RECURSIVE seq(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i + 1 < ?)
+            INSERT INTO habitacion (numero_habitacion, tipo, precio_por_noche, estado)
+            SELECT printf('H%03d', 200 + i),
+                   CASE i % 3 WHEN 0 THEN 'Individual' WHEN 1 THEN 'Doble' ELSE 'Suite' END,
+                   250 + (i % 3) * 175, 'Disponible'
+            FROM seq WHERE ? > 0;
+        """, (extra, extra))
+        habitaciones = conn.execute("SELECT MAX(id_habitacion) FROM habitacion").fetchone()[0]
+        huespedes = min(escala, MAX_HUESPEDES)
+        conn.execute("""
+            WITH RECURSIVE seq(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i + 1 < ?)
+            INSERT OR IGNORE INTO huesped (dpi, primer_nombre, primer_apellido)
+            SELECT printf('9%012d', i), 'Bench', 'Huesped' FROM seq;
+        """, (huespedes,))
+        # Reserva i: habitación i % H, bloque i // H de DIAS_POR_ESTADIA días, 1 a 3 noches
+        conn.execute("""
+            WITH RECURSIVE seq(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i + 1 < :n)
+            INSERT INTO reserva (id_huesped, dpi_huesped, id_habitacion, numero_habitacion,
+                                 estado_reserva, fecha_ingreso, fecha_salida, precio_total)
+            SELECT g.id_huesped, g.dpi, h.id_habitacion, h.numero_habitacion,
+                   CASE WHEN i % 20 = 0 THEN 'Cancelada' ELSE 'Finalizada' END,
+                   date(:base, '+' || ((i / :h) * :bloque) || ' days'),
+                   date(:base, '+' || ((i / :h) * :bloque + 1 + i % 3) || ' days'),
+                   h.precio_por_noche * (1 + i % 3)
+            FROM seq
+            JOIN habitacion AS h ON h.id_habitacion = 1 + i % :h
+            JOIN huesped AS g ON g.dpi = printf('9%012d', i % :g);
+        """, {"n": escala, "base": FECHA_BASE, "h": habitaciones,
+              "bloque": DIAS_POR_ESTADIA, "g": huespedes})
+        hotel_db.reconstruir_calendario_noches(conn)
+
+        conn.execute("""
+            WITH RECURSIVE seq(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i + 1 < ?)
+            INSERT INTO pedidos (id_habitacion, fecha_pedido, hora_pedido, estado)
+            SELECT 1 + i % 15, date(?, '+' || (i % 3650) || ' days'), '12:00:00', 'Completado' FROM seq;
+        """, (escala, FECHA_BASE))
+        conn.execute("""
+            INSERT INTO detalle_pedidos (id_pedido, id_plato, cantidad, precio_unitario)
+            SELECT p.id_pedido, m.id_plato, 1, m.precio
+            FROM pedidos AS p JOIN menu AS m ON m.id_plato = 1 + p.id_pedido % 6;
+        """)
+        conn.execute("""
+            INSERT INTO transacciones (id_pedido, fecha_transaccion, monto_total, metodo_pago)
+            SELECT p.id_pedido, p.fecha_pedido, ROUND(d.precio_unitario * 1.1, 2), 'Efectivo'
+            FROM pedidos AS p JOIN detalle_pedidos AS d ON d.id_pedido = p.id_pedido;
+        """)
+        # Inventario holgado: los pedidos medidos no deben agotar el stock
+        conn.execute("UPDATE inventario SET cantidad = 1000000000;")
+    conn.execute("ANALYZE;")
+    return habitaciones
+
+
+# ---------------------------
+# Operaciones medidas
+# ---------------------------
+
+def _bench_concurrencia(db_path, logica):
+    """
+    Prueba de carga: MESEROS hilos envían PEDIDOS_POR_MESERO pedidos cada uno,
+    (a) cada mesero con su conexión y una transacción por pedido, y
+    (b) a través de ColaPedidos (un escritor, una transacción por lote).
+    Retorna pedidos por segundo de cada camino y la mejora relativa.
+    """
+    from cola_pedidos import ColaPedidos
+    from restaurante_db import RestauranteDB
+    from restaurante_logica import ItemPedido, RestauranteLogica
+
+    items = [ItemPedido(id_plato=1 + k % 6, cantidad=1) for k in range(3)]
+    total = MESEROS * PEDIDOS_POR_MESERO
+
+    def carga(enviar_pedidos):
+        hilos = [threading.Thread(target=enviar_pedidos, args=(m,)) for m in range(MESEROS)]
+        t0 = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return round(total / (time.perf_counter() - t0), 1)
+
+    def por_pedido(mesero):
+        terminal = RestauranteLogica(RestauranteDB(db_path, persistente=True))
+        try:
+            for i in range(PEDIDOS_POR_MESERO):
+                terminal.procesar_pedido(1 + (mesero + i) % 15, items, "Efectivo")
+        finally:
+            terminal.db.close()
+
+    with ColaPedidos(logica) as cola:
+        def por_cola(mesero):
+            for futuro in [cola.enviar(1 + (mesero + i) % 15, items, "Efectivo")
+                           for i in range(PEDIDOS_POR_MESERO)]:
+                futuro.result()
+
+        directo = carga(por_pedido)
+        agrupado = carga(por_cola)
+        lotes = cola.lotes
+    return {
+        "meseros": MESEROS,
+        "pedidos": total,
+        "procesar_pedido_por_s": directo,
+        "cola_pedidos_por_s": agrupado,
+        "lotes": lotes,
+        "mejora": round(agrupado / directo, 2) if directo else None,
+    }
+
+
+def _bench_escala(escala, iteraciones):
+    import conexiones
+    import datos
+    import hotel_db
+    import Hotel
+    import migraciones
+    from restaurante_db import RestauranteDB
+    from restaurante_logica import ItemPedido, RestauranteLogica
+
+    carpeta = tempfile.mkdtemp(prefix="bench_rendimiento_")
+    db_path = os.path.join(carpeta, "bench.db")
+    rutas_originales = (hotel_db.DB_PATH, datos.DB_PATH)
+    hotel_db.DB_PATH = datos.DB_PATH = db_path
+    try:
+        conn = hotel_db.get_connection()
+        migraciones.migrar(conn)
+        t0 = time.perf_counter()
+        habitaciones = _poblar(conn, escala)
+        preparacion = time.perf_counter() - t0
+
+        logica = RestauranteLogica(RestauranteDB(db_path, persistente=True))  # como la GUI
+        escrituras = max(1, iteraciones // 4)
+        # Las reservas nuevas van después del historial generado: siempre hay lugar
+        inicio_libre = date.fromisoformat(FECHA_BASE) + timedelta(
+            days=(escala // habitaciones + 2) * DIAS_POR_ESTADIA)
+        numeros = [r[0] for r in conn.execute("SELECT numero_habitacion FROM habitacion ORDER BY id_habitacion")]
+
+        def crear_reserva(i):
+            ingreso = inicio_libre + timedelta(days=i * 3)
+            exito, mensaje = Hotel.crear_reserva({
+                "numero_habitacion": numeros[i % len(numeros)],
+                "dpi": f"{8000000000000 + i}",
+                "nit": None,
+                "primer_nombre": "Bench",
+                "segundo_nombre": "",
+                "primer_apellido": "Reserva",
+                "segundo_apellido": "",
+                "fecha_ingreso": ingreso.isoformat(),
+                "fecha_salida": (ingreso + timedelta(days=2)).isoformat(),
+            })
+            if not exito:
+                raise RuntimeError(f"crear_reserva falló: {mensaje}")
+
+        def validar_disponibilidad(i):
+            ingreso = date.fromisoformat(FECHA_BASE) + timedelta(days=(i * 37) % (escala // habitaciones * DIAS_POR_ESTADIA + 1))
+            hotel_db.validar_disponibilidad(conn, 1 + i % habitaciones, ingreso.isoformat(),
+                                            (ingreso + timedelta(days=3)).isoformat())
+
+        def pedido(cantidad_items):
+            items = [ItemPedido(id_plato=1 + k % 6, cantidad=1) for k in range(cantidad_items)]
+            return lambda i: logica.procesar_pedido(1 + i % 15, items, "Efectivo")
+
+        items_subtotal = [ItemPedido(id_plato=1 + k % 6, cantidad=2) for k in range(10)]
+
+        operaciones = [
+            ("Hotel.crear_reserva", crear_reserva, escrituras),
+            ("hotel_db.validar_disponibilidad", validar_disponibilidad, iteraciones),
+            ("Hotel.obtener_tipos_habitacion", lambda i: Hotel.obtener_tipos_habitacion(), iteraciones),
+            ("RestauranteLogica.procesar_pedido[1]", pedido(1), escrituras),
+            ("RestauranteLogica.procesar_pedido[10]", pedido(10), escrituras),
+            ("RestauranteLogica.procesar_pedido[50]", pedido(50), max(1, escrituras // 5)),
+            ("RestauranteLogica.calcular_subtotal[10]", lambda i: logica.calcular_subtotal(items_subtotal), iteraciones),
+            ("datos.obtener_usuario_por_credenciales",
+             lambda i: datos.obtener_usuario_por_credenciales("admin", "admin123"), iteraciones),
+        ]
+        resultados = {nombre: _medir(funcion, n) for nombre, funcion, n in operaciones}
+        concurrencia = _bench_concurrencia(db_path, logica)
+        logica.db.close()
+        return {"preparacion_s": round(preparacion, 3), "habitaciones": habitaciones,
+                "operaciones": resultados, "concurrencia": concurrencia}
+    finally:
+        Hotel._catalogos_habitaciones.pop(db_path, None)
+        indice = Hotel._indices_disponibilidad.pop(db_path, None)
+        if indice is not None:
+            indice.cerrar()
+        conexiones.gestor.cerrar_ruta(db_path)
+        hotel_db.DB_PATH, datos.DB_PATH = rutas_originales
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def ejecutar(escalas=ESCALAS, iteraciones=ITERACIONES):
+    """Ejecuta el benchmark en cada escala y retorna el dict que se guarda como JSON."""
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "iteraciones": iteraciones,
+        "escalas": {str(escala): _bench_escala(escala, iteraciones) for escala in escalas},
+    }
+
+
+# ---------------------------
+# Comparación contra línea base
+# ---------------------------
+
+def comparar(actual, base, tolerancia=TOLERANCIA):
+    """
+    Compara la mediana (p50) de cada operación presente en ambos resultados.
+    Retorna una lista de dicts {escala, operacion, base_ms, actual_ms, cambio, regresion}.
+    """
+    filas = []
+    for escala, datos_escala in actual["escalas"].items():
+        base_escala = base.get("escalas", {}).get(escala)
+        if not base_escala:
+            continue
+        for operacion, medida in datos_escala["operaciones"].items():
+            medida_base = base_escala["operaciones"].get(operacion)
+            if not medida_base or not medida_base["p50_ms"]:
+                continue
+            cambio = medida["p50_ms"] / medida_base["p50_ms"] - 1.0
+            filas.append({
+                "escala": escala,
+                "operacion": operacion,
+                "base_ms": medida_base["p50_ms"],
+                "actual_ms": medida["p50_ms"],
+                "cambio": round(cambio, 4),
+                "regresion": cambio > tolerancia,
+            })
+    return filas
+
+
+def _imprimir_comparacion(filas):
+    for f in filas:
+        marca = "REGRESIÓN" if f["regresion"] else "ok"
+        print(f"{f['escala']:>9}  {f['operacion']:<42} {f['base_ms']:>10.3f} -> {f['actual_ms']:>10.3f} ms "
+              f"({f['cambio']:+.1%})  {marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de rendimiento de Mayan Sunset.")
+    parser.add_argument("--escalas", default=",".join(str(e) for e in ESCALAS),
+                        help="reservas/pedidos existentes por escala, separados por coma")
+    parser.add_argument("--iteraciones", type=int, default=ITERACIONES)
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="archivo JSON de línea base")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                        help="aumento relativo de p50 aceptado antes de marcar regresión")
+    args = parser.parse_args()
+
+    escalas = [int(e) for e in args.escalas.split(",") if e.strip()]
+    resultado = ejecutar(escalas, args.iteraciones)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        filas = comparar(resultado, base, args.tolerancia)
+        _imprimir_comparacion(filas)
+        if any(f["regresion"] for f in filas):
+            raise SystemExit("ERROR: se detectaron regresiones de rendimiento")
+
+
+if __name__ == "__main__":
+    main()
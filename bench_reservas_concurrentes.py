@@ -0,0 +1,143 @@
+# bench_reservas_concurrentes.py
+# Prueba de estrés multi-proceso del flujo de reservas.
+# N procesos ("recepcionistas") intentan reservar las mismas habitaciones en
+# fechas aleatorias sobre una BD temporal. Al final se verifica que no existan
+# reservas solapadas y se reportan reservas/s y latencias p50/p99.
+#
+# Uso:
+#   python bench_reservas_concurrentes.py --procesos 8 --intentos 200 --habitaciones 3
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+def _recepcionista(db_path, id_proceso, intentos, habitaciones, dias, semilla):
+    # Importar dentro del proceso hijo: cada proceso abre sus propias conexiones.
+    import hotel_db
+    import Hotel
+
+    hotel_db.DB_PATH = db_path
+    azar = random.Random(semilla + id_proceso)
+    inicio_temporada = date(2026, 1, 1)
+    latencias, exitos, rechazos, errores = [], 0, 0, 0
+
+    for i in range(intentos):
+        ingreso = inicio_temporada + timedelta(days=azar.randrange(dias))
+        salida = ingreso + timedelta(days=azar.randint(1, 4))
+        datos = {
+            "numero_habitacion": azar.choice(habitaciones),
+            "dpi": f"{4000000000000 + id_proceso * 100000 + i}",
+            "nit": None,
+            "primer_nombre": "Prueba",
+            "segundo_nombre": "",
+            "primer_apellido": "Estres",
+            "segundo_apellido": "",
+            "fecha_ingreso": ingreso.isoformat(),
+            "fecha_salida": salida.isoformat(),
+        }
+        t0 = time.perf_counter()
+        try:
+            exito, _ = Hotel.crear_reserva(datos)
+        except Exception:
+            exito = None
+        latencias.append(time.perf_counter() - t0)
+        if exito:
+            exitos += 1
+        elif exito is None:
+            errores += 1
+        else:
+            rechazos += 1
+    return {"latencias": latencias, "exitos": exitos, "rechazos": rechazos, "errores": errores}
+
+
+def _contar_dobles_reservas(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("""
+            SELECT COUNT(*)
+            FROM reserva AS a
+            JOIN reserva AS b
+              ON a.id_habitacion = b.id_habitacion
+             AND a.id_reserva < b.id_reserva
+             AND a.dia_ingreso < b.dia_salida
+             AND b.dia_ingreso < a.dia_salida
+            WHERE a.estado_reserva <> 'Cancelada'
+              AND b.estado_reserva <> 'Cancelada'
+        """).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def ejecutar(procesos=8, intentos=200, habitaciones=("H101", "H104", "H107"), dias=60, semilla=7):
+    """Ejecuta la prueba de estrés y retorna un dict con los resultados."""
+    import hotel_db
+    import migraciones
+
+    carpeta = tempfile.mkdtemp(prefix="bench_reservas_")
+    db_path = os.path.join(carpeta, "bench.db")
+    conn = sqlite3.connect(db_path)
+    migraciones.migrar(conn)
+    conn.close()
+
+    contexto = multiprocessing.get_context("spawn")
+    t0 = time.perf_counter()
+    with contexto.Pool(procesos) as pool:
+        parciales = pool.starmap(
+            _recepcionista,
+            [(db_path, n, intentos, list(habitaciones), dias, semilla) for n in range(procesos)],
+        )
+    duracion = time.perf_counter() - t0
+
+    latencias = [l for p in parciales for l in p["latencias"]]
+    exitos = sum(p["exitos"] for p in parciales)
+    resultado = {
+        "procesos": procesos,
+        "intentos_totales": procesos * intentos,
+        "reservas_creadas": exitos,
+        "rechazadas_no_disponible": sum(p["rechazos"] for p in parciales),
+        "errores": sum(p["errores"] for p in parciales),
+        "dobles_reservas": _contar_dobles_reservas(db_path),
+        "duracion_s": round(duracion, 3),
+        "reservas_por_s": round(exitos / duracion, 1) if duracion else 0.0,
+        "intentos_por_s": round(len(latencias) / duracion, 1) if duracion else 0.0,
+        "latencia_p50_ms": round(_percentil(latencias, 50) * 1000, 2),
+        "latencia_p99_ms": round(_percentil(latencias, 99) * 1000, 2),
+    }
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + sufijo):
+            os.remove(db_path + sufijo)
+    os.rmdir(carpeta)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de estrés de reservas concurrentes.")
+    parser.add_argument("--procesos", type=int, default=8)
+    parser.add_argument("--intentos", type=int, default=200, help="intentos de reserva por proceso")
+    parser.add_argument("--habitaciones", default="H101,H104,H107", help="números separados por coma")
+    parser.add_argument("--dias", type=int, default=60, help="días de la temporada sorteada")
+    args = parser.parse_args()
+
+    resultado = ejecutar(args.procesos, args.intentos, tuple(args.habitaciones.split(",")), args.dias)
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if resultado["dobles_reservas"]:
+        raise SystemExit("ERROR: se detectaron reservas solapadas")
+
+
+if __name__ == "__main__":
+    main()
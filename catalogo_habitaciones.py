@@ -0,0 +1,100 @@
+# catalogo_habitaciones.py
+# Catálogo en memoria de la tabla 'habitacion': habitaciones, tipos y rango de
+# precios por tipo. Las cotizaciones del formulario de reservas (que se repiten
+# en cada cambio de tipo o de fechas) se resuelven aquí sin consultar la BD.
+
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import conexiones
+import hotel_db
+
+
+class CatalogoHabitaciones:
+    """
+    Habitaciones de la BD 'db_path', indexadas por número y agrupadas por tipo.
+    - Se carga perezosamente en la primera consulta.
+    - Antes de cada consulta se verifica (sin leer la tabla) que siga vigente;
+      se recarga si cambió hotel_db.version_habitaciones (insert_habitacion) o
+      PRAGMA data_version de la conexión del hilo (otra conexión o proceso
+      escribió en la BD). Una conexión no vista antes provoca una recarga.
+      Las escrituras directas en 'habitacion' por la propia conexión, fuera de
+      insert_habitacion, no se detectan: llamar a recargar() tras ellas.
+    Un tipo puede tener habitaciones con distinto precio: rango_precios(tipo)
+    da (mínimo, máximo) y precio_por_tipo(tipo) el mínimo, el precio "desde".
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._habitaciones: List[Dict] = []
+        self._por_numero: Dict[str, Dict] = {}
+        self._precios: Dict[str, Tuple[float, float]] = {}  # tipo -> (mínimo, máximo)
+        self._tipos: List[str] = []
+        # conexión -> (version_habitaciones, data_version) con que se cargó el catálogo
+        self._firmas: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.RLock()
+
+    # --- Sincronización con la BD ---
+
+    def recargar(self) -> None:
+        """Vuelve a leer la tabla 'habitacion' completa."""
+        with self._lock:
+            conn = conexiones.obtener_conexion(self.db_path)
+            firma = (hotel_db.version_habitaciones, conn.execute("PRAGMA data_version;").fetchone()[0])
+            filas = conn.execute(
+                "SELECT id_habitacion, numero_habitacion, tipo, precio_por_noche, estado "
+                "FROM habitacion ORDER BY numero_habitacion;"
+            ).fetchall()
+
+            self._habitaciones = [
+                {"id_habitacion": f[0], "numero_habitacion": f[1], "tipo": f[2],
+                 "precio_por_noche": float(f[3]), "estado": f[4]}
+                for f in filas
+            ]
+            self._por_numero = {h["numero_habitacion"]: h for h in self._habitaciones}
+            self._precios = {}
+            for h in self._habitaciones:
+                precio = h["precio_por_noche"]
+                minimo, maximo = self._precios.get(h["tipo"], (precio, precio))
+                self._precios[h["tipo"]] = (min(minimo, precio), max(maximo, precio))
+            self._tipos = sorted(self._precios)
+            self._firmas[conn] = firma
+
+    def _vigente(self) -> None:
+        conn = conexiones.obtener_conexion(self.db_path)
+        firma = self._firmas.get(conn)
+        if (firma is None or firma[0] != hotel_db.version_habitaciones
+                or firma[1] != conn.execute("PRAGMA data_version;").fetchone()[0]):
+            self.recargar()
+
+    # --- Consultas ---
+
+    def habitaciones(self) -> List[Dict]:
+        """Todas las habitaciones ordenadas por número (dicts compartidos: no modificar)."""
+        with self._lock:
+            self._vigente()
+            return list(self._habitaciones)
+
+    def habitacion(self, numero_habitacion: str) -> Optional[Dict]:
+        """Habitación por número (dict compartido: no modificar) o None."""
+        with self._lock:
+            self._vigente()
+            return self._por_numero.get(numero_habitacion)
+
+    def tipos(self) -> List[str]:
+        """Tipos de habitación existentes, ordenados."""
+        with self._lock:
+            self._vigente()
+            return list(self._tipos)
+
+    def rango_precios(self, tipo: str) -> Optional[Tuple[float, float]]:
+        """(precio mínimo, precio máximo) por noche del tipo, o None si no hay habitaciones de ese tipo."""
+        with self._lock:
+            self._vigente()
+            return self._precios.get(tipo)
+
+    def precio_por_tipo(self, tipo: str) -> Optional[float]:
+        """Precio por noche más bajo del tipo, o None si no hay habitaciones de ese tipo."""
+        rango = self.rango_precios(tipo)
+        return rango[0] if rango else None
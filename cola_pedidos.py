@@ -0,0 +1,133 @@
+# cola_pedidos.py
+# Recepción de pedidos con commit agrupado para las horas pico.
+# Varios meseros encolan pedidos desde sus hilos; un único hilo escritor toma
+# los pendientes en lotes y los registra en una sola transacción por lote,
+# en lugar de competir cada uno por el bloqueo de escritura de SQLite.
+# Cada pedido va dentro de su propio SAVEPOINT: si uno falla (plato inexistente,
+# stock insuficiente) se revierte solo ese y el resto del lote se confirma.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+from restaurante_logica import ItemPedido, RestauranteLogica
+
+TAM_LOTE = 32         # pedidos como máximo por transacción
+ESPERA_MAX = 0.005    # segundos que se espera a completar un lote antes de confirmarlo
+
+
+class ColaPedidos:
+    """
+    Cola thread-safe de pedidos delante de RestauranteLogica.
+
+        cola = ColaPedidos(logica)
+        futuro = cola.enviar(101, items, "Efectivo")
+        resumen = futuro.result()   # mismo dict que procesar_pedido()
+        cola.cerrar()
+
+    - tam_lote: máximo de pedidos por transacción.
+    - espera_max: cuánto espera el escritor, tras recibir un pedido, a que
+      lleguen más antes de confirmar el lote (0 = confirmar lo que ya esté encolado).
+    Conviene que logica.db sea persistente (una conexión para todos los lotes).
+    """
+
+    _FIN = object()
+
+    def __init__(self, logica: RestauranteLogica, tam_lote: int = TAM_LOTE, espera_max: float = ESPERA_MAX):
+        if tam_lote < 1:
+            raise ValueError("tam_lote debe ser al menos 1.")
+        if espera_max < 0:
+            raise ValueError("espera_max no puede ser negativa.")
+        self.logica = logica
+        self.tam_lote = tam_lote
+        self.espera_max = espera_max
+        self.lotes = 0            # transacciones confirmadas
+        self.pedidos = 0          # pedidos registrados con éxito
+        self._cola: "queue.Queue" = queue.Queue()
+        self._cerrada = False
+        self._lock = threading.Lock()
+        self._escritor = threading.Thread(target=self._escribir, name="ColaPedidos", daemon=True)
+        self._escritor.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+
+    def enviar(self, id_habitacion: int, items: List[ItemPedido], metodo_pago: Optional[str] = None) -> Future:
+        """
+        Encola un pedido y retorna un Future que se resuelve con el resumen
+        (id_pedido, totales, advertencias) o con la excepción del pedido.
+        """
+        if not items:
+            raise ValueError("El pedido no tiene ítems.")
+        futuro: Future = Future()
+        with self._lock:
+            if self._cerrada:
+                raise RuntimeError("La cola de pedidos está cerrada.")
+            self._cola.put((futuro, id_habitacion, list(items), metodo_pago))
+        return futuro
+
+    def cerrar(self) -> None:
+        """Deja de aceptar pedidos, procesa los ya encolados y detiene el escritor."""
+        with self._lock:
+            if self._cerrada:
+                return
+            self._cerrada = True
+            self._cola.put(self._FIN)
+        self._escritor.join()
+
+    # --- Hilo escritor ---
+
+    def _tomar_lote(self) -> List[tuple]:
+        """Bloquea hasta el primer pedido y junta los que lleguen hasta llenar el lote o vencer la espera."""
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.espera_max
+        while lote[-1] is not self._FIN and len(lote) < self.tam_lote:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self) -> None:
+        while True:
+            lote = self._tomar_lote()
+            fin = lote[-1] is self._FIN
+            pedidos = lote[:-1] if fin else lote
+            if pedidos:
+                self._registrar_lote(pedidos)
+            if fin:
+                return
+
+    def _registrar_lote(self, pedidos: List[tuple]) -> None:
+        resultados = []
+        try:
+            with self.logica.db as db, db.transaccion():
+                for futuro, id_habitacion, items, metodo_pago in pedidos:
+                    if not futuro.set_running_or_notify_cancel():
+                        continue
+                    db.conn.execute("SAVEPOINT pedido_en_lote;")
+                    try:
+                        resumen = self.logica.registrar_pedido_en(db, id_habitacion, items, metodo_pago)
+                    except Exception as e:
+                        db.conn.execute("ROLLBACK TO pedido_en_lote;")
+                        db.conn.execute("RELEASE pedido_en_lote;")
+                        futuro.set_exception(e)
+                        continue
+                    db.conn.execute("RELEASE pedido_en_lote;")
+                    resultados.append((futuro, resumen))
+        except Exception as e:
+            # Falló el lote completo (BEGIN o COMMIT): nada quedó registrado
+            for futuro, *_ in pedidos:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        self.lotes += 1
+        self.pedidos += len(resultados)
+        for futuro, resumen in resultados:
+            futuro.set_result(resumen)
@@ -0,0 +1,153 @@
+# conexiones.py
+# Gestor de conexiones SQLite compartido por las capas de datos (hotel_db, datos).
+# Cada hilo reutiliza una única conexión por archivo de BD, configurada una sola
+# vez con WAL, busy_timeout y una caché de sentencias preparadas más grande.
+
+import atexit
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+BUSY_TIMEOUT_MS = 5000       # espera ante SQLITE_BUSY antes de fallar
+CACHED_STATEMENTS = 256      # sentencias preparadas por conexión (por defecto: 128)
+
+
+class ConexionCompartida(sqlite3.Connection):
+    """
+    Conexión del pool, compartida por todos los módulos de un mismo hilo.
+    - No se cierra con close(): la cierra GestorConexiones (al terminar el
+      hilo, con cerrar_ruta() o al salir del proceso).
+    - No se usa 'with conn:' ni commit()/rollback() sueltos, que confirmarían
+      o revertirían la transacción que otro módulo tenga abierta en el hilo:
+      las escrituras van en unidad_de_trabajo() o en un BEGIN IMMEDIATE ...
+      COMMIT propio del llamador.
+    """
+
+
+class _ConexionesHilo(dict):
+    """ruta -> (generación, conexión) de un hilo; al terminar el hilo se cierran."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.propias: List[ConexionCompartida] = []
+
+
+class GestorConexiones:
+    """
+    Pool de conexiones por hilo y por ruta de BD.
+    - obtener(): retorna la conexión del hilo actual (la abre la primera vez).
+    - cerrar_ruta(): cierra todas las conexiones a un archivo (p. ej. en pruebas).
+    - estadisticas(): contadores de aperturas y cierres reales.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._abiertas: Dict[str, List[ConexionCompartida]] = {}
+        self._generacion: Dict[str, int] = {}
+        self.aperturas = 0
+        self.cierres = 0
+
+    def _abrir(self, db_path: str) -> ConexionCompartida:
+        conn = sqlite3.connect(
+            db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=CACHED_STATEMENTS,
+            check_same_thread=False,  # solo para permitir el cierre desde otro hilo
+            factory=ConexionCompartida,
+        )
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS};")
+        conn.execute("PRAGMA foreign_keys = ON;")
+        with self._lock:
+            self._abiertas.setdefault(db_path, []).append(conn)
+            self.aperturas += 1
+        return conn
+
+    def obtener(self, db_path: str) -> ConexionCompartida:
+        """Retorna la conexión del hilo actual para 'db_path'."""
+        conexiones: Optional[_ConexionesHilo] = getattr(self._local, "conexiones", None)
+        if conexiones is None:
+            conexiones = self._local.conexiones = _ConexionesHilo()
+            # Cuando el hilo termina, threading.local libera el dict y se cierran sus conexiones
+            weakref.finalize(conexiones, self._cerrar_conexiones, conexiones.propias)
+        generacion = self._generacion.get(db_path, 0)
+        entrada: Optional[Tuple[int, ConexionCompartida]] = conexiones.get(db_path)
+        if entrada is None or entrada[0] != generacion:
+            conn = self._abrir(db_path)
+            conexiones.propias.append(conn)
+            entrada = conexiones[db_path] = (generacion, conn)
+        return entrada[1]
+
+    def _cerrar_conexiones(self, conexiones: List[ConexionCompartida]) -> None:
+        for conn in conexiones:
+            with self._lock:
+                for lista in self._abiertas.values():
+                    if conn in lista:
+                        lista.remove(conn)
+                        self.cierres += 1
+                        break
+                else:
+                    continue  # ya cerrada por cerrar_ruta()
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def cerrar_ruta(self, db_path: str) -> None:
+        """Cierra las conexiones de todos los hilos a 'db_path'."""
+        with self._lock:
+            self._generacion[db_path] = self._generacion.get(db_path, 0) + 1
+            conexiones = self._abiertas.pop(db_path, [])
+            self.cierres += len(conexiones)
+        for conn in conexiones:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def cerrar_todas(self) -> None:
+        """Cierra todas las conexiones abiertas (se registra con atexit)."""
+        for db_path in list(self._abiertas):
+            self.cerrar_ruta(db_path)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Retorna {'aperturas', 'cierres', 'abiertas'}."""
+        with self._lock:
+            abiertas = sum(len(c) for c in self._abiertas.values())
+            return {"aperturas": self.aperturas, "cierres": self.cierres, "abiertas": abiertas}
+
+
+gestor = GestorConexiones()
+atexit.register(gestor.cerrar_todas)
+
+
+def obtener_conexion(db_path: str) -> ConexionCompartida:
+    """Atajo a gestor.obtener(db_path)."""
+    return gestor.obtener(db_path)
+
+
+def estadisticas() -> Dict[str, int]:
+    """Atajo a gestor.estadisticas()."""
+    return gestor.estadisticas()
+
+
+@contextmanager
+def unidad_de_trabajo(conn: sqlite3.Connection, nombre: str = "unidad_de_trabajo") -> Iterator[sqlite3.Connection]:
+    """
+    Agrupa escrituras en un SAVEPOINT sobre 'conn':
+    - sin transacción abierta en la conexión, abre una y la confirma al salir;
+    - dentro de la transacción de otro llamador, se anida en ella: al salir
+      no la confirma, y ante una excepción solo revierte lo hecho en el bloque.
+    """
+    conn.execute(f"SAVEPOINT {nombre};")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute(f"ROLLBACK TO {nombre};")
+        conn.execute(f"RELEASE {nombre};")
+        raise
+    conn.execute(f"RELEASE {nombre};")
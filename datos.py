@@ -5,55 +5,56 @@
 import sqlite3
 from typing import Optional, Dict
 
+import conexiones
+
 DB_PATH = "mayan_sunset.db"
 
 def _crear_conexion() -> sqlite3.Connection:
     """
-    Crea y retorna una conexión a la base de datos SQLite.
-    Usa row_factory para acceder por nombre de columna.
+    Retorna la conexión compartida del hilo actual (ver conexiones.py).
+    La conexión es compartida con hotel_db: para acceder por nombre de columna,
+    asigne row_factory al cursor, no a la conexión.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return conexiones.obtener_conexion(DB_PATH)
 
 # ---------------------------
 # Funciones de inicialización
 # ---------------------------
 
-def seed_usuario() -> None:
+def crear_tabla_usuario(conn: sqlite3.Connection) -> None:
     """
     Crea la tabla Usuario si no existe y agrega usuarios básicos.
     Basado en el script adjunto de creación y llenado.
+    No hace commit: lo usa el runner de migraciones dentro de su transacción.
     """
-    script_creacion = """
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS Usuario (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         usuario TEXT NOT NULL UNIQUE,
         contraseña TEXT NOT NULL,
         tipo_usuario TEXT NOT NULL CHECK(tipo_usuario IN ('Administrador', 'Empleado'))
     );
-    """
-
-    script_insercion = """
+    """)
+    conn.execute("""
     INSERT OR IGNORE INTO Usuario (usuario, contraseña, tipo_usuario)
     VALUES 
         ('admin', 'admin123', 'Administrador'),
         ('empleado1', 'empleado123', 'Empleado'),
         ('empleado2', 'empleado456', 'Empleado');
+    """)
+
+def seed_usuario() -> None:
     """
+    Aplica las migraciones pendientes, entre ellas la tabla Usuario con sus
+    usuarios básicos (ver crear_tabla_usuario). Si la BD ya está al día solo
+    se consulta PRAGMA user_version.
+    """
+    import migraciones  # migraciones importa este módulo
 
     try:
-        conn = _crear_conexion()
-        with conn:
-            conn.executescript(script_creacion)
-            conn.executescript(script_insercion)
-    except sqlite3.Error as e:
+        migraciones.migrar(_crear_conexion())
+    except (sqlite3.Error, RuntimeError) as e:
         print(f"[ERROR] seed_usuario: {e}")
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 # ---------------------------
 # Funciones CRUD de Usuario
@@ -69,8 +70,7 @@ def crear_usuario(usuario: str, contrasena: str, tipo_usuario: str) -> bool:
         VALUES (?, ?, ?);
     """
     try:
-        conn = _crear_conexion()
-        with conn:
+        with conexiones.unidad_de_trabajo(_crear_conexion(), "crear_usuario") as conn:
             conn.execute(query, (usuario, contrasena, tipo_usuario))
         return True
     except sqlite3.IntegrityError:
@@ -79,11 +79,6 @@ def crear_usuario(usuario: str, contrasena: str, tipo_usuario: str) -> bool:
     except sqlite3.Error as e:
         print(f"[ERROR] crear_usuario: {e}")
         return False
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 # ---------------------------
 # Funciones de autenticación
@@ -101,23 +96,18 @@ def obtener_usuario_por_credenciales(usuario: str, contrasena: str) -> Optional[
         LIMIT 1;
     """
     try:
-        conn = _crear_conexion()
-        with conn:
-            cur = conn.execute(query, (usuario, contrasena))
-            row = cur.fetchone()
-            if row is None:
-                return None
-            return {
-                "id": row["id"],
-                "usuario": row["usuario"],
-                "contrasena": row["contraseña"],
-                "tipo_usuario": row["tipo_usuario"],
-            }
+        cur = _crear_conexion().cursor()
+        cur.row_factory = sqlite3.Row
+        cur.execute(query, (usuario, contrasena))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "usuario": row["usuario"],
+            "contrasena": row["contraseña"],
+            "tipo_usuario": row["tipo_usuario"],
+        }
     except sqlite3.Error as e:
         print(f"[ERROR] obtener_usuario_por_credenciales: {e}")
         return None
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
@@ -0,0 +1,166 @@
+# disponibilidad.py
+# Índice en memoria de reservas por habitación para consultas de disponibilidad.
+# Mantiene, por id_habitacion, los intervalos [fecha_ingreso, fecha_salida)
+# ordenados por fecha de ingreso junto con el máximo acumulado de fecha_salida,
+# de modo que cada consulta de solapamiento cuesta O(log n).
+
+import threading
+import weakref
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+import conexiones
+import hotel_db
+
+
+class IntervalosHabitacion:
+    """
+    Intervalos de una habitación ordenados por (fecha_ingreso, fecha_salida, id_reserva).
+    'max_salida[i]' es la mayor fecha_salida entre los intervalos 0..i.
+    """
+
+    __slots__ = ("intervalos", "inicios", "max_salida")
+
+    def __init__(self) -> None:
+        self.intervalos: List[Tuple[str, str, int]] = []
+        self.inicios: List[str] = []
+        self.max_salida: List[str] = []
+
+    def _recalcular_desde(self, pos: int) -> None:
+        del self.max_salida[pos:]
+        acumulado = self.max_salida[-1] if self.max_salida else ""
+        for _, salida, _ in self.intervalos[pos:]:
+            if salida > acumulado:
+                acumulado = salida
+            self.max_salida.append(acumulado)
+
+    def agregar(self, fecha_ingreso: str, fecha_salida: str, id_reserva: int) -> None:
+        intervalo = (fecha_ingreso, fecha_salida, id_reserva)
+        pos = bisect_left(self.intervalos, intervalo)
+        self.intervalos.insert(pos, intervalo)
+        self.inicios.insert(pos, fecha_ingreso)
+        self._recalcular_desde(pos)
+
+    def quitar(self, fecha_ingreso: str, fecha_salida: str, id_reserva: int) -> None:
+        intervalo = (fecha_ingreso, fecha_salida, id_reserva)
+        pos = bisect_left(self.intervalos, intervalo)
+        if pos < len(self.intervalos) and self.intervalos[pos] == intervalo:
+            del self.intervalos[pos]
+            del self.inicios[pos]
+            self._recalcular_desde(pos)
+
+    def hay_solapamiento(self, fecha_ingreso: str, fecha_salida: str) -> bool:
+        # Candidatos: intervalos que inician antes de la salida solicitada.
+        k = bisect_left(self.inicios, fecha_salida)
+        if k == 0:
+            return False
+        # Alguno de ellos termina después del ingreso solicitado.
+        return self.max_salida[k - 1] > fecha_ingreso
+
+
+class IndiceDisponibilidad:
+    """
+    Índice de disponibilidad de habitaciones respaldado por la tabla 'reserva'.
+    - Se carga una sola vez (perezosamente) con las reservas no canceladas.
+    - Se mantiene al día con registrar()/quitar() en cada inserción/cancelación.
+    - Detecta escrituras de otras conexiones (otros hilos o procesos) con
+      PRAGMA data_version sobre la conexión compartida del hilo y se recarga.
+      Las escrituras de la propia conexión no cambian data_version; se detectan
+      con total_changes, salvo las que se informan con registrar()/quitar().
+    Las fechas son cadenas 'YYYY-MM-DD'; la salida no cuenta como noche ocupada.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._habitaciones: Dict[int, IntervalosHabitacion] = {}
+        self._reservas: Dict[int, Tuple[int, str, str]] = {}
+        # conexión -> (data_version, total_changes) observados cuando el índice quedó al día
+        self._versiones: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._cargado = False
+        self._lock = threading.RLock()
+
+    # --- Sincronización con la BD ---
+
+    @staticmethod
+    def _estado(conn) -> Tuple[int, int]:
+        return conn.execute("PRAGMA data_version;").fetchone()[0], conn.total_changes
+
+    def recargar(self) -> None:
+        """Reconstruye el índice completo desde la tabla 'reserva'."""
+        with self._lock:
+            conn = conexiones.obtener_conexion(self.db_path)
+            self._versiones[conn] = self._estado(conn)
+            self._habitaciones.clear()
+            self._reservas.clear()
+            for id_reserva, id_habitacion, fecha_ingreso, fecha_salida in hotel_db.listar_intervalos_reserva(conn):
+                self._agregar(id_reserva, id_habitacion, fecha_ingreso, fecha_salida)
+            self._cargado = True
+
+    def _sincronizar(self) -> None:
+        # Una conexión no vista antes (p. ej. de otro hilo) no permite saber qué
+        # cambió desde la carga: se recarga una vez y se empieza a vigilar.
+        conn = conexiones.obtener_conexion(self.db_path)
+        visto = self._versiones.get(conn)
+        if not self._cargado or visto is None or self._estado(conn) != visto:
+            self.recargar()
+
+    def _aceptar_cambios_propios(self) -> None:
+        # La escritura recién informada ya está en memoria: solo avanzar total_changes.
+        conn = conexiones.obtener_conexion(self.db_path)
+        visto = self._versiones.get(conn)
+        if visto is not None:
+            self._versiones[conn] = (visto[0], conn.total_changes)
+
+    # --- Mantenimiento incremental ---
+
+    def _agregar(self, id_reserva: int, id_habitacion: int, fecha_ingreso: str, fecha_salida: str) -> None:
+        intervalos = self._habitaciones.get(id_habitacion)
+        if intervalos is None:
+            intervalos = self._habitaciones[id_habitacion] = IntervalosHabitacion()
+        intervalos.agregar(fecha_ingreso, fecha_salida, id_reserva)
+        self._reservas[id_reserva] = (id_habitacion, fecha_ingreso, fecha_salida)
+
+    def registrar(self, id_reserva: int, id_habitacion: int, fecha_ingreso: str, fecha_salida: str) -> None:
+        """
+        Registra una reserva recién insertada (y confirmada) en la BD.
+        Debe llamarse desde el hilo que hizo la escritura, sin escrituras intermedias.
+        """
+        with self._lock:
+            if not self._cargado:
+                return  # la carga inicial ya incluirá la nueva reserva
+            if id_reserva not in self._reservas:
+                self._agregar(id_reserva, id_habitacion, fecha_ingreso, fecha_salida)
+            self._aceptar_cambios_propios()
+
+    def quitar(self, id_reserva: int) -> None:
+        """Quita una reserva cancelada (o eliminada) del índice."""
+        with self._lock:
+            if not self._cargado:
+                return
+            datos = self._reservas.pop(id_reserva, None)
+            if datos is not None:
+                id_habitacion, fecha_ingreso, fecha_salida = datos
+                self._habitaciones[id_habitacion].quitar(fecha_ingreso, fecha_salida, id_reserva)
+            self._aceptar_cambios_propios()
+
+    # --- Consultas ---
+
+    def disponible(self, id_habitacion: int, fecha_ingreso: str, fecha_salida: str) -> bool:
+        """
+        True si la habitación no tiene reservas que se solapen con
+        [fecha_ingreso, fecha_salida).
+        """
+        with self._lock:
+            self._sincronizar()
+            intervalos = self._habitaciones.get(id_habitacion)
+            if intervalos is None:
+                return True
+            return not intervalos.hay_solapamiento(fecha_ingreso, fecha_salida)
+
+    def cerrar(self) -> None:
+        """Descarta el contenido; la próxima consulta recarga desde la BD."""
+        with self._lock:
+            self._versiones.clear()
+            self._habitaciones.clear()
+            self._reservas.clear()
+            self._cargado = False
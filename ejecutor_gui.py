@@ -0,0 +1,133 @@
+# ejecutor_gui.py
+# Ejecuta el trabajo de BD de las ventanas Tkinter fuera del hilo de eventos.
+# Un único hilo de trabajo compartido por todas las ventanas (SQLite serializa
+# las escrituras de todos modos y así los pedidos se atienden en orden); la
+# ventana consulta el Future con after(), de modo que los callbacks siempre
+# corren en el hilo de Tk y la interfaz no se congela mientras la BD está ocupada.
+#
+#   tarea = ejecutor_gui.en_segundo_plano(
+#       ventana, Hotel.crear_reserva, datos,
+#       al_terminar=mostrar_resultado, al_fallar=mostrar_error,
+#       deshabilitar=[boton_guardar])
+
+import threading
+import tkinter as tk
+from tkinter import ttk
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+INTERVALO_MS = 50  # cada cuánto se revisa si terminó la tarea
+
+_lock = threading.Lock()
+_ejecutor: Optional[ThreadPoolExecutor] = None
+
+
+def ejecutor() -> ThreadPoolExecutor:
+    """Ejecutor compartido (se crea en el primer uso)."""
+    global _ejecutor
+    with _lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui-bd")
+        return _ejecutor
+
+
+def _habilitar(widgets: Iterable[tk.Misc], habilitado: bool) -> None:
+    """Habilita o deshabilita widgets ttk (state()) y tk clásicos (config(state=...))."""
+    for widget in widgets:
+        try:
+            if not widget.winfo_exists():
+                continue
+            if isinstance(widget, ttk.Widget):
+                widget.state(["!disabled"] if habilitado else ["disabled"])
+            else:
+                widget.config(state="normal" if habilitado else "disabled")
+        except tk.TclError:
+            pass
+
+
+class Tarea:
+    """
+    Trabajo en curso lanzado con en_segundo_plano().
+    - future: el concurrent.futures.Future subyacente.
+    - en_curso(): True mientras no terminó ni se canceló.
+    - cancelar(): no llega a ejecutarse si aún estaba en cola; si ya corría,
+      su resultado se descarta (no se llaman los callbacks). Los widgets se
+      vuelven a habilitar en ambos casos.
+    """
+
+    def __init__(self, widget: tk.Misc, future: Future, al_terminar, al_fallar, deshabilitar, intervalo_ms):
+        self.widget = widget
+        self.future = future
+        self._al_terminar = al_terminar
+        self._al_fallar = al_fallar
+        self._deshabilitados = list(deshabilitar)
+        self._intervalo_ms = intervalo_ms
+        self._cancelada = False
+        self._pendiente = True
+        _habilitar(self._deshabilitados, False)
+        self._id_after = widget.after(intervalo_ms, self._revisar)
+
+    def en_curso(self) -> bool:
+        return self._pendiente
+
+    def cancelar(self) -> None:
+        if not self._pendiente:
+            return
+        self._cancelada = True
+        self.future.cancel()
+        self._finalizar()
+        try:
+            self.widget.after_cancel(self._id_after)
+        except tk.TclError:
+            pass
+
+    def _finalizar(self) -> None:
+        self._pendiente = False
+        _habilitar(self._deshabilitados, True)
+
+    def _revisar(self) -> None:
+        if self._cancelada:
+            return
+        try:
+            if not self.widget.winfo_exists():
+                # La ventana se cerró: el resultado ya no tiene dónde mostrarse
+                self._cancelada = True
+                self._pendiente = False
+                return
+        except tk.TclError:
+            self._pendiente = False
+            return
+        if not self.future.done():
+            self._id_after = self.widget.after(self._intervalo_ms, self._revisar)
+            return
+
+        self._finalizar()
+        error = self.future.exception()
+        if error is None:
+            if self._al_terminar:
+                self._al_terminar(self.future.result())
+        elif self._al_fallar:
+            self._al_fallar(error)
+        else:
+            self.widget.report_callback_exception(type(error), error, error.__traceback__)
+
+
+def en_segundo_plano(
+    widget: tk.Misc,
+    funcion: Callable,
+    *args,
+    al_terminar: Optional[Callable] = None,
+    al_fallar: Optional[Callable[[BaseException], None]] = None,
+    deshabilitar: Iterable[tk.Misc] = (),
+    intervalo_ms: int = INTERVALO_MS,
+    **kwargs,
+) -> Tarea:
+    """
+    Ejecuta funcion(*args, **kwargs) en el hilo de trabajo compartido y retorna una Tarea.
+    Al terminar, en el hilo de Tk, llama a al_terminar(resultado) o a al_fallar(excepción)
+    (sin al_fallar, la excepción se reporta como la de cualquier callback de Tk).
+    Los widgets de 'deshabilitar' quedan deshabilitados mientras la tarea está en curso.
+    'funcion' no debe tocar widgets: solo la BD y la lógica.
+    """
+    future = ejecutor().submit(funcion, *args, **kwargs)
+    return Tarea(widget, future, al_terminar, al_fallar, deshabilitar, intervalo_ms)
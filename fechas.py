@@ -0,0 +1,29 @@
+# fechas.py
+# Números de día enteros para fechas 'YYYY-MM-DD' (día juliano a mediodía).
+# En la BD las columnas generadas dia_* usan la expresión de sql_dia(); en Python
+# a_dia() da el mismo valor, de modo que rangos, solapamientos y conteos de
+# noches se resuelven con aritmética entera (dia_salida - dia_ingreso = noches).
+
+from datetime import date
+
+DESFASE_ORDINAL = 1721425  # a_dia('0001-01-01') - date(1, 1, 1).toordinal()
+
+
+def sql_dia(columna: str) -> str:
+    """Expresión SQL que convierte la columna de texto 'columna' en número de día (NULL si es inválida)."""
+    return f"CAST(julianday({columna}) + 0.5 AS INTEGER)"
+
+
+def a_dia(fecha: str) -> int:
+    """
+    Número de día de una fecha 'YYYY-MM-DD'.
+    Lanza ValueError si el formato no es exactamente ese (julianday() no acepta otros).
+    """
+    if not isinstance(fecha, str) or len(fecha) != 10 or fecha[4] != "-" or fecha[7] != "-":
+        raise ValueError(f"Fecha inválida (use YYYY-MM-DD): {fecha!r}")
+    return date.fromisoformat(fecha).toordinal() + DESFASE_ORDINAL
+
+
+def desde_dia(dia: int) -> str:
+    """Fecha 'YYYY-MM-DD' de un número de día."""
+    return date.fromordinal(dia - DESFASE_ORDINAL).isoformat()
@@ -0,0 +1,84 @@
+# folio.py
+# Folio de salida de una reserva: noches de habitación más los consumos del
+# restaurante cargados a esa estadía (pedidos.id_reserva), con su cargo por
+# servicio. Todo sale de una sola consulta por la PK de reserva y los índices
+# idx_pedidos_reserva, idx_transacciones_pedido e idx_detalle_pedidos_pedido,
+# así que el costo depende de los consumos de la estadía y no del historial.
+# Un pedido con varias transacciones aparece una vez, con la primera (igual
+# que en ventas_diarias).
+
+from typing import Dict, Optional
+
+import hotel_db
+from restaurante_logica import RestauranteLogica
+
+SQL_FOLIO = """
+    SELECT r.id_reserva, r.numero_habitacion, r.dpi_huesped, r.estado_reserva,
+           r.fecha_ingreso, r.fecha_salida, r.dia_salida - r.dia_ingreso AS noches, r.precio_total,
+           p.id_pedido, p.fecha_pedido, p.hora_pedido,
+           (SELECT SUM(d.cantidad * d.precio_unitario)
+            FROM detalle_pedidos AS d WHERE d.id_pedido = p.id_pedido) AS subtotal,
+           t.monto_total, t.metodo_pago
+    FROM reserva AS r
+    LEFT JOIN pedidos AS p ON p.id_reserva = r.id_reserva
+    LEFT JOIN transacciones AS t ON t.id_transaccion = (
+        SELECT MIN(id_transaccion) FROM transacciones WHERE id_pedido = p.id_pedido)
+    WHERE r.id_reserva = ?
+    ORDER BY p.dia_pedido, p.id_pedido;
+"""
+
+
+def obtener_folio(id_reserva: int, conn=None) -> Optional[Dict]:
+    """
+    Folio de la reserva 'id_reserva' (None si no existe):
+    - noches, precio_por_noche y cargo_habitacion
+    - consumos: un dict por pedido cobrado (subtotal, cargo_servicio, total, metodo_pago)
+    - subtotal_restaurante, cargo_servicio, total_restaurante
+    - total (habitación + restaurante), pagado (consumos ya pagados en el
+      restaurante) y saldo_pendiente (lo que se cobra al hacer checkout)
+    """
+    if conn is None:
+        conn = hotel_db.get_connection()
+    filas = conn.execute(SQL_FOLIO, (id_reserva,)).fetchall()
+    if not filas:
+        return None
+
+    (_, numero_habitacion, dpi, estado, fecha_ingreso, fecha_salida, noches, precio_total) = filas[0][:8]
+    consumos = []
+    for fila in filas:
+        id_pedido, fecha, hora, subtotal, total, metodo_pago = fila[8:]
+        if id_pedido is None or total is None:
+            continue  # sin consumos, o pedido sin cobrar
+        subtotal = round(subtotal or 0.0, 2)
+        consumos.append({
+            "id_pedido": id_pedido,
+            "fecha": fecha,
+            "hora": hora,
+            "subtotal": subtotal,
+            "cargo_servicio": round(total - subtotal, 2),
+            "total": round(total, 2),
+            "metodo_pago": metodo_pago,
+        })
+
+    total_restaurante = round(sum(c["total"] for c in consumos), 2)
+    pagado = round(sum(c["total"] for c in consumos
+                       if c["metodo_pago"] != RestauranteLogica.PAGO_CARGO_HABITACION), 2)
+    total = round(precio_total + total_restaurante, 2)
+    return {
+        "id_reserva": id_reserva,
+        "numero_habitacion": numero_habitacion,
+        "dpi_huesped": dpi,
+        "estado_reserva": estado,
+        "fecha_ingreso": fecha_ingreso,
+        "fecha_salida": fecha_salida,
+        "noches": noches,
+        "precio_por_noche": round(precio_total / noches, 2) if noches else 0.0,
+        "cargo_habitacion": round(precio_total, 2),
+        "consumos": consumos,
+        "subtotal_restaurante": round(sum(c["subtotal"] for c in consumos), 2),
+        "cargo_servicio": round(sum(c["cargo_servicio"] for c in consumos), 2),
+        "total_restaurante": total_restaurante,
+        "total": total,
+        "pagado": pagado,
+        "saldo_pendiente": round(total - pagado, 2),
+    }
@@ -11,6 +11,7 @@ from tkinter import ttk, messagebox
 from tkinter import Canvas, Entry, Button, PhotoImage, StringVar
 
 import Hotel  # Capa de negocio (valida, calcula y orquesta llamadas a hotel_db)
+import ejecutor_gui
 from hotel_db import listar_numeros_habitacion, get_connection as get_conn
 
 OUTPUT_PATH = Path(__file__).parent
@@ -36,14 +37,14 @@ class VentanaReservaciones(tk.Toplevel):
         self.configure(bg="#FFFFFF")
         self.resizable(True, True)
 
-        # Inicialización del sistema de Hotel al abrir la ventana (no en import)
-        try:
-            Hotel.inicializar_sistema()
-        except Exception as e:
-            messagebox.showwarning("Inicialización", f"No se pudo inicializar el sistema de Hotel.\n{e}")
-
         # Estado interno
         self.precio_noche_actual = None
+        self.precios_tipo = {}        # tipo -> precio por noche "desde" (Hotel.obtener_precio_por_tipo)
+        self.precios_habitacion = {}  # numero_habitacion -> precio_por_noche (habitaciones libres)
+        # Trabajo de BD en curso (ejecutor_gui): nada de esto corre en el hilo de Tk
+        self.tarea_tipos = None     # inicialización del sistema y tipos de habitación
+        self.tarea_numeros = None   # habitaciones libres según tipo y fechas
+        self.tarea_guardar = None   # Hotel.crear_reserva
 
         # Validadores registrados contra este Toplevel
         self.vcmd_num = self.register(self._validar_numerico)
@@ -76,9 +77,9 @@ class VentanaReservaciones(tk.Toplevel):
         self.inner_canvas.bind("<Configure>", self._update_scrollregion)
         self.bind_all("<MouseWheel>", self._on_mousewheel)
 
-        # Inicializaciones dependientes de datos
+        # Inicializaciones dependientes de datos (la inicialización del sistema
+        # de Hotel se hace al abrir la ventana, no en import, y fuera del hilo de Tk)
         self._cargar_tipos_habitacion()
-        self._cargar_numeros_habitacion()
 
     # =========================
     # Validaciones de entrada
@@ -163,6 +164,7 @@ class VentanaReservaciones(tk.Toplevel):
         self.numero_hab_var = StringVar()
         self.combo_numero_hab = ttk.Combobox(self.inner_canvas, textvariable=self.numero_hab_var, values=[], state="readonly")
         self.combo_numero_hab.place(x=642.0, y=787.0, width=225.0, height=33.0)
+        self.combo_numero_hab.bind("<<ComboboxSelected>>", self._actualizar_precio_habitacion)
 
         # Label Estado
         self.inner_canvas.create_text(922.0, 755.0, anchor="nw", text="Estado", fill="#FFFFFF", font=("Lato Regular", 20 * -1))
@@ -180,7 +182,7 @@ class VentanaReservaciones(tk.Toplevel):
         self.entry_5 = Entry(self.inner_canvas, bd=0, bg="#D9D9D9", fg="#000716", highlightthickness=0)
         self.entry_5.place(x=932.0, y=597.0, width=225.0, height=33.0)
         self.entry_5.config(validate="key", validatecommand=(self.vcmd_fecha_char, "%S"))
-        self.entry_5.bind("<FocusOut>", self._calcular_total)
+        self.entry_5.bind("<FocusOut>", self._on_cambio_fechas)
 
         # Label Fecha de Ingreso
         self.inner_canvas.create_text(632.0, 540.0, anchor="nw", text="Fecha de Ingreso\nAAAA-MM-DD", fill="#FFFFFF", font=("Lato Regular", 20 * -1))
@@ -197,7 +199,7 @@ class VentanaReservaciones(tk.Toplevel):
         self.entry_6 = Entry(self.inner_canvas, bd=0, bg="#D9D9D9", fg="#000716", highlightthickness=0)
         self.entry_6.place(x=642.0, y=597.0, width=225.0, height=33.0)
         self.entry_6.config(validate="key", validatecommand=(self.vcmd_fecha_char, "%S"))
-        self.entry_6.bind("<FocusOut>", self._calcular_total)
+        self.entry_6.bind("<FocusOut>", self._on_cambio_fechas)
 
         # entry_7 -> NIT
         self.entry_image_7 = PhotoImage(master=self, file=relative_to_assets("entry_7.png"))
@@ -314,40 +316,75 @@ class VentanaReservaciones(tk.Toplevel):
     # Cargas de datos
     # =========================
     def _cargar_tipos_habitacion(self):
-        try:
-            tipos = Hotel.obtener_tipos_habitacion()
-        except Exception as e:
-            tipos = []
-            messagebox.showerror("Tipos de habitación", f"No se pudieron cargar tipos de habitación.\n{e}")
+        self.tarea_tipos = ejecutor_gui.en_segundo_plano(
+            self, _consultar_tipos,
+            al_terminar=self._on_tipos_cargados,
+            al_fallar=self._on_tipos_fallidos,
+        )
 
+    def _on_tipos_cargados(self, precios_tipo):
+        self.precios_tipo = precios_tipo
+        tipos = list(precios_tipo)
         self.combo_tipo_habitacion["values"] = tipos
         if tipos:
             self.combo_tipo_habitacion.current(0)
-            try:
-                self.precio_noche_actual = Hotel.obtener_precio_por_tipo(tipos[0])
-            except Exception:
-                self.precio_noche_actual = None
+            self.precio_noche_actual = precios_tipo[tipos[0]]
             self._calcular_total()
+        self._cargar_numeros_habitacion()
+
+    def _on_tipos_fallidos(self, error):
+        self.combo_tipo_habitacion["values"] = []
+        messagebox.showerror("Tipos de habitación", f"No se pudieron cargar tipos de habitación.\n{error}")
+        self._cargar_numeros_habitacion()
 
     def _actualizar_precio_noche(self, event=None):
         tipo = self.combo_tipo_habitacion.get()
         if not tipo:
             return
-        try:
-            self.precio_noche_actual = Hotel.obtener_precio_por_tipo(tipo)
-        except Exception as e:
-            self.precio_noche_actual = None
-            messagebox.showerror("Precio por noche", f"No se pudo obtener el precio para '{tipo}'.\n{e}")
-        self._calcular_total()
+        self.precio_noche_actual = self.precios_tipo.get(tipo)
+        self._cargar_numeros_habitacion()
+
+    def _on_cambio_fechas(self, event=None):
+        # Las habitaciones libres dependen del rango de fechas
+        self._cargar_numeros_habitacion()
 
     def _cargar_numeros_habitacion(self):
-        try:
-            with get_conn() as conn:
-                self.combo_numero_hab["values"] = listar_numeros_habitacion(conn)
-            if self.combo_numero_hab["values"]:
+        """
+        Con tipo y fechas válidas, lista solo las habitaciones libres de ese tipo
+        (una consulta); si faltan datos, lista todos los números de habitación.
+        La consulta corre en segundo plano; una consulta anterior aún pendiente
+        se descarta, ya que el tipo o las fechas cambiaron.
+        """
+        tipo = (self.combo_tipo_habitacion.get() or "").strip()
+        fecha_ingreso = (self.entry_6.get() or "").strip()
+        fecha_salida = (self.entry_5.get() or "").strip()
+        if self.tarea_numeros is not None:
+            self.tarea_numeros.cancelar()
+        self.tarea_numeros = ejecutor_gui.en_segundo_plano(
+            self, _consultar_habitaciones, tipo, fecha_ingreso, fecha_salida,
+            al_terminar=self._on_numeros_cargados,
+            al_fallar=lambda e: messagebox.showerror(
+                "Habitaciones", f"No se pudieron cargar números de habitación.\n{e}"),
+        )
+
+    def _on_numeros_cargados(self, resultado):
+        self.precios_habitacion, numeros = resultado
+
+        seleccion = self.combo_numero_hab.get()
+        self.combo_numero_hab["values"] = numeros
+        if seleccion not in numeros:
+            if numeros:
                 self.combo_numero_hab.current(0)
-        except Exception as e:
-            messagebox.showerror("Habitaciones", f"No se pudieron cargar números de habitación.\n{e}")
+            else:
+                self.numero_hab_var.set("")
+        self._actualizar_precio_habitacion()
+
+    def _actualizar_precio_habitacion(self, event=None):
+        # El precio de la habitación libre elegida prevalece sobre el precio por tipo
+        numero = self.combo_numero_hab.get()
+        if numero in self.precios_habitacion:
+            self.precio_noche_actual = self.precios_habitacion[numero]
+        self._calcular_total()
 
     # =========================
     # Cálculo de total
@@ -371,10 +408,7 @@ class VentanaReservaciones(tk.Toplevel):
         if self.precio_noche_actual is None:
             tipo = self.combo_tipo_habitacion.get()
             if tipo:
-                try:
-                    self.precio_noche_actual = Hotel.obtener_precio_por_tipo(tipo)
-                except Exception:
-                    self.precio_noche_actual = None
+                self.precio_noche_actual = self.precios_tipo.get(tipo)
 
         if self.precio_noche_actual is None:
             self.entry_1.insert(0, "")
@@ -459,11 +493,24 @@ class VentanaReservaciones(tk.Toplevel):
             # "id_huesped": None,  # TODO: integrar cuando exista gestión de huéspedes
         }
 
-        try:
-            exito, mensaje = Hotel.crear_reserva(datos)
-        except Exception as e:
-            messagebox.showerror("Error al crear reserva", f"{e}")
+        if self.tarea_guardar is not None and self.tarea_guardar.en_curso():
             return
+        # La inserción (con reintentos si la BD está bloqueada) corre fuera del hilo de Tk
+        self.tarea_guardar = ejecutor_gui.en_segundo_plano(
+            self, Hotel.crear_reserva, datos,
+            al_terminar=lambda resultado: self._on_reserva_guardada(datos, *resultado),
+            al_fallar=lambda e: messagebox.showerror("Error al crear reserva", f"{e}"),
+            deshabilitar=[self.button_1],
+        )
+
+    def _on_reserva_guardada(self, datos, exito, mensaje):
+        numero_habitacion = datos["numero_habitacion"]
+        tipo = datos["tipo_habitacion"]
+        fecha_ingreso, fecha_salida = datos["fecha_ingreso"], datos["fecha_salida"]
+        primer_nombre, segundo_nombre = datos["primer_nombre"], datos["segundo_nombre"]
+        primer_apellido, segundo_apellido = datos["primer_apellido"], datos["segundo_apellido"]
+        dpi, nit = datos["dpi"], datos["nit"]
+        noches, precio_total = datos["noches"], datos["precio_total"]
 
         if exito:
             resumen = (
@@ -484,6 +531,23 @@ class VentanaReservaciones(tk.Toplevel):
             messagebox.showerror("Error", mensaje)
 
 
+# =========================
+# Consultas de BD (corren en el hilo de ejecutor_gui: no tocan widgets)
+# =========================
+def _consultar_tipos():
+    """Inicializa el sistema de Hotel y retorna {tipo: precio por noche "desde"}."""
+    Hotel.inicializar_sistema()
+    return {tipo: Hotel.obtener_precio_por_tipo(tipo) for tipo in Hotel.obtener_tipos_habitacion()}
+
+def _consultar_habitaciones(tipo, fecha_ingreso, fecha_salida):
+    """Retorna ({numero_habitacion: precio} de las libres, [numeros a listar])."""
+    if tipo and Hotel.calcular_noches(fecha_ingreso, fecha_salida) is not None:
+        libres = Hotel.buscar_habitaciones_disponibles(tipo, fecha_ingreso, fecha_salida)
+        precios = {h["numero_habitacion"]: h["precio_por_noche"] for h in libres}
+        return precios, list(precios)
+    return {}, listar_numeros_habitacion(get_conn())
+
+
 # Ejecución independiente de pruebas (no se ejecuta al importar)
 if __name__ == "__main__":
     root = tk.Tk()
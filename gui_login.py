@@ -3,6 +3,8 @@
 
 import tkinter as tk
 from tkinter import ttk
+
+import ejecutor_gui
 from logica import LogicaApp
 
 class VentanaLogin(tk.Toplevel):
@@ -28,6 +30,7 @@ class VentanaLogin(tk.Toplevel):
         # Variables de entrada
         self.var_usuario = tk.StringVar()
         self.var_contrasena = tk.StringVar()
+        self.tarea = None  # validación en curso (ejecutor_gui)
 
         self._construir_ui()
 
@@ -56,18 +59,29 @@ class VentanaLogin(tk.Toplevel):
         self.entry_contrasena.pack(fill="x")
 
         # Botón ingresar
-        btn_ingresar = ttk.Button(frm, text="Ingresar", command=self._on_ingresar)
-        btn_ingresar.pack(pady=12)
+        self.btn_ingresar = ttk.Button(frm, text="Ingresar", command=self._on_ingresar)
+        self.btn_ingresar.pack(pady=12)
 
         # Atajos de teclado
         self.bind("<Return>", lambda e: self._on_ingresar())
         self.bind("<Escape>", lambda e: self.destroy())
 
     def _on_ingresar(self):
+        if self.tarea is not None and self.tarea.en_curso():
+            return  # Enter repetido mientras se valida
         usuario = self.var_usuario.get()
         contrasena = self.var_contrasena.get()
 
-        es_valido, user_dict, mensaje = self.logica.validar_credenciales(usuario, contrasena)
+        # La consulta de usuario corre fuera del hilo de Tk
+        self.tarea = ejecutor_gui.en_segundo_plano(
+            self, self.logica.validar_credenciales, usuario, contrasena,
+            al_terminar=self._on_validado,
+            al_fallar=lambda e: self.logica.mostrar_error(f"No se pudo validar el usuario: {e}"),
+            deshabilitar=[self.btn_ingresar],
+        )
+
+    def _on_validado(self, resultado):
+        es_valido, user_dict, mensaje = resultado
         if not es_valido:
             self.logica.mostrar_error(mensaje)
             return
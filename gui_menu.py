@@ -8,7 +8,7 @@ class VentanaMenu(tk.Toplevel):
     """
     Ventana de menú principal:
     - Muestra bienvenida con tipo de usuario.
-    - Botones: Reservaciones, Restaurante (TODO), Hotel (TODO), Reportes (TODO).
+    - Botones: Reservaciones, Restaurante (TODO), Hotel (TODO), Reportes.
     - Botón Gestión de Usuarios visible solo para Administrador (TODO).
     """
     def _abrir_restaurante(self):
@@ -75,8 +75,8 @@ class VentanaMenu(tk.Toplevel):
         btn_hotel = ttk.Button(cont_botones, text="Hotel", command=self._hotel_todo)
         btn_hotel.grid(row=0, column=2, padx=8, pady=8, sticky="ew")
 
-        # Reportes (TODO)
-        btn_reportes = ttk.Button(cont_botones, text="Reportes", command=self._reportes_todo)
+        # Reportes
+        btn_reportes = ttk.Button(cont_botones, text="Reportes", command=self._abrir_reportes)
         btn_reportes.grid(row=1, column=0, padx=8, pady=8, sticky="ew")
 
         # Gestión de Usuarios — visible solo para Administrador (TODO)
@@ -109,9 +109,12 @@ class VentanaMenu(tk.Toplevel):
         # TODO: Implementar servicios del hotel
         messagebox.showinfo("Próximamente", "Módulo de Hotel en desarrollo.")
 
-    def _reportes_todo(self):
-        # TODO: Implementar generación de reportes (ventas, ocupación, etc.)
-        messagebox.showinfo("Próximamente", "Módulo de Reportes en desarrollo.")
+    def _abrir_reportes(self):
+        try:
+            from gui_reportes import VentanaReportes
+            VentanaReportes(self.root)
+        except Exception as e:
+            messagebox.showerror("Error al abrir Reportes", str(e))
 
     def _gestion_usuarios_todo(self):
         # TODO: Implementar CRUD de usuarios (visible solo para Administrador)
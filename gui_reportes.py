@@ -0,0 +1,104 @@
+# gui_reportes.py
+# Capa de presentación: reportes de ocupación y ventas (usa reportes.py).
+
+import tkinter as tk
+from datetime import date
+from tkinter import ttk, messagebox
+
+import ejecutor_gui
+import reportes
+
+
+class VentanaReportes(tk.Toplevel):
+    """
+    Ventana de reportes gerenciales:
+    - Período Desde/Hasta (YYYY-MM-DD, ambos inclusive).
+    - Indicadores: ocupación, ADR, RevPAR, ingreso del restaurante y ticket promedio.
+    - Detalle de habitaciones por tipo.
+    """
+
+    INDICADORES = [
+        ("tasa_ocupacion", "Ocupación (%)"),
+        ("adr", "ADR (Q)"),
+        ("revpar", "RevPAR (Q)"),
+        ("ingreso_habitaciones", "Ingreso habitaciones (Q)"),
+        ("ingreso_restaurante", "Ingreso restaurante (Q)"),
+        ("pedidos_cobrados", "Pedidos cobrados"),
+        ("ticket_promedio", "Ticket promedio (Q)"),
+    ]
+
+    COLUMNAS_TIPO = [
+        ("tipo", "Tipo"),
+        ("habitaciones", "Habitaciones"),
+        ("noches_vendidas", "Noches vendidas"),
+        ("tasa_ocupacion", "Ocupación (%)"),
+        ("adr", "ADR"),
+        ("revpar", "RevPAR"),
+    ]
+
+    def __init__(self, root: tk.Tk):
+        super().__init__(root)
+        self.title("Mayan Sunset - Reportes")
+        self.geometry("640x460")
+        self.resizable(False, False)
+
+        hoy = date.today()
+        self.var_desde = tk.StringVar(value=hoy.replace(day=1).isoformat())
+        self.var_hasta = tk.StringVar(value=hoy.isoformat())
+        self.valores = {clave: tk.StringVar(value="-") for clave, _ in self.INDICADORES}
+        self.tarea = None  # reporte en curso en el hilo de ejecutor_gui
+
+        self._construir_ui()
+
+    def _construir_ui(self):
+        frm = ttk.Frame(self, padding=16)
+        frm.pack(expand=True, fill="both")
+
+        # Período
+        periodo = ttk.Frame(frm)
+        periodo.pack(fill="x", pady=(0, 12))
+        ttk.Label(periodo, text="Desde:").pack(side="left")
+        ttk.Entry(periodo, textvariable=self.var_desde, width=12).pack(side="left", padx=(4, 12))
+        ttk.Label(periodo, text="Hasta:").pack(side="left")
+        ttk.Entry(periodo, textvariable=self.var_hasta, width=12).pack(side="left", padx=(4, 12))
+        self.btn_generar = ttk.Button(periodo, text="Generar", command=self._generar)
+        self.btn_generar.pack(side="left")
+
+        # Indicadores
+        cont_indicadores = ttk.LabelFrame(frm, text="Indicadores", padding=8)
+        cont_indicadores.pack(fill="x")
+        for fila, (clave, texto) in enumerate(self.INDICADORES):
+            ttk.Label(cont_indicadores, text=texto).grid(row=fila // 2, column=(fila % 2) * 2, sticky="w", padx=4, pady=2)
+            ttk.Label(cont_indicadores, textvariable=self.valores[clave], font=("Segoe UI", 10, "bold")).grid(
+                row=fila // 2, column=(fila % 2) * 2 + 1, sticky="e", padx=(4, 24), pady=2)
+
+        # Detalle por tipo de habitación
+        self.tabla = ttk.Treeview(frm, columns=[c for c, _ in self.COLUMNAS_TIPO], show="headings", height=6)
+        for clave, texto in self.COLUMNAS_TIPO:
+            self.tabla.heading(clave, text=texto)
+            self.tabla.column(clave, width=95, anchor="center")
+        self.tabla.pack(expand=True, fill="both", pady=(12, 0))
+
+    def _generar(self):
+        """Calcula el reporte en segundo plano; el botón queda deshabilitado mientras tanto."""
+        if self.tarea is not None and self.tarea.en_curso():
+            return
+        self.tarea = ejecutor_gui.en_segundo_plano(
+            self, reportes.reporte_general, self.var_desde.get().strip(), self.var_hasta.get().strip(),
+            al_terminar=self._mostrar,
+            al_fallar=self._error,
+            deshabilitar=[self.btn_generar],
+        )
+
+    def _error(self, e: BaseException):
+        if isinstance(e, ValueError):
+            messagebox.showerror("Período inválido", str(e), parent=self)
+        else:
+            messagebox.showerror("Error al generar el reporte", str(e), parent=self)
+
+    def _mostrar(self, reporte):
+        for clave, _ in self.INDICADORES:
+            self.valores[clave].set(f"{reporte[clave]:,.2f}" if isinstance(reporte[clave], float) else str(reporte[clave]))
+        self.tabla.delete(*self.tabla.get_children())
+        for tipo in reporte["por_tipo"]:
+            self.tabla.insert("", "end", values=[tipo[c] for c, _ in self.COLUMNAS_TIPO])
@@ -1,28 +1,37 @@
 import sqlite3
 
+import conexiones
+import fechas
+
 DB_PATH = "mayan_sunset.db"
 
+ESTADO_CANCELADA = "Cancelada"  # las reservas canceladas no ocupan la habitación
+
+# Se incrementa con cada insert_habitacion: invalida los catálogos en memoria
+# (ver catalogo_habitaciones.py), que no ven las escrituras de su propia conexión.
+version_habitaciones = 0
+
 # =========================
 # Conexión centralizada
 # =========================
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    """
+    Retorna la conexión compartida del hilo actual (ver conexiones.py).
+    No se cierra ni se usa como 'with conn:': las escrituras van en
+    conexiones.unidad_de_trabajo(conn) o en un BEGIN IMMEDIATE propio.
+    """
+    return conexiones.obtener_conexion(DB_PATH)
 
 # =========================
 # Inicialización de la BD
 # =========================
-def init_db():
+def crear_esquema(conn):
     """
-    Crea todas las tablas con la versión mejorada de los CREATE.
+    Ejecuta los CREATE del módulo Hotel sobre 'conn' (idempotente).
+    No hace commit: lo usa el runner de migraciones dentro de su transacción.
     """
-    conn = get_connection()
     cursor = conn.cursor()
 
-    # Activar claves foráneas
-    cursor.execute("PRAGMA foreign_keys = ON;")
-
     # Crear tabla habitacion
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS habitacion (
@@ -64,14 +73,12 @@ def init_db():
         UNIQUE (dpi_huesped, numero_habitacion, fecha_ingreso)
     );
     """)
-    conn.commit()
-    conn.close()
 
-def seed_data():
+def insertar_datos_iniciales(conn):
     """
-    Inserta los datos iniciales (habitaciones, huéspedes, etc.).
+    Inserta habitaciones, huéspedes y reservas de ejemplo sobre 'conn' (idempotente).
+    No hace commit: lo usa el runner de migraciones dentro de su transacción.
     """
-    conn = get_connection()
     cursor = conn.cursor()
 
     # Insertar datos en habitacion
@@ -123,7 +130,6 @@ def seed_data():
     """, huespedes)
 
     # Insertar datos en reserva (usando numero_habitacion directamente)
-    import datetime
 
     reservas = [
         # (dpi_huesped, numero_habitacion, estado_reserva, fecha_ingreso, fecha_salida)
@@ -154,9 +160,7 @@ def seed_data():
         if huesped and habitacion:
             id_huesped = huesped[0]
             id_habitacion = habitacion[0]
-            fecha1 = datetime.datetime.strptime(ingreso, "%Y-%m-%d")
-            fecha2 = datetime.datetime.strptime(salida, "%Y-%m-%d")                
-            noches = (fecha2 - fecha1).days
+            noches = fechas.a_dia(salida) - fechas.a_dia(ingreso)
             precio_total = habitacion[1] * noches
 
             try:
@@ -169,21 +173,111 @@ def seed_data():
         else:
             print(f"Datos no válidos para reserva: {dpi}, {num_hab}")
 
-    conn.commit()
-    conn.close()
+# =========================
+# Calendario de noches ocupadas (room_night)
+# =========================
+def crear_calendario_noches(conn):
+    """
+    Crea 'room_night' (una fila por habitación y noche ocupada) y la llena con
+    las reservas existentes. La PK (id_habitacion, noche) impide a nivel de BD
+    que dos reservas ocupen la misma noche. 'noche' es el número de día
+    entero (ver fechas.py). No hace commit.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS room_night (
+        id_habitacion INTEGER NOT NULL,
+        noche INTEGER NOT NULL,
+        id_reserva INTEGER NOT NULL,
+        PRIMARY KEY (id_habitacion, noche),
+        FOREIGN KEY (id_habitacion) REFERENCES habitacion(id_habitacion),
+        FOREIGN KEY (id_reserva) REFERENCES reserva(id_reserva) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_room_night_noche ON room_night(noche);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_room_night_reserva ON room_night(id_reserva);")
+
+    # Liberar noches al cancelar o al cambiar fechas/habitación desde cualquier escritor;
+    # las noches nuevas las inserta registrar_noches().
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_reserva_cancelada_libera_noches
+    AFTER UPDATE OF estado_reserva ON reserva
+    WHEN NEW.estado_reserva = '{ESTADO_CANCELADA}'
+    BEGIN
+        DELETE FROM room_night WHERE id_reserva = NEW.id_reserva;
+    END;
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_reserva_modificada_libera_noches
+    AFTER UPDATE OF id_habitacion, fecha_ingreso, fecha_salida ON reserva
+    BEGIN
+        DELETE FROM room_night WHERE id_reserva = NEW.id_reserva;
+    END;
+    """)
+    reconstruir_calendario_noches(conn)
+
+def reconstruir_calendario_noches(conn):
+    """
+    Vuelve a generar 'room_night' desde 'reserva' (reservas no canceladas).
+    Si hay reservas históricas solapadas, conserva la noche de la primera. No hace commit.
+    Retorna la cantidad de noches generadas.
+    """
+    cur = conn.cursor()
+    cur.execute("DELETE FROM room_night;")
+    # Se convierte el texto solo en el caso base (no depende de las columnas
+    # generadas dia_*, que llegan en una migración posterior); el resto es suma entera.
+    cur.execute(f"""
+    WITH RECURSIVE
+    estadias(id_habitacion, dia_ingreso, dia_salida, id_reserva) AS (
+        SELECT id_habitacion, {fechas.sql_dia('fecha_ingreso')}, {fechas.sql_dia('fecha_salida')}, id_reserva
+        FROM reserva
+        WHERE estado_reserva <> ?
+    ),
+    noches(id_habitacion, noche, dia_salida, id_reserva) AS (
+        SELECT id_habitacion, dia_ingreso, dia_salida, id_reserva
+        FROM estadias
+        WHERE dia_ingreso < dia_salida
+        UNION ALL
+        SELECT id_habitacion, noche + 1, dia_salida, id_reserva
+        FROM noches
+        WHERE noche + 1 < dia_salida
+    )
+    INSERT OR IGNORE INTO room_night (id_habitacion, noche, id_reserva)
+    SELECT id_habitacion, noche, id_reserva FROM noches ORDER BY id_reserva;
+    """, (ESTADO_CANCELADA,))
+    # rowcount no se informa para sentencias que inician con WITH
+    return cur.execute("SELECT COUNT(*) FROM room_night;").fetchone()[0]
+
+def noches_de_estadia(fecha_ingreso: str, fecha_salida: str):
+    """Números de día de las noches ocupadas en [fecha_ingreso, fecha_salida)."""
+    return range(fechas.a_dia(fecha_ingreso), fechas.a_dia(fecha_salida))
+
+def registrar_noches(conn, id_reserva: int, id_habitacion: int, fecha_ingreso: str, fecha_salida: str):
+    """
+    Inserta las noches de una reserva en 'room_night'. No hace commit.
+    Lanza sqlite3.IntegrityError si alguna noche ya está ocupada.
+    """
+    conn.executemany(
+        "INSERT INTO room_night (id_habitacion, noche, id_reserva) VALUES (?, ?, ?)",
+        [(id_habitacion, noche, id_reserva) for noche in noches_de_estadia(fecha_ingreso, fecha_salida)]
+    )
 
 # =========================
 # Funciones de inserción
 # =========================
-def insert_habitacion(tipo, precio, estado):
+def insert_habitacion(tipo, precio, estado, numero_habitacion=None):
+    global version_habitaciones
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO habitacion (tipo, precio_por_noche, estado) VALUES (?, ?, ?);",
-        (tipo, precio, estado)
-    )
-    conn.commit()
-    conn.close()
+    try:
+        with conexiones.unidad_de_trabajo(conn, "insert_habitacion"):
+            cursor.execute(
+                "INSERT INTO habitacion (numero_habitacion, tipo, precio_por_noche, estado) VALUES (?, ?, ?, ?);",
+                (numero_habitacion, tipo, precio, estado)
+            )
+    finally:
+        version_habitaciones += 1
+    return cursor.lastrowid
 
 def insert_huesped(conn,
                    dpi: str,
@@ -195,13 +289,15 @@ def insert_huesped(conn,
     """
     Inserta un huésped y retorna el id generado.
     Firma posicional compatible con la llamada desde crear_reserva.
+    Dentro de una transacción abierta se anida en ella sin confirmarla
+    (conexiones.unidad_de_trabajo); sin transacción, confirma la inserción.
     """
     cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO huesped (dpi, primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, nit)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (dpi, primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, nit))
-    conn.commit()
+    with conexiones.unidad_de_trabajo(conn, "insert_huesped"):
+        cur.execute("""
+            INSERT INTO huesped (dpi, primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, nit)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (dpi, primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, nit))
     return cur.lastrowid
 
 
@@ -215,19 +311,59 @@ def insert_reserva(conn,
                    fecha_salida: str,
                    precio_total: float):
     """
-    Inserta una reserva y retorna el id generado, acorde al esquema actual.
+    Inserta una reserva y sus noches en 'room_night'; retorna el id generado.
+    Reserva y noches van juntas en conexiones.unidad_de_trabajo: se anidan
+    en la transacción del llamador o, sin ella, se confirman al terminar.
     """
     cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO reserva (
-            id_huesped, dpi_huesped, id_habitacion, numero_habitacion,
-            estado_reserva, fecha_ingreso, fecha_salida, precio_total
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (id_huesped, dpi_huesped, id_habitacion, numero_habitacion,
-          estado_reserva, fecha_ingreso, fecha_salida, precio_total))
-    conn.commit()
-    return cur.lastrowid
+    with conexiones.unidad_de_trabajo(conn, "insert_reserva"):
+        cur.execute("""
+            INSERT INTO reserva (
+                id_huesped, dpi_huesped, id_habitacion, numero_habitacion,
+                estado_reserva, fecha_ingreso, fecha_salida, precio_total
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (id_huesped, dpi_huesped, id_habitacion, numero_habitacion,
+              estado_reserva, fecha_ingreso, fecha_salida, precio_total))
+        id_reserva = cur.lastrowid
+        if estado_reserva != ESTADO_CANCELADA:
+            registrar_noches(conn, id_reserva, id_habitacion, fecha_ingreso, fecha_salida)
+    return id_reserva
+
+def insert_huespedes_lote(conn, huespedes):
+    """
+    Inserta varios huéspedes (tuplas en el orden de insert_huesped, sin conn)
+    ignorando los DPI ya registrados. No hace commit.
+    """
+    conn.executemany("""
+        INSERT OR IGNORE INTO huesped (dpi, primer_nombre, segundo_nombre, primer_apellido, segundo_apellido, nit)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, huespedes)
+
+def insert_reservas_lote(conn, reservas):
+    """
+    Inserta varias reservas (tuplas en el orden de insert_reserva, sin conn) y
+    sus noches; retorna la lista de ids generados, en el mismo orden.
+    Cada id se toma de lastrowid: no se asume que sean consecutivos. No hace commit.
+    """
+    cur = conn.cursor()
+    ids = []
+    for r in reservas:
+        cur.execute("""
+            INSERT INTO reserva (
+                id_huesped, dpi_huesped, id_habitacion, numero_habitacion,
+                estado_reserva, fecha_ingreso, fecha_salida, precio_total
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, r)
+        ids.append(cur.lastrowid)
+    cur.executemany(
+        "INSERT INTO room_night (id_habitacion, noche, id_reserva) VALUES (?, ?, ?)",
+        [(r[2], noche, id_reserva)
+         for id_reserva, r in zip(ids, reservas) if r[4] != ESTADO_CANCELADA
+         for noche in noches_de_estadia(r[5], r[6])]
+    )
+    return ids
 
 # =========================
 # Funciones de consulta
@@ -237,7 +373,6 @@ def get_all_habitaciones():
     cursor = conn.cursor()
     cursor.execute("SELECT id_habitacion, numero_habitacion, tipo, precio_por_noche, estado FROM habitacion;")
     rows = cursor.fetchall()
-    conn.close()
     return rows
 
 def get_precio_por_tipo(tipo):
@@ -245,7 +380,6 @@ def get_precio_por_tipo(tipo):
     cursor = conn.cursor()
     cursor.execute("SELECT precio_por_noche FROM habitacion WHERE tipo = ? LIMIT 1;", (tipo,))
     row = cursor.fetchone()
-    conn.close()
     return row[0] if row else None
 
 def get_estado_habitacion(id_habitacion):
@@ -253,7 +387,6 @@ def get_estado_habitacion(id_habitacion):
     cursor = conn.cursor()
     cursor.execute("SELECT estado FROM habitacion WHERE id_habitacion = ?;", (id_habitacion,))
     row = cursor.fetchone()
-    conn.close()
     return row[0] if row else None
 
 def get_habitacion_por_numero(conn, numero_habitacion: str):
@@ -275,6 +408,18 @@ def get_habitacion_por_numero(conn, numero_habitacion: str):
     return cur.fetchone()
 
 
+def get_ids_huesped_por_dpi(conn, dpis):
+    """
+    Retorna {dpi: id_huesped} para los DPI dados que existan.
+    """
+    dpis = list(dpis)
+    if not dpis:
+        return {}
+    marcadores = ", ".join("?" for _ in dpis)
+    cur = conn.cursor()
+    cur.execute(f"SELECT dpi, id_huesped FROM huesped WHERE dpi IN ({marcadores})", dpis)
+    return dict(cur.fetchall())
+
 def listar_numeros_habitacion(conn):
     """
     Retorna lista de strings con los números de habitación disponibles: ['H001', 'H002', ...]
@@ -286,24 +431,134 @@ def listar_numeros_habitacion(conn):
 def validar_disponibilidad(conn, id_habitacion: int, fecha_ingreso: str, fecha_salida: str):
     """
     Verifica si la habitación está libre en el rango de fechas.
-    Retorna True si no hay reservas que se solapen.
+    Retorna True si ninguna noche de [fecha_ingreso, fecha_salida) está ocupada
+    (búsqueda por PK en 'room_night'; la fecha de salida no cuenta como noche).
     """
     cur = conn.cursor()
     cur.execute("""
         SELECT COUNT(*)
-        FROM reserva
+        FROM room_night
         WHERE id_habitacion = ?
-          AND (
-                (fecha_ingreso <= ? AND fecha_salida >= ?) OR
-                (fecha_ingreso <= ? AND fecha_salida >= ?) OR
-                (? <= fecha_ingreso AND ? >= fecha_salida)
-              )
-    """, (id_habitacion, fecha_ingreso, fecha_ingreso,
-          fecha_salida, fecha_salida,
-          fecha_ingreso, fecha_salida))
+          AND noche >= ?
+          AND noche < ?
+    """, (id_habitacion, fechas.a_dia(fecha_ingreso), fechas.a_dia(fecha_salida)))
     count = cur.fetchone()[0]
     return count == 0
 
+def buscar_habitaciones_disponibles(conn, tipo, fecha_ingreso: str, fecha_salida: str):
+    """
+    Retorna tuplas (id_habitacion, numero_habitacion, precio_por_noche) de las
+    habitaciones del tipo dado (o de todas si tipo es None) sin noches ocupadas
+    en [fecha_ingreso, fecha_salida). Una sola consulta (anti-join con 'room_night').
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT h.id_habitacion, h.numero_habitacion, h.precio_por_noche
+        FROM habitacion AS h
+        WHERE (? IS NULL OR h.tipo = ?)
+          AND NOT EXISTS (
+                SELECT 1
+                FROM room_night AS rn
+                WHERE rn.id_habitacion = h.id_habitacion
+                  AND rn.noche >= ?
+                  AND rn.noche < ?
+              )
+        ORDER BY h.numero_habitacion ASC
+    """, (tipo, tipo, fechas.a_dia(fecha_ingreso), fechas.a_dia(fecha_salida)))
+    return cur.fetchall()
+
+def contar_habitaciones_ocupadas(conn, noche: str):
+    """Cantidad de habitaciones ocupadas la noche 'YYYY-MM-DD'."""
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM room_night WHERE noche = ?", (fechas.a_dia(noche),))
+    return cur.fetchone()[0]
+
+def contar_habitaciones_libres(conn, noche: str, tipo: str = None):
+    """Cantidad de habitaciones (del tipo dado o de todos) libres la noche 'YYYY-MM-DD'."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT COUNT(*)
+        FROM habitacion AS h
+        WHERE (? IS NULL OR h.tipo = ?)
+          AND NOT EXISTS (
+                SELECT 1 FROM room_night AS rn
+                WHERE rn.id_habitacion = h.id_habitacion AND rn.noche = ?
+              )
+    """, (tipo, tipo, fechas.a_dia(noche)))
+    return cur.fetchone()[0]
+
+def listar_intervalos_reserva(conn):
+    """
+    Retorna tuplas (id_reserva, id_habitacion, fecha_ingreso, fecha_salida)
+    de todas las reservas que ocupan habitación (no canceladas).
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id_reserva, id_habitacion, fecha_ingreso, fecha_salida
+        FROM reserva
+        WHERE estado_reserva <> ?
+    """, (ESTADO_CANCELADA,))
+    return cur.fetchall()
+
+def cancelar_reserva(conn, id_reserva: int):
+    """
+    Marca la reserva como cancelada (el trigger libera sus noches en 'room_night').
+    Retorna (id_habitacion, fecha_ingreso, fecha_salida) de la reserva cancelada,
+    o None si no existe o ya estaba cancelada. Lectura y cambio van en
+    conexiones.unidad_de_trabajo (anidada en la transacción del llamador, si hay).
+    """
+    cur = conn.cursor()
+    with conexiones.unidad_de_trabajo(conn, "cancelar_reserva"):
+        cur.execute("""
+            SELECT id_habitacion, fecha_ingreso, fecha_salida
+            FROM reserva
+            WHERE id_reserva = ? AND estado_reserva <> ?
+        """, (id_reserva, ESTADO_CANCELADA))
+        row = cur.fetchone()
+        if row:
+            cur.execute("UPDATE reserva SET estado_reserva = ? WHERE id_reserva = ?",
+                        (ESTADO_CANCELADA, id_reserva))
+    return row
+
+def modificar_fechas_reserva(conn, id_reserva: int, fecha_ingreso: str, fecha_salida: str,
+                             precio_total: float):
+    """
+    Cambia las fechas y el total de una reserva no cancelada y regenera sus noches.
+    Retorna (id_habitacion, fecha_ingreso, fecha_salida) anteriores, o None si no existe.
+    Lanza sqlite3.IntegrityError si alguna noche nueva ya está ocupada; el
+    cambio se revierte completo (conexiones.unidad_de_trabajo).
+    """
+    cur = conn.cursor()
+    with conexiones.unidad_de_trabajo(conn, "modificar_fechas_reserva"):
+        cur.execute("""
+            SELECT id_habitacion, fecha_ingreso, fecha_salida
+            FROM reserva
+            WHERE id_reserva = ? AND estado_reserva <> ?
+        """, (id_reserva, ESTADO_CANCELADA))
+        row = cur.fetchone()
+        if row:
+            # El trigger de fechas libera las noches anteriores
+            cur.execute("""
+                UPDATE reserva SET fecha_ingreso = ?, fecha_salida = ?, precio_total = ?
+                WHERE id_reserva = ?
+            """, (fecha_ingreso, fecha_salida, precio_total, id_reserva))
+            registrar_noches(conn, id_reserva, row[0], fecha_ingreso, fecha_salida)
+    return row
+
+def get_reserva(conn, id_reserva: int):
+    """
+    Retorna una tupla (id_reserva, id_huesped, id_habitacion, numero_habitacion,
+    estado_reserva, fecha_ingreso, fecha_salida, precio_total) o None si no existe.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id_reserva, id_huesped, id_habitacion, numero_habitacion,
+               estado_reserva, fecha_ingreso, fecha_salida, precio_total
+        FROM reserva
+        WHERE id_reserva = ?
+    """, (id_reserva,))
+    return cur.fetchone()
+
 def get_huesped_por_dpi(conn, dpi: str):
     """
     Retorna una tupla con:
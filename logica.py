@@ -1,19 +1,22 @@
 # logica.py
 # Capa de lógica del negocio: valida usuarios y gestiona navegación entre pantallas.
 
-from typing import Tuple, Optional, Dict
-import tkinter as tk
-from tkinter import messagebox
+from typing import TYPE_CHECKING, Tuple, Optional, Dict
 
 from datos import obtener_usuario_por_credenciales
-from gui_menu import VentanaMenu
+
+if TYPE_CHECKING:
+    import tkinter as tk
+
+# gui_menu y messagebox se importan al usarse: el login no los necesita
+# para mostrarse (ver main.py).
 
 class LogicaApp:
     """
     Intermediario entre GUI y capa de datos.
     Expone métodos de validación y navegación.
     """
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: "tk.Tk"):
         self.root = root
         # Estado de sesión simple (podría evolucionar a un objeto más rico)
         self.usuario_actual: Optional[Dict] = None
@@ -46,16 +49,19 @@ class LogicaApp:
         Abre la ventana del menú principal con base en los datos del usuario autenticado.
         La ventana de menu es un Toplevel, hija de root.
         """
+        from gui_menu import VentanaMenu
         VentanaMenu(self.root, datos_usuario)
 
     def mostrar_error(self, mensaje: str) -> None:
         """
         Muestra un error de negocio en un messagebox.
         """
+        from tkinter import messagebox
         messagebox.showerror("Error de autenticación", mensaje)
 
     def mostrar_info(self, titulo: str, mensaje: str) -> None:
         """
         Muestra información general.
         """
+        from tkinter import messagebox
         messagebox.showinfo(titulo, mensaje)
@@ -1,15 +1,31 @@
 # main.pyus
 # Punto de entrada de la aplicación.
 # Inicia la raíz de Tkinter, prepara la base de datos y muestra la ventana de login.
+# Los módulos (Reservaciones, Restaurante, Reportes) se importan recién al
+# pulsar su botón en el menú; aquí solo se carga lo necesario para el login.
+# La duración de cada fase del arranque queda en arranque.log.
+
+import time
+
+_INICIO = time.perf_counter()  # antes de las importaciones, para medirlas
 
 import tkinter as tk
+from arranque import TiemposArranque, preparar_bd
+from datos import DB_PATH
 from logica import LogicaApp
 from gui_login import VentanaLogin
-from datos import seed_usuario   # <-- Importamos la función de inicialización
 
 def main():
-    # Inicializa la base de datos y usuarios semilla
-    seed_usuario()
+    tiempos = TiemposArranque(_INICIO)
+    tiempos.marcar("importar")
+
+    # Esquema y usuarios semilla: si la BD está al día solo se lee user_version
+    try:
+        al_dia = preparar_bd(DB_PATH)
+        tiempos.marcar("bd", "al día" if al_dia else "migrada")
+    except Exception as e:
+        print(f"[ERROR] preparar_bd: {e}")
+        tiempos.marcar("bd", "error")
 
     root = tk.Tk()
     root.title("Mayan Sunset - Inicio")
@@ -20,7 +36,14 @@ def main():
     logica = LogicaApp(root)
 
     # Crea la ventana de login como Toplevel (hija de root)
-    VentanaLogin(root, logica)
+    login = VentanaLogin(root, logica)
+
+    # Fin del arranque: la ventana de login ya es visible
+    def _al_mostrarse(event):
+        if event.widget is login and tiempos.fases[-1][0] != "primera_ventana":
+            tiempos.marcar("primera_ventana")
+            tiempos.registrar()
+    login.bind("<Map>", _al_mostrarse, add="+")
 
     # Muestra el loop principal
     root.mainloop()
@@ -0,0 +1,74 @@
+# mantenimiento.py
+# Comandos de mantenimiento de la BD, ejecutables sin GUI.
+#
+# Uso:
+#   python mantenimiento.py migrar [--db mayan_sunset.db]
+#   python mantenimiento.py reconstruir-noches [--db mayan_sunset.db]
+#   python mantenimiento.py reconstruir-ventas [--db mayan_sunset.db]
+
+import argparse
+import sqlite3
+
+import hotel_db
+import migraciones
+import restaurante_db
+
+
+def migrar(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        version = migraciones.migrar(conn)
+    finally:
+        conn.close()
+    print(f"Esquema en versión {version}.")
+
+
+def reconstruir_noches(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        migraciones.migrar(conn)
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            total = hotel_db.reconstruir_calendario_noches(conn)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+    print(f"room_night reconstruida: {total} noches ocupadas.")
+
+
+def reconstruir_ventas(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        migraciones.migrar(conn)
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            total = restaurante_db.reconstruir_ventas_diarias(conn)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+    print(f"ventas_diarias reconstruida: {total} filas (día, plato, método de pago).")
+
+
+COMANDOS = {
+    "migrar": migrar,
+    "reconstruir-noches": reconstruir_noches,
+    "reconstruir-ventas": reconstruir_ventas,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mantenimiento de la BD de Mayan Sunset.")
+    parser.add_argument("comando", choices=sorted(COMANDOS))
+    parser.add_argument("--db", default=hotel_db.DB_PATH, help="ruta del archivo SQLite")
+    args = parser.parse_args()
+    COMANDOS[args.comando](args.db)
+
+
+if __name__ == "__main__":
+    main()
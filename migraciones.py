@@ -0,0 +1,153 @@
+# migraciones.py
+# Migraciones versionadas del esquema de mayan_sunset.db.
+# La versión aplicada se guarda en PRAGMA user_version; cada migración se
+# aplica una sola vez, en orden, dentro de su propia transacción.
+# Tras la primera apertura, migrar() solo cuesta leer user_version.
+
+import sqlite3
+from typing import Callable, List, Tuple
+
+import datos
+import fechas
+import hotel_db
+import restaurante_db
+import version_esquema
+
+
+def _indices_consultas(conn: sqlite3.Connection) -> None:
+    # reserva(dpi_huesped) ya está cubierto por el índice automático de
+    # UNIQUE (dpi_huesped, numero_habitacion, fecha_ingreso), que inicia por esa columna.
+    cur = conn.cursor()
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reserva_habitacion_fechas "
+                "ON reserva(id_habitacion, fecha_ingreso, fecha_salida);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_habitacion_tipo ON habitacion(tipo);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_detalle_pedidos_pedido ON detalle_pedidos(id_pedido);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_fecha ON pedidos(fecha_pedido);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transacciones_pedido ON transacciones(id_pedido);")
+
+
+def _indices_reportes(conn: sqlite3.Connection) -> None:
+    # Los reportes filtran ventas por fecha; la ocupación usa la PK de room_night.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transacciones_fecha "
+                 "ON transacciones(fecha_transaccion, id_pedido, monto_total);")
+
+
+# Columnas de fecha que reciben un número de día entero generado (tabla, texto, día).
+COLUMNAS_DIA = [
+    ("reserva", "fecha_ingreso", "dia_ingreso"),
+    ("reserva", "fecha_salida", "dia_salida"),
+    ("pedidos", "fecha_pedido", "dia_pedido"),
+    ("transacciones", "fecha_transaccion", "dia_transaccion"),
+]
+
+
+def _dias_enteros(conn: sqlite3.Connection) -> None:
+    # Columnas VIRTUAL: no reescriben las tablas y se mantienen solas en cada
+    # INSERT/UPDATE; los índices sí guardan el entero ya calculado.
+    cur = conn.cursor()
+    for tabla, columna, dia in COLUMNAS_DIA:
+        cur.execute(f"ALTER TABLE {tabla} ADD COLUMN {dia} INTEGER "
+                    f"GENERATED ALWAYS AS ({fechas.sql_dia(columna)}) VIRTUAL;")
+
+    cur.execute("DROP INDEX IF EXISTS idx_reserva_habitacion_fechas;")
+    cur.execute("DROP INDEX IF EXISTS idx_pedidos_fecha;")
+    cur.execute("DROP INDEX IF EXISTS idx_transacciones_fecha;")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reserva_habitacion_dias "
+                "ON reserva(id_habitacion, dia_ingreso, dia_salida);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_dia ON pedidos(dia_pedido);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transacciones_dia "
+                "ON transacciones(dia_transaccion, id_pedido, monto_total);")
+
+    # room_night debe quedar con 'noche' como número de día. En una BD que ya
+    # tenía la migración 6 aplicada (antes de este cambio), la tabla guarda
+    # noches 'YYYY-MM-DD'; en una BD nueva la migración 6 ya la creó con
+    # números de día (llama al crear_calendario_noches actual). En ambos
+    # casos se borra y se regenera desde las reservas.
+    cur.execute("DROP TABLE IF EXISTS room_night;")
+    hotel_db.crear_calendario_noches(conn)
+
+
+def _indices_historial(conn: sqlite3.Connection) -> None:
+    # El historial pagina por (dia_pedido, id_pedido); sin filtro de habitación
+    # alcanza idx_pedidos_dia (que ya incluye el rowid), con filtro se usa este.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_habitacion_dia ON pedidos(id_habitacion, dia_pedido);")
+
+
+# (versión, descripción, función que recibe la conexión). Solo se agregan al final.
+MIGRACIONES: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "Esquema Hotel", hotel_db.crear_esquema),
+    (2, "Datos iniciales Hotel", hotel_db.insertar_datos_iniciales),
+    (3, "Esquema Restaurante", restaurante_db.crear_esquema),
+    (4, "Datos iniciales Restaurante", restaurante_db.insertar_datos_iniciales),
+    (5, "Índices de consultas frecuentes", _indices_consultas),
+    # La 6 usa el crear_calendario_noches actual (noches como número de día
+    # desde la 8); las BD que la aplicaron antes tienen noches de texto y la 8
+    # regenera la tabla. No volver a cambiar lo que hace una migración ya
+    # publicada: los cambios de esquema van en una migración nueva al final.
+    (6, "Calendario de noches ocupadas (room_night)", hotel_db.crear_calendario_noches),
+    (7, "Índices de reportes", _indices_reportes),
+    (8, "Números de día enteros en reservas, pedidos y transacciones", _dias_enteros),
+    (9, "Recetas de platos", restaurante_db.crear_tabla_recetas),
+    (10, "Inventario con cantidades fraccionarias (REAL)", restaurante_db.inventario_cantidades_reales),
+    (11, "Alertas incrementales de bajo stock", restaurante_db.crear_alertas_stock),
+    (12, "Índice del historial de pedidos por habitación", _indices_historial),
+    (13, "Resúmenes diarios de ventas del restaurante", restaurante_db.crear_ventas_diarias),
+    (14, "Pedidos vinculados a la reserva activa", restaurante_db.vincular_pedidos_reservas),
+    (15, "Tabla Usuario y usuarios semilla", datos.crear_tabla_usuario),
+    (16, "Resúmenes de ventas: una transacción por pedido y líneas corregidas", restaurante_db.corregir_triggers_ventas),
+]
+
+# Migraciones que reconstruyen tablas referenciadas por claves foráneas
+# (CREATE nueva + DROP + RENAME). Se aplican con PRAGMA foreign_keys = OFF,
+# que solo tiene efecto fuera de una transacción; cada una verifica sus
+# referencias con PRAGMA foreign_key_check antes del commit.
+RECONSTRUYEN_TABLAS = {10}
+
+ULTIMA_VERSION = MIGRACIONES[-1][0]
+if ULTIMA_VERSION != version_esquema.ULTIMA_VERSION:
+    raise RuntimeError(f"version_esquema.ULTIMA_VERSION ({version_esquema.ULTIMA_VERSION}) "
+                       f"no coincide con la última migración ({ULTIMA_VERSION}).")
+
+
+def version_actual(conn: sqlite3.Connection) -> int:
+    """Retorna la versión de esquema registrada en la BD (0 si nunca se migró)."""
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrar(conn: sqlite3.Connection) -> int:
+    """
+    Aplica las migraciones pendientes y retorna la versión final.
+    'conn' no debe tener una transacción abierta.
+    Es seguro ante varios procesos: cada paso vuelve a leer la versión bajo
+    BEGIN IMMEDIATE y omite lo que otro proceso ya aplicó.
+    """
+    version = version_actual(conn)
+    if version >= ULTIMA_VERSION:
+        return version
+
+    for numero, descripcion, aplicar in MIGRACIONES:
+        if numero <= version:
+            continue
+        restaurar_fk = numero in RECONSTRUYEN_TABLAS and conn.execute("PRAGMA foreign_keys;").fetchone()[0]
+        if restaurar_fk:
+            conn.execute("PRAGMA foreign_keys = OFF;")
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            version = version_actual(conn)
+            if numero <= version:
+                conn.rollback()
+                continue
+            aplicar(conn)
+            conn.execute(f"PRAGMA user_version = {int(numero)};")
+            conn.commit()
+            version = numero
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise RuntimeError(f"Error en migración {numero} ({descripcion}): {e}") from e
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if restaurar_fk:
+                conn.execute("PRAGMA foreign_keys = ON;")
+    return version
@@ -0,0 +1,161 @@
+# reportes.py
+# Reportes gerenciales: ocupación, ADR, RevPAR e ingresos del restaurante.
+# Cada indicador se calcula con agregados SQL sobre el período completo
+# (sin recorrer reservas en Python), apoyándose en room_night y en el resumen
+# diario de cobros del restaurante.
+# Puede usarse desde la GUI (gui_reportes.py) o desde línea de comandos:
+#
+#   python reportes.py --desde 2025-01-01 --hasta 2025-12-31 [--formato json|csv] [--db ruta]
+
+import argparse
+import csv
+import json
+import sys
+from typing import Dict, List, Tuple
+
+import fechas
+import hotel_db
+import migraciones
+
+
+def _validar_periodo(fecha_desde: str, fecha_hasta: str) -> Tuple[int, int]:
+    """Valida el período (ambos extremos inclusive) y retorna sus números de día."""
+    try:
+        desde = fechas.a_dia(fecha_desde)
+        hasta = fechas.a_dia(fecha_hasta)
+    except ValueError:
+        raise ValueError("Formato de fecha inválido (use YYYY-MM-DD)")
+    if hasta < desde:
+        raise ValueError("La fecha final debe ser igual o posterior a la inicial")
+    return desde, hasta
+
+
+def _redondear(valor: float) -> float:
+    return round(valor or 0.0, 2)
+
+
+def ocupacion_por_tipo(conn, fecha_desde: str, fecha_hasta: str) -> List[Dict]:
+    """
+    Indicadores de habitaciones por tipo en [fecha_desde, fecha_hasta].
+    El ingreso de cada reserva se reparte en partes iguales entre sus noches,
+    de modo que solo cuentan las noches que caen dentro del período.
+    """
+    desde, hasta = _validar_periodo(fecha_desde, fecha_hasta)
+    dias = hasta - desde + 1
+    filas = conn.execute("""
+        SELECT h.tipo,
+               COUNT(DISTINCT h.id_habitacion) AS habitaciones,
+               COUNT(n.noche) AS noches_vendidas,
+               COALESCE(SUM(r.precio_total / (r.dia_salida - r.dia_ingreso)), 0)
+                   AS ingreso
+        FROM habitacion AS h
+        LEFT JOIN room_night AS n
+               ON n.id_habitacion = h.id_habitacion
+              AND n.noche BETWEEN ? AND ?
+        LEFT JOIN reserva AS r ON r.id_reserva = n.id_reserva
+        GROUP BY h.tipo
+        ORDER BY h.tipo;
+    """, (desde, hasta)).fetchall()
+
+    resultado = []
+    for tipo, habitaciones, vendidas, ingreso in filas:
+        disponibles = habitaciones * dias
+        resultado.append({
+            "tipo": tipo,
+            "habitaciones": habitaciones,
+            "noches_disponibles": disponibles,
+            "noches_vendidas": vendidas,
+            "ingreso_habitaciones": _redondear(ingreso),
+            "tasa_ocupacion": _redondear(100.0 * vendidas / disponibles) if disponibles else 0.0,
+            "adr": _redondear(ingreso / vendidas) if vendidas else 0.0,
+            "revpar": _redondear(ingreso / disponibles) if disponibles else 0.0,
+        })
+    return resultado
+
+
+def ventas_restaurante(conn, fecha_desde: str, fecha_hasta: str) -> Dict:
+    """
+    Ingreso del restaurante, pedidos cobrados y ticket promedio en el período.
+    Lee el resumen cobros_diarios (una fila por día y método de pago), que los
+    triggers mantienen al registrar cada transacción (un cobro por pedido).
+    """
+    desde, hasta = _validar_periodo(fecha_desde, fecha_hasta)
+    pedidos, ingreso = conn.execute("""
+        SELECT COALESCE(SUM(transacciones), 0), COALESCE(SUM(monto_total), 0)
+        FROM cobros_diarios
+        WHERE dia BETWEEN ? AND ?;
+    """, (desde, hasta)).fetchone()
+    return {
+        "pedidos_cobrados": pedidos,
+        "ingreso_restaurante": _redondear(ingreso),
+        "ticket_promedio": _redondear(ingreso / pedidos) if pedidos else 0.0,
+    }
+
+
+def reporte_general(fecha_desde: str, fecha_hasta: str, conn=None) -> Dict:
+    """
+    Reporte consolidado del período [fecha_desde, fecha_hasta] (ambos inclusive):
+    - tasa_ocupacion: noches vendidas / noches disponibles (%)
+    - adr: ingreso de habitaciones / noches vendidas
+    - revpar: ingreso de habitaciones / noches disponibles
+    - ingreso_restaurante y ticket_promedio
+    - por_tipo: los mismos indicadores de habitaciones por tipo
+    Lanza ValueError si el período es inválido.
+    """
+    if conn is None:
+        conn = hotel_db.get_connection()
+    desde, hasta = _validar_periodo(fecha_desde, fecha_hasta)
+    por_tipo = ocupacion_por_tipo(conn, fecha_desde, fecha_hasta)
+    disponibles = sum(t["noches_disponibles"] for t in por_tipo)
+    vendidas = sum(t["noches_vendidas"] for t in por_tipo)
+    ingreso = sum(t["ingreso_habitaciones"] for t in por_tipo)
+
+    reporte = {
+        "fecha_desde": fecha_desde,
+        "fecha_hasta": fecha_hasta,
+        "dias": hasta - desde + 1,
+        "habitaciones": sum(t["habitaciones"] for t in por_tipo),
+        "noches_disponibles": disponibles,
+        "noches_vendidas": vendidas,
+        "ingreso_habitaciones": _redondear(ingreso),
+        "tasa_ocupacion": _redondear(100.0 * vendidas / disponibles) if disponibles else 0.0,
+        "adr": _redondear(ingreso / vendidas) if vendidas else 0.0,
+        "revpar": _redondear(ingreso / disponibles) if disponibles else 0.0,
+    }
+    reporte.update(ventas_restaurante(conn, fecha_desde, fecha_hasta))
+    reporte["por_tipo"] = por_tipo
+    return reporte
+
+
+def escribir_csv(reporte: Dict, salida) -> None:
+    """Escribe el reporte como CSV: una fila 'Total' y una por tipo de habitación."""
+    columnas = ["tipo", "habitaciones", "noches_disponibles", "noches_vendidas",
+                "ingreso_habitaciones", "tasa_ocupacion", "adr", "revpar"]
+    escritor = csv.DictWriter(salida, fieldnames=columnas, extrasaction="ignore")
+    escritor.writeheader()
+    escritor.writerow(dict(reporte, tipo="Total"))
+    escritor.writerows(reporte["por_tipo"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reportes de ocupación y ventas de Mayan Sunset.")
+    parser.add_argument("--desde", required=True, help="fecha inicial YYYY-MM-DD (inclusive)")
+    parser.add_argument("--hasta", required=True, help="fecha final YYYY-MM-DD (inclusive)")
+    parser.add_argument("--formato", choices=("json", "csv"), default="json")
+    parser.add_argument("--db", default=hotel_db.DB_PATH, help="ruta del archivo SQLite")
+    args = parser.parse_args()
+
+    hotel_db.DB_PATH = args.db
+    try:
+        migraciones.migrar(hotel_db.get_connection())
+        reporte = reporte_general(args.desde, args.hasta)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    if args.formato == "csv":
+        escribir_csv(reporte, sys.stdout)
+    else:
+        print(json.dumps(reporte, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
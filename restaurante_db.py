@@ -4,103 +4,612 @@ Gestiona SQLite, creación de tablas, inserción de datos iniciales y operacione
 """
 
 import sqlite3
+import threading
+from contextlib import contextmanager
 from typing import List, Dict, Optional, Tuple
 
+import conexiones
+import fechas
+
+
+ESQUEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS menu (
+        id_plato INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre_plato TEXT NOT NULL,
+        descripcion TEXT,
+        precio REAL NOT NULL,
+        tipo TEXT NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pedidos (
+        id_pedido INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_habitacion INTEGER NOT NULL,
+        fecha_pedido TEXT NOT NULL,
+        hora_pedido TEXT NOT NULL,
+        estado TEXT NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS detalle_pedidos (
+        id_detalle_pedido INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_pedido INTEGER NOT NULL,
+        id_plato INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        precio_unitario REAL NOT NULL,
+        FOREIGN KEY (id_pedido) REFERENCES pedidos(id_pedido),
+        FOREIGN KEY (id_plato) REFERENCES menu(id_plato)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS inventario (
+        id_ingrediente INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre_ingrediente TEXT NOT NULL,
+        cantidad INTEGER NOT NULL,
+        unidad_medida TEXT NOT NULL,
+        stock_minimo INTEGER NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transacciones (
+        id_transaccion INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_pedido INTEGER NOT NULL,
+        fecha_transaccion TEXT NOT NULL,
+        monto_total REAL NOT NULL,
+        metodo_pago TEXT,
+        FOREIGN KEY (id_pedido) REFERENCES pedidos(id_pedido)
+    );
+    """,
+]
+
+MENU_INICIAL = [
+    ("Tacos al Pastor",
+     "Tacos de cerdo marinado con piña y cilantro.", 15.50, "Principal"),
+    ("Enchiladas Suizas",
+     "Tortillas de maíz rellenas de pollo, cubiertas con salsa verde y queso.", 12.00, "Principal"),
+    ("Guacamole con Totopos",
+     "Aguacate machacado con tomate, cebolla, cilantro y un toque de limón.", 8.75, "Entrada"),
+    ("Sopa de Tortilla",
+     "Caldo de tomate con tiras de tortilla frita, queso y aguacate.", 7.50, "Entrada"),
+    ("Cochinita Pibil",
+     "Carne de cerdo marinada en achiote, cocinada lentamente y servida con cebolla morada.", 18.00, "Principal"),
+    ("Agua de Jamaica",
+     "Bebida refrescante hecha de la flor de hibisco.", 4.00, "Bebida"),
+]
+
+INVENTARIO_INICIAL = [
+    ("Aguacate", 50, "unidades", 10),
+    ("Pollo", 20, "kg", 5),
+    ("Maíz", 100, "kg", 20),
+    ("Cilantro", 10, "kg", 2),
+    ("Piña", 30, "unidades", 5),
+    ("Carne de Cerdo", 25, "kg", 5),
+]
+
+DECIMALES_CANTIDAD = 3  # inventario.cantidad se guarda redondeada a milésimas (g en kg)
+
+# Consumo de ingredientes por unidad de plato (kg o unidades), por nombre.
+RECETAS_INICIALES = {
+    "Tacos al Pastor": {"Carne de Cerdo": 0.20, "Piña": 0.10, "Cilantro": 0.05},
+    "Enchiladas Suizas": {"Pollo": 0.25, "Maíz": 0.20, "Cilantro": 0.03},
+    "Guacamole con Totopos": {"Aguacate": 1.00, "Maíz": 0.10, "Cilantro": 0.02},
+    "Sopa de Tortilla": {"Maíz": 0.15, "Aguacate": 0.20, "Cilantro": 0.02},
+    "Cochinita Pibil": {"Carne de Cerdo": 0.30, "Cilantro": 0.03},
+    "Agua de Jamaica": {},  # sin ingredientes del inventario controlado
+}
+
+
+def crear_esquema(conn: sqlite3.Connection) -> None:
+    """
+    Crea las tablas del módulo Restaurante sobre 'conn' (idempotente).
+    No hace commit: lo usa el runner de migraciones dentro de su transacción.
+    """
+    cur = conn.cursor()
+    for sentencia in ESQUEMA_SQL:
+        cur.execute(sentencia)
+
+
+def insertar_datos_iniciales(conn: sqlite3.Connection) -> None:
+    """
+    Inserta 'menu' e 'inventario' iniciales si las tablas están vacías. No hace commit.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM menu;")
+    if cur.fetchone()[0] == 0:
+        cur.executemany(
+            "INSERT INTO menu (nombre_plato, descripcion, precio, tipo) VALUES (?, ?, ?, ?);",
+            MENU_INICIAL,
+        )
+
+    cur.execute("SELECT COUNT(*) FROM inventario;")
+    if cur.fetchone()[0] == 0:
+        cur.executemany(
+            "INSERT INTO inventario (nombre_ingrediente, cantidad, unidad_medida, stock_minimo) VALUES (?, ?, ?, ?);",
+            INVENTARIO_INICIAL,
+        )
+
+
+def crear_tabla_recetas(conn: sqlite3.Connection) -> None:
+    """
+    Crea 'receta' (consumo de cada ingrediente por unidad de plato) y carga
+    RECETAS_INICIALES para los platos e ingredientes existentes. No hace commit.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS receta (
+        id_plato INTEGER NOT NULL,
+        id_ingrediente INTEGER NOT NULL,
+        consumo REAL NOT NULL CHECK (consumo > 0),
+        PRIMARY KEY (id_plato, id_ingrediente),
+        FOREIGN KEY (id_plato) REFERENCES menu(id_plato) ON DELETE CASCADE,
+        FOREIGN KEY (id_ingrediente) REFERENCES inventario(id_ingrediente)
+    ) WITHOUT ROWID;
+    """)
+    cur.executemany("""
+        INSERT OR IGNORE INTO receta (id_plato, id_ingrediente, consumo)
+        SELECT m.id_plato, i.id_ingrediente, ?
+        FROM menu AS m, inventario AS i
+        WHERE m.nombre_plato = ? AND i.nombre_ingrediente = ?;
+    """, [(consumo, plato, ingrediente)
+          for plato, receta in RECETAS_INICIALES.items()
+          for ingrediente, consumo in receta.items()])
+
+
+def inventario_cantidades_reales(conn: sqlite3.Connection) -> None:
+    """
+    Reconstruye 'inventario' con cantidad y stock_minimo REAL (antes INTEGER,
+    aunque se guardaban kg fraccionarios) y CHECK (cantidad >= 0).
+    Debe ejecutarse con PRAGMA foreign_keys = OFF ('receta' la referencia). No hace commit.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE inventario_nuevo (
+        id_ingrediente INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre_ingrediente TEXT NOT NULL,
+        cantidad REAL NOT NULL CHECK (cantidad >= 0),
+        unidad_medida TEXT NOT NULL,
+        stock_minimo REAL NOT NULL
+    );
+    """)
+    cur.execute(f"""
+    INSERT INTO inventario_nuevo (id_ingrediente, nombre_ingrediente, cantidad, unidad_medida, stock_minimo)
+    SELECT id_ingrediente, nombre_ingrediente, MAX(ROUND(cantidad, {DECIMALES_CANTIDAD}), 0), unidad_medida, stock_minimo
+    FROM inventario;
+    """)
+    cur.execute("DROP TABLE inventario;")
+    cur.execute("ALTER TABLE inventario_nuevo RENAME TO inventario;")
+    violaciones = cur.execute("PRAGMA foreign_key_check(receta);").fetchall()
+    if violaciones:
+        raise sqlite3.IntegrityError(f"receta quedó con {len(violaciones)} referencias inválidas")
+
+
+def crear_alertas_stock(conn: sqlite3.Connection) -> None:
+    """
+    Mantiene el bajo stock de forma incremental:
+    - 'alerta_stock' recibe una fila (vía triggers) cada vez que un ingrediente
+      cruza hacia abajo su stock mínimo; id_alerta sirve de marca para
+      consultar solo las alertas nuevas (ver get_alertas_stock_desde).
+    - idx_inventario_bajo_stock es un índice parcial que contiene solo los
+      ingredientes bajo el mínimo, para get_bajo_stock sin recorrer inventario.
+    No hace commit.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS alerta_stock (
+        id_alerta INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_ingrediente INTEGER NOT NULL,
+        cantidad REAL NOT NULL,
+        stock_minimo REAL NOT NULL,
+        fecha TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+        FOREIGN KEY (id_ingrediente) REFERENCES inventario(id_ingrediente)
+    );
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_inventario_cruza_minimo
+    AFTER UPDATE OF cantidad, stock_minimo ON inventario
+    WHEN NEW.cantidad < NEW.stock_minimo AND OLD.cantidad >= OLD.stock_minimo
+    BEGIN
+        INSERT INTO alerta_stock (id_ingrediente, cantidad, stock_minimo)
+        VALUES (NEW.id_ingrediente, NEW.cantidad, NEW.stock_minimo);
+    END;
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_inventario_nuevo_bajo_minimo
+    AFTER INSERT ON inventario
+    WHEN NEW.cantidad < NEW.stock_minimo
+    BEGIN
+        INSERT INTO alerta_stock (id_ingrediente, cantidad, stock_minimo)
+        VALUES (NEW.id_ingrediente, NEW.cantidad, NEW.stock_minimo);
+    END;
+    """)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_inventario_bajo_stock
+    ON inventario(nombre_ingrediente) WHERE cantidad < stock_minimo;
+    """)
+
+
+def crear_ventas_diarias(conn: sqlite3.Connection) -> None:
+    """
+    Resúmenes de ventas por día, mantenidos por triggers en la misma transacción
+    que registra las ventas (record_transaccion / add_detalle_pedido):
+    - ventas_diarias (dia, id_plato, metodo_pago): unidades e ingreso (sin servicio)
+      de cada plato, según el día y método de pago de la transacción del pedido.
+    - cobros_diarios (dia, metodo_pago): transacciones y monto cobrado (con servicio).
+    'dia' es el número de día de fecha_transaccion (fechas.py); un método de pago
+    nulo se guarda como ''. Carga el historial existente. No hace commit.
+    Los triggers se rehacen en corregir_triggers_ventas (migración 16).
+    """
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS ventas_diarias (
+        dia INTEGER NOT NULL,
+        id_plato INTEGER NOT NULL,
+        metodo_pago TEXT NOT NULL,
+        unidades INTEGER NOT NULL,
+        ingreso REAL NOT NULL,
+        PRIMARY KEY (dia, id_plato, metodo_pago)
+    ) WITHOUT ROWID;
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS cobros_diarios (
+        dia INTEGER NOT NULL,
+        metodo_pago TEXT NOT NULL,
+        transacciones INTEGER NOT NULL,
+        monto_total REAL NOT NULL,
+        PRIMARY KEY (dia, metodo_pago)
+    ) WITHOUT ROWID;
+    """)
+    # Al cobrar: el pedido entra al resumen con el día y método de la transacción
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_transaccion_resume_ventas
+    AFTER INSERT ON transacciones
+    BEGIN
+        INSERT INTO cobros_diarios (dia, metodo_pago, transacciones, monto_total)
+        VALUES (NEW.dia_transaccion, COALESCE(NEW.metodo_pago, ''), 1, NEW.monto_total)
+        ON CONFLICT (dia, metodo_pago) DO UPDATE SET
+            transacciones = transacciones + 1,
+            monto_total = monto_total + excluded.monto_total;
+        INSERT INTO ventas_diarias (dia, id_plato, metodo_pago, unidades, ingreso)
+        SELECT NEW.dia_transaccion, id_plato, COALESCE(NEW.metodo_pago, ''),
+               SUM(cantidad), SUM(cantidad * precio_unitario)
+        FROM detalle_pedidos WHERE id_pedido = NEW.id_pedido
+        GROUP BY id_plato
+        ON CONFLICT (dia, id_plato, metodo_pago) DO UPDATE SET
+            unidades = unidades + excluded.unidades,
+            ingreso = ingreso + excluded.ingreso;
+    END;
+    """)
+    # Líneas agregadas a un pedido ya cobrado
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_detalle_resume_ventas
+    AFTER INSERT ON detalle_pedidos
+    BEGIN
+        INSERT INTO ventas_diarias (dia, id_plato, metodo_pago, unidades, ingreso)
+        SELECT t.dia_transaccion, NEW.id_plato, COALESCE(t.metodo_pago, ''),
+               NEW.cantidad, NEW.cantidad * NEW.precio_unitario
+        FROM transacciones AS t WHERE t.id_pedido = NEW.id_pedido
+        ON CONFLICT (dia, id_plato, metodo_pago) DO UPDATE SET
+            unidades = unidades + excluded.unidades,
+            ingreso = ingreso + excluded.ingreso;
+    END;
+    """)
+    reconstruir_ventas_diarias(conn)
+
+
+def reconstruir_ventas_diarias(conn: sqlite3.Connection) -> int:
+    """
+    Recalcula ventas_diarias y cobros_diarios desde detalle_pedidos y
+    transacciones (historial completo). Retorna la cantidad de filas de
+    ventas_diarias. No hace commit.
+    """
+    cur = conn.cursor()
+    cur.execute("DELETE FROM ventas_diarias;")
+    cur.execute("DELETE FROM cobros_diarios;")
+    cur.execute("""
+    INSERT INTO cobros_diarios (dia, metodo_pago, transacciones, monto_total)
+    SELECT dia_transaccion, COALESCE(metodo_pago, ''), COUNT(*), SUM(monto_total)
+    FROM transacciones
+    WHERE dia_transaccion IS NOT NULL
+    GROUP BY 1, 2;
+    """)
+    # Cada pedido cuenta una sola vez: con el día y método de su primera transacción
+    cur.execute("""
+    INSERT INTO ventas_diarias (dia, id_plato, metodo_pago, unidades, ingreso)
+    SELECT t.dia_transaccion, d.id_plato, COALESCE(t.metodo_pago, ''),
+           SUM(d.cantidad), SUM(d.cantidad * d.precio_unitario)
+    FROM transacciones AS t
+    JOIN detalle_pedidos AS d ON d.id_pedido = t.id_pedido
+    WHERE t.dia_transaccion IS NOT NULL
+      AND t.id_transaccion = (SELECT MIN(id_transaccion) FROM transacciones WHERE id_pedido = t.id_pedido)
+    GROUP BY 1, 2, 3;
+    """)
+    return cur.execute("SELECT COUNT(*) FROM ventas_diarias;").fetchone()[0]
+
+
+# Primera transacción del pedido de la línea 'fila' (NEW u OLD) en los triggers
+_PRIMERA_TRANSACCION = """
+    SELECT dia_transaccion, COALESCE(metodo_pago, '') AS metodo_pago FROM transacciones
+    WHERE id_pedido = {fila}.id_pedido AND dia_transaccion IS NOT NULL
+    ORDER BY id_transaccion LIMIT 1
+"""
+
+
+def corregir_triggers_ventas(conn: sqlite3.Connection) -> None:
+    """
+    Rehace los triggers de ventas_diarias (migración 13) para que:
+    - las líneas de un pedido se sumen una sola vez, con el día y método de
+      pago de su primera transacción, aunque el pedido tenga varias;
+    - la modificación o eliminación de líneas de detalle_pedidos se refleje
+      en el resumen (las filas que quedan en cero se eliminan).
+    cobros_diarios sigue contando cada transacción. Las transacciones solo se
+    agregan (record_transaccion); si se corrigen o eliminan a mano, regenerar
+    los resúmenes con reconstruir_ventas_diarias (mantenimiento.py
+    reconstruir-ventas). Recalcula los resúmenes. No hace commit.
+    """
+    cur = conn.cursor()
+    cur.execute("DROP TRIGGER IF EXISTS trg_transaccion_resume_ventas;")
+    cur.execute("DROP TRIGGER IF EXISTS trg_detalle_resume_ventas;")
+    # Al cobrar: el pedido entra al resumen solo con su primera transacción
+    cur.execute("""
+    CREATE TRIGGER trg_transaccion_resume_ventas
+    AFTER INSERT ON transacciones
+    BEGIN
+        INSERT INTO cobros_diarios (dia, metodo_pago, transacciones, monto_total)
+        VALUES (NEW.dia_transaccion, COALESCE(NEW.metodo_pago, ''), 1, NEW.monto_total)
+        ON CONFLICT (dia, metodo_pago) DO UPDATE SET
+            transacciones = transacciones + 1,
+            monto_total = monto_total + excluded.monto_total;
+        INSERT INTO ventas_diarias (dia, id_plato, metodo_pago, unidades, ingreso)
+        SELECT NEW.dia_transaccion, id_plato, COALESCE(NEW.metodo_pago, ''),
+               SUM(cantidad), SUM(cantidad * precio_unitario)
+        FROM detalle_pedidos
+        WHERE id_pedido = NEW.id_pedido
+          AND NOT EXISTS (SELECT 1 FROM transacciones
+                          WHERE id_pedido = NEW.id_pedido AND id_transaccion < NEW.id_transaccion)
+        GROUP BY id_plato
+        ON CONFLICT (dia, id_plato, metodo_pago) DO UPDATE SET
+            unidades = unidades + excluded.unidades,
+            ingreso = ingreso + excluded.ingreso;
+    END;
+    """)
+    # Líneas agregadas a un pedido ya cobrado
+    cur.execute(f"""
+    CREATE TRIGGER trg_detalle_resume_ventas
+    AFTER INSERT ON detalle_pedidos
+    BEGIN
+        INSERT INTO ventas_diarias (dia, id_plato, metodo_pago, unidades, ingreso)
+        SELECT t.dia_transaccion, NEW.id_plato, t.metodo_pago,
+               NEW.cantidad, NEW.cantidad * NEW.precio_unitario
+        FROM ({_PRIMERA_TRANSACCION.format(fila="NEW")}) AS t
+        WHERE true
+        ON CONFLICT (dia, id_plato, metodo_pago) DO UPDATE SET
+            unidades = unidades + excluded.unidades,
+            ingreso = ingreso + excluded.ingreso;
+    END;
+    """)
+    # Líneas corregidas: se descuenta la versión anterior y se suma la nueva
+    descontar_old = f"""
+        UPDATE ventas_diarias SET
+            unidades = unidades - OLD.cantidad,
+            ingreso = ingreso - OLD.cantidad * OLD.precio_unitario
+        WHERE id_plato = OLD.id_plato
+          AND (dia, metodo_pago) IN ({_PRIMERA_TRANSACCION.format(fila="OLD")});
+        DELETE FROM ventas_diarias
+        WHERE id_plato = OLD.id_plato AND unidades = 0
+          AND (dia, metodo_pago) IN ({_PRIMERA_TRANSACCION.format(fila="OLD")});
+    """
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_detalle_corrige_ventas
+    AFTER UPDATE OF id_pedido, id_plato, cantidad, precio_unitario ON detalle_pedidos
+    BEGIN
+        {descontar_old}
+        INSERT INTO ventas_diarias (dia, id_plato, metodo_pago, unidades, ingreso)
+        SELECT t.dia_transaccion, NEW.id_plato, t.metodo_pago,
+               NEW.cantidad, NEW.cantidad * NEW.precio_unitario
+        FROM ({_PRIMERA_TRANSACCION.format(fila="NEW")}) AS t
+        WHERE true
+        ON CONFLICT (dia, id_plato, metodo_pago) DO UPDATE SET
+            unidades = unidades + excluded.unidades,
+            ingreso = ingreso + excluded.ingreso;
+    END;
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_detalle_descuenta_ventas
+    AFTER DELETE ON detalle_pedidos
+    BEGIN
+        {descontar_old}
+    END;
+    """)
+    reconstruir_ventas_diarias(conn)
+
+
+def vincular_pedidos_reservas(conn: sqlite3.Connection) -> None:
+    """
+    Agrega pedidos.id_reserva (la estadía a la que se carga el pedido) con su
+    índice para el folio, y vincula los pedidos existentes. Requiere
+    room_night. No hace commit.
+    """
+    cur = conn.cursor()
+    cur.execute("ALTER TABLE pedidos ADD COLUMN id_reserva INTEGER REFERENCES reserva(id_reserva);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_reserva ON pedidos(id_reserva);")
+    _vincular_pedidos_existentes(conn)
+
+
+def _vincular_pedidos_existentes(conn: sqlite3.Connection) -> None:
+    """
+    Vincula los pedidos anteriores a pedidos.id_reserva con el mismo criterio
+    que get_reserva_activa. En esos pedidos id_habitacion es el número de
+    habitación que se tecleaba (101 para 'H101'), no el id: se resuelve por
+    habitacion.numero_habitacion y, si no corresponde a exactamente una
+    habitación, id_reserva queda en NULL. No hace commit.
+    """
+    conn.execute("""
+    UPDATE pedidos SET id_reserva = (
+        SELECT n.id_reserva FROM room_night AS n
+        WHERE n.id_habitacion = (
+                SELECT CASE WHEN COUNT(*) = 1 THEN MIN(h.id_habitacion) END
+                FROM habitacion AS h
+                WHERE UPPER(h.numero_habitacion) IN (CAST(pedidos.id_habitacion AS TEXT),
+                                                     'H' || pedidos.id_habitacion)
+              )
+          AND n.noche IN (pedidos.dia_pedido, pedidos.dia_pedido - 1)
+        ORDER BY n.noche DESC
+        LIMIT 1
+    );
+    """)
+
+
+# Contadores de conexiones reales de todas las instancias de RestauranteDB
+_lock_contadores = threading.Lock()
+_contadores = {"aperturas": 0, "cierres": 0}
+
+
+def estadisticas_conexiones() -> Dict[str, int]:
+    """Retorna {'aperturas', 'cierres', 'abiertas'} de las conexiones de RestauranteDB."""
+    with _lock_contadores:
+        return dict(_contadores, abiertas=_contadores["aperturas"] - _contadores["cierres"])
+
 
 class RestauranteDB:
     """
     Gestor de la base de datos para el módulo Restaurante.
     Responsable de conexión, esquema y operaciones CRUD.
+
+    Ciclo de vida de la conexión (con conteo de referencias):
+    - 'with db' reutiliza la conexión abierta; los 'with' anidados no reconectan.
+    - Al salir del 'with' más externo se confirma (o se revierte si hubo excepción)
+      y se cierra la conexión.
+    - Con persistente=True (sesiones largas de la GUI) la conexión se conserva
+      abierta entre usos hasta llamar a close().
+    Un RLock serializa el uso de la conexión entre hilos mientras dura el 'with'.
     """
 
-    def __init__(self, db_path: str = "mayan_sunset.db") -> None:
+    def __init__(self, db_path: str = "mayan_sunset.db", persistente: bool = False) -> None:
         self.db_path = db_path
+        self.persistente = persistente
         self.conn = None
+        self._usos = 0                     # 'with' activos sobre la conexión
+        self._profundidad_transaccion = 0  # > 0 dentro de transaccion()
+        self._lock = threading.RLock()
+        # Se incrementa en cada cambio al menú hecho por esta instancia y al abrir
+        # una conexión nueva; las cachés del menú lo comparan junto con
+        # PRAGMA data_version (que no ve escrituras propias y es por conexión).
+        self.version_menu = 0
 
     def connect(self) -> None:
-        """Abre la conexión y configura row_factory para dict-like access."""
+        """Abre la conexión (si no está abierta) y configura row_factory para dict-like access."""
+        if self.conn is not None:
+            return
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            # check_same_thread=False: el RLock garantiza un solo hilo a la vez
+            self.conn = sqlite3.connect(self.db_path, timeout=conexiones.BUSY_TIMEOUT_MS / 1000,
+                                        check_same_thread=False)
             self.conn.row_factory = sqlite3.Row
+            # Misma configuración que el pool de conexiones.py (la BD es compartida)
+            self.conn.execute("PRAGMA journal_mode = WAL;")
+            self.conn.execute("PRAGMA synchronous = NORMAL;")
         except sqlite3.Error as e:
             raise RuntimeError(f"Error al conectar a la base de datos: {e}")
+        self.version_menu += 1
+        with _lock_contadores:
+            _contadores["aperturas"] += 1
 
     def close(self) -> None:
         """Cierra la conexión si está abierta."""
-        if self.conn:
-            try:
-                self.conn.close()
-            except sqlite3.Error as e:
-                raise RuntimeError(f"Error al cerrar la conexión: {e}")
-            finally:
-                self.conn = None
+        with self._lock:
+            if self.conn:
+                try:
+                    self.conn.close()
+                except sqlite3.Error as e:
+                    raise RuntimeError(f"Error al cerrar la conexión: {e}")
+                finally:
+                    self.conn = None
+                    with _lock_contadores:
+                        _contadores["cierres"] += 1
 
     def __enter__(self):
-        self.connect()
+        self._lock.acquire()
+        try:
+            self.connect()
+        except BaseException:
+            self._lock.release()
+            raise
+        self._usos += 1
         return self
 
     def __exit__(self, exc_type, exc, tb):
-        # Si hubo excepción, revertir cambios
-        if exc_type:
-            if self.conn:
+        try:
+            self._usos -= 1
+            if self._usos > 0 or self.conn is None:
+                return
+            # Salida del 'with' más externo: confirmar o revertir lo pendiente
+            try:
+                if exc_type:
+                    self.conn.rollback()
+                    self.version_menu += 1  # lo cacheado pudo incluir cambios revertidos
+                else:
+                    self.conn.commit()
+            except sqlite3.Error as e:
                 self.conn.rollback()
-        # mportante: NO cerrar la conexión aquí
-        # La conexión se cierra explícitamente con self.close()
+                raise RuntimeError(f"Error al confirmar cambios: {e}")
+            finally:
+                if not self.persistente:
+                    self.close()
+        finally:
+            self._lock.release()
+
+    # --- Unidad de trabajo ---
+
+    @contextmanager
+    def transaccion(self):
+        """
+        Unidad de trabajo: dentro del bloque los métodos CRUD no hacen commit ni
+        rollback; al salir se confirma todo junto, o se revierte todo si hubo una
+        excepción. Toma el bloqueo de escritura al inicio (BEGIN IMMEDIATE).
+        Los bloques anidados se unen al externo, que es el único que confirma.
+        """
+        if self._profundidad_transaccion == 0:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE;")
+            except sqlite3.Error as e:
+                raise RuntimeError(f"Error al iniciar la transacción: {e}")
+        self._profundidad_transaccion += 1
+        try:
+            yield self
+        except BaseException:
+            self._profundidad_transaccion -= 1
+            if self._profundidad_transaccion == 0:
+                self.conn.rollback()
+                self.version_menu += 1  # lo cacheado pudo incluir cambios revertidos
+            raise
+        self._profundidad_transaccion -= 1
+        if self._profundidad_transaccion == 0:
+            try:
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                raise RuntimeError(f"Error al confirmar la transacción: {e}")
+
+    def _confirmar(self) -> None:
+        """commit() salvo dentro de transaccion(), que confirma al final."""
+        if not self._profundidad_transaccion:
+            self.conn.commit()
+
+    def _revertir(self) -> None:
+        """rollback() salvo dentro de transaccion(), que revierte al final."""
+        if not self._profundidad_transaccion:
+            self.conn.rollback()
 
     # --- Esquema y datos iniciales ---
 
     def create_tables(self) -> None:
         """Ejecuta el script de creación de tablas (idempotente)."""
-        sql_script = """
-        CREATE TABLE IF NOT EXISTS menu (
-            id_plato INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre_plato TEXT NOT NULL,
-            descripcion TEXT,
-            precio REAL NOT NULL,
-            tipo TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS pedidos (
-            id_pedido INTEGER PRIMARY KEY AUTOINCREMENT,
-            id_habitacion INTEGER NOT NULL,
-            fecha_pedido TEXT NOT NULL,
-            hora_pedido TEXT NOT NULL,
-            estado TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS detalle_pedidos (
-            id_detalle_pedido INTEGER PRIMARY KEY AUTOINCREMENT,
-            id_pedido INTEGER NOT NULL,
-            id_plato INTEGER NOT NULL,
-            cantidad INTEGER NOT NULL,
-            precio_unitario REAL NOT NULL,
-            FOREIGN KEY (id_pedido) REFERENCES pedidos(id_pedido),
-            FOREIGN KEY (id_plato) REFERENCES menu(id_plato)
-        );
-
-        CREATE TABLE IF NOT EXISTS inventario (
-            id_ingrediente INTEGER PRIMARY KEY AUTOINCREMENT,
-            nombre_ingrediente TEXT NOT NULL,
-            cantidad INTEGER NOT NULL,
-            unidad_medida TEXT NOT NULL,
-            stock_minimo INTEGER NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS transacciones (
-            id_transaccion INTEGER PRIMARY KEY AUTOINCREMENT,
-            id_pedido INTEGER NOT NULL,
-            fecha_transaccion TEXT NOT NULL,
-            monto_total REAL NOT NULL,
-            metodo_pago TEXT,
-            FOREIGN KEY (id_pedido) REFERENCES pedidos(id_pedido)
-        );
-        """
         try:
-            cur = self.conn.cursor()
-            cur.executescript(sql_script)
-            self.conn.commit()
+            crear_esquema(self.conn)
+            self._confirmar()
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al crear tablas: {e}")
 
     def seed_initial_data(self) -> None:
@@ -109,47 +618,10 @@ class RestauranteDB:
         Evita duplicados verificando la cantidad de filas existentes.
         """
         try:
-            cur = self.conn.cursor()
-            # Verificar 'menu'
-            cur.execute("SELECT COUNT(*) AS c FROM menu;")
-            count_menu = cur.fetchone()["c"]
-            if count_menu == 0:
-                cur.executemany(
-                    "INSERT INTO menu (nombre_plato, descripcion, precio, tipo) VALUES (?, ?, ?, ?);",
-                    [
-                        ("Tacos al Pastor",
-                         "Tacos de cerdo marinado con piña y cilantro.", 15.50, "Principal"),
-                        ("Enchiladas Suizas",
-                         "Tortillas de maíz rellenas de pollo, cubiertas con salsa verde y queso.", 12.00, "Principal"),
-                        ("Guacamole con Totopos",
-                         "Aguacate machacado con tomate, cebolla, cilantro y un toque de limón.", 8.75, "Entrada"),
-                        ("Sopa de Tortilla",
-                         "Caldo de tomate con tiras de tortilla frita, queso y aguacate.", 7.50, "Entrada"),
-                        ("Cochinita Pibil",
-                         "Carne de cerdo marinada en achiote, cocinada lentamente y servida con cebolla morada.", 18.00, "Principal"),
-                        ("Agua de Jamaica",
-                         "Bebida refrescante hecha de la flor de hibisco.", 4.00, "Bebida"),
-                    ],
-                )
-
-            # Verificar 'inventario'
-            cur.execute("SELECT COUNT(*) AS c FROM inventario;")
-            count_inv = cur.fetchone()["c"]
-            if count_inv == 0:
-                cur.executemany(
-                    "INSERT INTO inventario (nombre_ingrediente, cantidad, unidad_medida, stock_minimo) VALUES (?, ?, ?, ?);",
-                    [
-                        ("Aguacate", 50, "unidades", 10),
-                        ("Pollo", 20, "kg", 5),
-                        ("Maíz", 100, "kg", 20),
-                        ("Cilantro", 10, "kg", 2),
-                        ("Piña", 30, "unidades", 5),
-                        ("Carne de Cerdo", 25, "kg", 5),
-                    ],
-                )
-            self.conn.commit()
+            insertar_datos_iniciales(self.conn)
+            self._confirmar()
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al insertar datos iniciales: {e}")
 
     # --- CRUD: Menú ---
@@ -184,10 +656,11 @@ class RestauranteDB:
                 "INSERT INTO menu (nombre_plato, descripcion, precio, tipo) VALUES (?, ?, ?, ?);",
                 (nombre, descripcion, precio, tipo),
             )
-            self.conn.commit()
+            self.version_menu += 1
+            self._confirmar()
             return cur.lastrowid
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al insertar plato: {e}")
 
     def update_plato(self, id_plato: int, nombre: str, descripcion: str, precio: float, tipo: str) -> None:
@@ -198,9 +671,10 @@ class RestauranteDB:
                 "UPDATE menu SET nombre_plato = ?, descripcion = ?, precio = ?, tipo = ? WHERE id_plato = ?;",
                 (nombre, descripcion, precio, tipo, id_plato),
             )
-            self.conn.commit()
+            self.version_menu += 1
+            self._confirmar()
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al actualizar plato: {e}")
 
     def delete_plato(self, id_plato: int) -> None:
@@ -208,35 +682,71 @@ class RestauranteDB:
         try:
             cur = self.conn.cursor()
             cur.execute("DELETE FROM menu WHERE id_plato = ?;", (id_plato,))
-            self.conn.commit()
+            self.version_menu += 1
+            self._confirmar()
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al eliminar plato: {e}")
 
     # --- CRUD: Pedidos y detalle ---
 
-    def create_pedido(self, id_habitacion: int, fecha: str, hora: str, estado: str) -> int:
-        """Crea un pedido y retorna el ID."""
+    def create_pedido(self, id_habitacion: int, fecha: str, hora: str, estado: str,
+                      id_reserva: Optional[int] = None) -> int:
+        """Crea un pedido (opcionalmente cargado a la reserva 'id_reserva') y retorna el ID."""
         try:
             cur = self.conn.cursor()
             cur.execute(
-                "INSERT INTO pedidos (id_habitacion, fecha_pedido, hora_pedido, estado) VALUES (?, ?, ?, ?);",
-                (id_habitacion, fecha, hora, estado),
+                "INSERT INTO pedidos (id_habitacion, fecha_pedido, hora_pedido, estado, id_reserva) "
+                "VALUES (?, ?, ?, ?, ?);",
+                (id_habitacion, fecha, hora, estado, id_reserva),
             )
-            self.conn.commit()
+            self._confirmar()
             return cur.lastrowid
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al crear pedido: {e}")
 
+    def get_reserva_activa(self, id_habitacion: int, fecha: str) -> Optional[int]:
+        """
+        Reserva alojada en la habitación en 'fecha': la dueña de la noche de
+        'fecha' o, si no hay, la de la noche anterior (día de salida). Usa la PK
+        de room_night, así que las reservas canceladas nunca se consideran.
+        Retorna None si la habitación está libre.
+        """
+        dia = fechas.a_dia(fecha)
+        try:
+            cur = self.conn.cursor()
+            cur.execute(
+                """
+                SELECT id_reserva FROM room_night
+                WHERE id_habitacion = ? AND noche IN (?, ?)
+                ORDER BY noche DESC
+                LIMIT 1;
+                """,
+                (id_habitacion, dia, dia - 1),
+            )
+            row = cur.fetchone()
+            return row["id_reserva"] if row else None
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al buscar la reserva activa: {e}")
+
+    def get_habitaciones(self) -> List[Dict]:
+        """Habitaciones del hotel (id y número), para elegir a cuál se carga un pedido."""
+        try:
+            cur = self.conn.cursor()
+            cur.execute("SELECT id_habitacion, numero_habitacion FROM habitacion ORDER BY numero_habitacion;")
+            return [dict(row) for row in cur.fetchall()]
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al obtener habitaciones: {e}")
+
     def update_estado_pedido(self, id_pedido: int, estado: str) -> None:
         """Actualiza el estado de un pedido."""
         try:
             cur = self.conn.cursor()
             cur.execute("UPDATE pedidos SET estado = ? WHERE id_pedido = ?;", (estado, id_pedido))
-            self.conn.commit()
+            self._confirmar()
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al actualizar estado del pedido: {e}")
 
     def add_detalle_pedido(self, id_pedido: int, id_plato: int, cantidad: int, precio_unitario: float) -> int:
@@ -247,12 +757,24 @@ class RestauranteDB:
                 "INSERT INTO detalle_pedidos (id_pedido, id_plato, cantidad, precio_unitario) VALUES (?, ?, ?, ?);",
                 (id_pedido, id_plato, cantidad, precio_unitario),
             )
-            self.conn.commit()
+            self._confirmar()
             return cur.lastrowid
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al agregar detalle de pedido: {e}")
 
+    def add_detalles_pedido(self, id_pedido: int, detalles: List[Tuple[int, int, float]]) -> None:
+        """Agrega varios detalles (id_plato, cantidad, precio_unitario) al pedido con executemany."""
+        try:
+            self.conn.executemany(
+                "INSERT INTO detalle_pedidos (id_pedido, id_plato, cantidad, precio_unitario) VALUES (?, ?, ?, ?);",
+                [(id_pedido, id_plato, cantidad, precio) for id_plato, cantidad, precio in detalles],
+            )
+            self._confirmar()
+        except sqlite3.Error as e:
+            self._revertir()
+            raise RuntimeError(f"Error al agregar detalles de pedido: {e}")
+
     def get_detalles_pedido(self, id_pedido: int) -> List[Dict]:
         """Obtiene el detalle de un pedido (join con menú)."""
         try:
@@ -272,6 +794,90 @@ class RestauranteDB:
         except sqlite3.Error as e:
             raise RuntimeError(f"Error al obtener detalles del pedido: {e}")
 
+    def get_historial_pedidos(
+        self,
+        fecha_desde: str,
+        fecha_hasta: str,
+        id_habitacion: Optional[int] = None,
+        estado: Optional[str] = None,
+        despues_de: Optional[Tuple[str, int]] = None,
+        limite: int = 50,
+    ) -> List[Dict]:
+        """
+        Página del historial de pedidos en [fecha_desde, fecha_hasta] (inclusive),
+        del más reciente al más antiguo, opcionalmente por habitación y estado.
+        Paginación por clave: 'despues_de' es (fecha_pedido, id_pedido) del último
+        pedido de la página anterior. Cada pedido trae sus 'detalles' y su
+        'transaccion' (None si no se cobró), todo en una sola consulta.
+        Lanza ValueError si alguna fecha no es YYYY-MM-DD.
+        """
+        condiciones = ["p.dia_pedido BETWEEN ? AND ?"]
+        parametros: List = [fechas.a_dia(fecha_desde), fechas.a_dia(fecha_hasta)]
+        if id_habitacion is not None:
+            condiciones.append("p.id_habitacion = ?")
+            parametros.append(id_habitacion)
+        if estado is not None:
+            condiciones.append("p.estado = ?")
+            parametros.append(estado)
+        if despues_de is not None:
+            condiciones.append("(p.dia_pedido, p.id_pedido) < (?, ?)")
+            parametros.extend((fechas.a_dia(despues_de[0]), despues_de[1]))
+        parametros.append(limite)
+        try:
+            cur = self.conn.cursor()
+            cur.execute(
+                f"""
+                WITH pagina AS (
+                    SELECT p.id_pedido, p.id_habitacion, p.fecha_pedido, p.hora_pedido, p.estado, p.dia_pedido
+                    FROM pedidos AS p
+                    WHERE {" AND ".join(condiciones)}
+                    ORDER BY p.dia_pedido DESC, p.id_pedido DESC
+                    LIMIT ?
+                )
+                SELECT pg.id_pedido, pg.id_habitacion, h.numero_habitacion, pg.fecha_pedido,
+                       pg.hora_pedido, pg.estado, dp.id_detalle_pedido, dp.id_plato, dp.cantidad, dp.precio_unitario,
+                       m.nombre_plato, m.tipo,
+                       t.id_transaccion, t.fecha_transaccion, t.monto_total, t.metodo_pago
+                FROM pagina AS pg
+                LEFT JOIN habitacion AS h ON h.id_habitacion = pg.id_habitacion
+                LEFT JOIN detalle_pedidos AS dp ON dp.id_pedido = pg.id_pedido
+                LEFT JOIN menu AS m ON m.id_plato = dp.id_plato
+                LEFT JOIN transacciones AS t ON t.id_pedido = pg.id_pedido
+                ORDER BY pg.dia_pedido DESC, pg.id_pedido DESC, dp.id_detalle_pedido;
+                """,
+                parametros,
+            )
+            filas = cur.fetchall()
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al obtener historial de pedidos: {e}")
+
+        pedidos: Dict[int, Dict] = {}
+        for f in filas:
+            pedido = pedidos.get(f["id_pedido"])
+            if pedido is None:
+                pedido = pedidos[f["id_pedido"]] = {
+                    "id_pedido": f["id_pedido"],
+                    "id_habitacion": f["id_habitacion"],
+                    "numero_habitacion": f["numero_habitacion"],
+                    "fecha_pedido": f["fecha_pedido"],
+                    "hora_pedido": f["hora_pedido"],
+                    "estado": f["estado"],
+                    "detalles": {},
+                    "transaccion": None,
+                }
+            if f["id_detalle_pedido"] is not None:
+                pedido["detalles"][f["id_detalle_pedido"]] = {
+                    k: f[k] for k in ("id_detalle_pedido", "id_plato", "cantidad", "precio_unitario",
+                                      "nombre_plato", "tipo")
+                }
+            if f["id_transaccion"] is not None and pedido["transaccion"] is None:
+                pedido["transaccion"] = {
+                    k: f[k] for k in ("id_transaccion", "fecha_transaccion", "monto_total", "metodo_pago")
+                }
+        for pedido in pedidos.values():
+            pedido["detalles"] = list(pedido["detalles"].values())
+        return list(pedidos.values())
+
     # --- CRUD: Inventario ---
 
     def get_inventario(self) -> List[Dict]:
@@ -293,31 +899,33 @@ class RestauranteDB:
         except sqlite3.Error as e:
             raise RuntimeError(f"Error al obtener ingrediente: {e}")
 
-    def update_inventario_cantidad(self, nombre: str, delta: int) -> None:
+    def update_inventario_cantidad(self, nombre: str, delta: float) -> None:
         """
-        Aplica un delta a la cantidad de un ingrediente (positivo o negativo).
-        Lanza error si el resultado sería negativo.
+        Aplica un delta a la cantidad de un ingrediente (positivo o negativo,
+        admite fracciones). Lanza error si el resultado sería negativo.
+        Es un solo UPDATE condicionado: dos terminales concurrentes no pierden
+        descuentos, y el stock insuficiente se detecta por rowcount.
         """
+        delta = round(delta, DECIMALES_CANTIDAD)
         try:
             cur = self.conn.cursor()
-            cur.execute("SELECT cantidad FROM inventario WHERE nombre_ingrediente = ?;", (nombre,))
-            row = cur.fetchone()
-            if not row:
-                raise RuntimeError(f"Ingrediente '{nombre}' no existe.")
-            nueva = row["cantidad"] + delta
-            if nueva < 0:
-                raise RuntimeError(f"Stock insuficiente para '{nombre}'. Operación cancelada.")
             cur.execute(
-                "UPDATE inventario SET cantidad = ? WHERE nombre_ingrediente = ?;",
-                (nueva, nombre),
+                f"UPDATE inventario SET cantidad = ROUND(cantidad + ?, {DECIMALES_CANTIDAD}) "
+                "WHERE nombre_ingrediente = ? AND cantidad >= ?;",
+                (delta, nombre, max(0.0, -delta)),
             )
-            self.conn.commit()
+            if cur.rowcount == 0:
+                cur.execute("SELECT 1 FROM inventario WHERE nombre_ingrediente = ?;", (nombre,))
+                if cur.fetchone() is None:
+                    raise RuntimeError(f"Ingrediente '{nombre}' no existe.")
+                raise RuntimeError(f"Stock insuficiente para '{nombre}'. Operación cancelada.")
+            self._confirmar()
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al actualizar inventario: {e}")
 
     def get_bajo_stock(self) -> List[Dict]:
-        """Retorna ingredientes cuyo stock está por debajo del mínimo."""
+        """Retorna ingredientes cuyo stock está por debajo del mínimo (índice parcial, sin recorrer inventario)."""
         try:
             cur = self.conn.cursor()
             cur.execute(
@@ -327,6 +935,113 @@ class RestauranteDB:
         except sqlite3.Error as e:
             raise RuntimeError(f"Error al verificar bajo stock: {e}")
 
+    def get_marca_alertas_stock(self) -> int:
+        """Retorna la marca actual (último id_alerta, 0 si no hay alertas)."""
+        try:
+            cur = self.conn.cursor()
+            cur.execute("SELECT COALESCE(MAX(id_alerta), 0) FROM alerta_stock;")
+            return cur.fetchone()[0]
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al obtener marca de alertas: {e}")
+
+    def get_alertas_stock_desde(self, marca: int) -> List[Dict]:
+        """
+        Retorna las alertas de bajo stock registradas después de 'marca'
+        (un id_alerta previo), una por cada cruce del mínimo, en orden.
+        'cantidad' y 'stock_minimo' son los valores al momento del cruce.
+        """
+        try:
+            cur = self.conn.cursor()
+            cur.execute("""
+                SELECT a.id_alerta, a.id_ingrediente, i.nombre_ingrediente, a.cantidad,
+                       i.unidad_medida, a.stock_minimo, a.fecha
+                FROM alerta_stock AS a
+                JOIN inventario AS i ON i.id_ingrediente = a.id_ingrediente
+                WHERE a.id_alerta > ?
+                ORDER BY a.id_alerta;
+            """, (marca,))
+            return [dict(row) for row in cur.fetchall()]
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al obtener alertas de stock: {e}")
+
+    def descontar_inventario(self, consumos: Dict[int, float]) -> None:
+        """
+        Descuenta {id_ingrediente: cantidad} con un UPDATE por ingrediente
+        (executemany). Si alguno no alcanza, no descuenta nada y lanza RuntimeError.
+        Trabaja en un SAVEPOINT propio: ante cualquier error revierte solo lo
+        suyo, también dentro de transaccion() (que decide el resto).
+        """
+        if not consumos:
+            return
+        consumos = {i: round(c, DECIMALES_CANTIDAD) for i, c in consumos.items()}
+        try:
+            cur = self.conn.cursor()
+            cur.execute("SAVEPOINT descontar_inventario;")
+            try:
+                cur.executemany(
+                    f"UPDATE inventario SET cantidad = ROUND(cantidad - ?, {DECIMALES_CANTIDAD}) "
+                    "WHERE id_ingrediente = ? AND cantidad >= ?;",
+                    [(cantidad, id_ingrediente, cantidad) for id_ingrediente, cantidad in consumos.items()],
+                )
+                faltante = cur.rowcount != len(consumos)
+                if faltante:
+                    cur.execute("ROLLBACK TO descontar_inventario;")
+            except sqlite3.Error:
+                cur.execute("ROLLBACK TO descontar_inventario;")
+                raise
+            finally:
+                cur.execute("RELEASE descontar_inventario;")
+
+            if faltante:
+                marcas = ",".join("?" * len(consumos))
+                cur.execute(f"SELECT id_ingrediente, nombre_ingrediente, cantidad FROM inventario "
+                            f"WHERE id_ingrediente IN ({marcas});", list(consumos))
+                encontrados = {row["id_ingrediente"]: row for row in cur.fetchall()}
+                for id_ingrediente, cantidad in consumos.items():
+                    row = encontrados.get(id_ingrediente)
+                    if row is None:
+                        raise RuntimeError(f"Ingrediente requerido no encontrado: {id_ingrediente}")
+                    if row["cantidad"] < cantidad:
+                        raise RuntimeError(
+                            f"Stock insuficiente para '{row['nombre_ingrediente']}'. Operación cancelada.")
+                # Ninguno falta al releer (redondeo, o stock repuesto entre ambas lecturas)
+                raise RuntimeError("No se pudo descontar el inventario: las existencias cambiaron. "
+                                   "Operación cancelada.")
+            self._confirmar()
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al descontar inventario: {e}")
+
+    # --- CRUD: Recetas ---
+
+    def get_recetas(self) -> List[Dict]:
+        """Lista las recetas con la unidad de cada ingrediente."""
+        try:
+            cur = self.conn.cursor()
+            cur.execute("""
+                SELECT r.id_plato, r.id_ingrediente, r.consumo, i.nombre_ingrediente, i.unidad_medida
+                FROM receta AS r
+                JOIN inventario AS i ON i.id_ingrediente = r.id_ingrediente
+                ORDER BY r.id_plato, r.id_ingrediente;
+            """)
+            return [dict(row) for row in cur.fetchall()]
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al obtener recetas: {e}")
+
+    def set_receta(self, id_plato: int, consumos: Dict[int, float]) -> None:
+        """Reemplaza la receta de un plato por {id_ingrediente: consumo por unidad}."""
+        try:
+            cur = self.conn.cursor()
+            cur.execute("DELETE FROM receta WHERE id_plato = ?;", (id_plato,))
+            cur.executemany(
+                "INSERT INTO receta (id_plato, id_ingrediente, consumo) VALUES (?, ?, ?);",
+                [(id_plato, id_ingrediente, consumo) for id_ingrediente, consumo in consumos.items()],
+            )
+            self.version_menu += 1
+            self._confirmar()
+        except sqlite3.Error as e:
+            self._revertir()
+            raise RuntimeError(f"Error al guardar receta: {e}")
+
     # --- CRUD: Transacciones ---
 
     def record_transaccion(self, id_pedido: int, fecha: str, monto_total: float, metodo_pago: Optional[str]) -> int:
@@ -337,8 +1052,57 @@ class RestauranteDB:
                 "INSERT INTO transacciones (id_pedido, fecha_transaccion, monto_total, metodo_pago) VALUES (?, ?, ?, ?);",
                 (id_pedido, fecha, monto_total, metodo_pago),
             )
-            self.conn.commit()
+            self._confirmar()
             return cur.lastrowid
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._revertir()
             raise RuntimeError(f"Error al registrar transacción: {e}")
+
+    # --- Resúmenes de ventas (ventas_diarias / cobros_diarios) ---
+
+    def get_ventas_por_plato(self, fecha_desde: str, fecha_hasta: str) -> List[Dict]:
+        """
+        Unidades e ingreso (sin servicio) por plato en [fecha_desde, fecha_hasta],
+        del más vendido al menos vendido. Lee solo el resumen diario.
+        """
+        try:
+            cur = self.conn.cursor()
+            cur.execute(
+                """
+                SELECT v.id_plato, m.nombre_plato, SUM(v.unidades) AS unidades, ROUND(SUM(v.ingreso), 2) AS ingreso
+                FROM ventas_diarias AS v
+                LEFT JOIN menu AS m ON m.id_plato = v.id_plato
+                WHERE v.dia BETWEEN ? AND ?
+                GROUP BY v.id_plato
+                ORDER BY unidades DESC, ingreso DESC;
+                """,
+                (fechas.a_dia(fecha_desde), fechas.a_dia(fecha_hasta)),
+            )
+            return [dict(row) for row in cur.fetchall()]
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al obtener ventas por plato: {e}")
+
+    def get_cobros_por_dia(self, fecha_desde: str, fecha_hasta: str) -> List[Dict]:
+        """
+        Transacciones y monto cobrado (con servicio) por día y método de pago en
+        [fecha_desde, fecha_hasta]. 'metodo_pago' es None si no se indicó.
+        """
+        try:
+            cur = self.conn.cursor()
+            cur.execute(
+                """
+                SELECT dia, NULLIF(metodo_pago, '') AS metodo_pago, transacciones, ROUND(monto_total, 2) AS monto_total
+                FROM cobros_diarios
+                WHERE dia BETWEEN ? AND ?
+                ORDER BY dia, metodo_pago;
+                """,
+                (fechas.a_dia(fecha_desde), fechas.a_dia(fecha_hasta)),
+            )
+            filas = []
+            for row in cur.fetchall():
+                fila = dict(row)
+                fila["fecha"] = fechas.desde_dia(fila.pop("dia"))
+                filas.append(fila)
+            return filas
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Error al obtener cobros por día: {e}")
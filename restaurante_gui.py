@@ -3,14 +3,18 @@
 """
 Capa de GUI del módulo Restaurante para Mayan Sunset.
 La ventana está encapsulada en la función VentanaRestaurante(root: tk.Toplevel).
-Interactúa únicamente con la capa de lógica del negocio.
+Interactúa con la capa de lógica del negocio (solo abre la conexión persistente de la sesión).
 """
 
 import tkinter as tk
+from datetime import date
 from tkinter import ttk, messagebox
 from typing import List, Dict
 
+import ejecutor_gui
+from restaurante_db import RestauranteDB
 from restaurante_logica import RestauranteLogica, ItemPedido
+from tabla_gui import EnlaceTreeview
 
 
 def VentanaRestaurante(root: tk.Toplevel) -> None:
@@ -22,42 +26,79 @@ def VentanaRestaurante(root: tk.Toplevel) -> None:
     root.geometry("900x600")
     root.resizable(True, True)
 
-    logica = RestauranteLogica()
-    # Asegurar esquema y datos iniciales (idempotente)
-    try:
-        logica.inicializar_esquema_y_datos()
-    except Exception as e:
-        messagebox.showerror("Error de Base de Datos", str(e), parent=root)
-        return
+    # Sesión larga: una sola conexión reutilizada hasta cerrar la ventana
+    db = RestauranteDB(persistente=True)
+    logica = RestauranteLogica(db)
 
     # --- Estado interno ---
     carrito: List[Dict] = []  # [{id_plato, nombre_plato, cantidad, precio_unitario}]
     subtotal_var = tk.StringVar(value="0.00")
     servicio_var = tk.StringVar(value="0.00")
     total_var = tk.StringVar(value="0.00")
+    # Marca de alertas de bajo stock ya mostradas (None: aún no se mostró el estado inicial)
+    alertas = {"marca": None}
+    # Historial: filtros de la búsqueda actual y cursor de la página siguiente
+    historial = {"filtros": None, "cursor": None}
+    # numero_habitacion -> id_habitacion (se llena al terminar la inicialización)
+    habitaciones: Dict[str, int] = {}
+    # Trabajo de BD en curso en el hilo de ejecutor_gui (una tarea por acción)
+    tareas = {"inicio": None, "menu": None, "pedido": None, "inventario": None, "historial": None}
+
+    def en_curso(accion: str) -> bool:
+        return tareas[accion] is not None and tareas[accion].en_curso()
+
+    def cerrar_sesion(_evento=None) -> None:
+        """Al cerrar la ventana: descarta lo pendiente y cierra la conexión después de lo que esté corriendo."""
+        for tarea in tareas.values():
+            if tarea is not None:
+                tarea.cancelar()
+        ejecutor_gui.ejecutor().submit(db.close)
+
+    root.bind("<Destroy>", lambda e: cerrar_sesion() if e.widget is root else None, add="+")
+    TAM_PAGINA_HISTORIAL = 50
 
     # --- Callbacks ---
 
-    def cargar_menu_tabla() -> None:
-        """Recarga el menú en la tabla según filtro seleccionado."""
-        for item in tree_menu.get_children():
-            tree_menu.delete(item)
+    def inicializar() -> None:
+        """
+        Asegura esquema y datos iniciales (idempotente; puede aplicar migraciones)
+        y lee las habitaciones en segundo plano; después carga menú e inventario.
+        """
+        def preparar():
+            logica.inicializar_esquema_y_datos()
+            return {h["numero_habitacion"]: h["id_habitacion"] for h in logica.listar_habitaciones()}
+
+        tareas["inicio"] = ejecutor_gui.en_segundo_plano(
+            root, preparar,
+            al_terminar=inicializado,
+            al_fallar=error_inicializacion,
+            deshabilitar=[btn_procesar, btn_recargar_inv, btn_buscar_hist],
+        )
+
+    def inicializado(numeros: Dict[str, int]) -> None:
+        # La habitación se elige por número; la lógica vincula el pedido con
+        # la reserva activa de esa habitación (folio de salida)
+        habitaciones.update(numeros)
+        combo_habitacion["values"] = list(habitaciones)
+        combo_hist_habitacion["values"] = [""] + list(habitaciones)
+        cargar_menu_tabla()
+        cargar_inventario_tabla()
+
+    def error_inicializacion(e: BaseException) -> None:
+        messagebox.showerror("Error de Base de Datos", str(e), parent=root)
+        root.destroy()  # cerrar_sesion() cierra la conexión
 
+    def cargar_menu_tabla() -> None:
+        """Recarga el menú en la tabla según filtro seleccionado (solo aplica las filas que cambian)."""
         tipo_sel = combo_tipo.get()
         tipo_aplicar = tipo_sel if tipo_sel and tipo_sel != "Todos" else None
-        try:
-            menu = logica.listar_menu_por_tipo(tipo_aplicar)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo cargar el menú:\n{e}", parent=root)
-            return
-
-        for m in menu:
-            tree_menu.insert(
-                "",
-                tk.END,
-                iid=f"plato-{m['id_plato']}",
-                values=(m["id_plato"], m["nombre_plato"], m["descripcion"], f"{m['precio']:.2f}", m["tipo"]),
-            )
+        if en_curso("menu"):
+            tareas["menu"].cancelar()  # filtro anterior
+        tareas["menu"] = ejecutor_gui.en_segundo_plano(
+            root, logica.listar_menu_por_tipo, tipo_aplicar,
+            al_terminar=enlace_menu.actualizar,
+            al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo cargar el menú:\n{e}", parent=root),
+        )
 
     def actualizar_totales_visual() -> None:
         """Actualiza subtotal, servicio y total en la UI."""
@@ -110,18 +151,8 @@ def VentanaRestaurante(root: tk.Toplevel) -> None:
             messagebox.showerror("Error", f"No se pudo agregar al carrito:\n{e}", parent=root)
 
     def recargar_carrito() -> None:
-        """Recarga la tabla del carrito."""
-        for item in tree_carrito.get_children():
-            tree_carrito.delete(item)
-
-        for idx, ci in enumerate(carrito, start=1):
-            tree_carrito.insert(
-                "",
-                tk.END,
-                iid=f"car-{ci['id_plato']}",
-                values=(idx, ci["nombre_plato"], ci["cantidad"], f"{ci['precio_unitario']:.2f}",
-                        f"{ci['cantidad'] * ci['precio_unitario']:.2f}"),
-            )
+        """Recarga la tabla del carrito (solo las filas que cambian)."""
+        enlace_carrito.actualizar(enumerate(carrito, start=1))
 
     def quitar_del_carrito() -> None:
         """Quita el plato seleccionado del carrito."""
@@ -140,77 +171,157 @@ def VentanaRestaurante(root: tk.Toplevel) -> None:
         actualizar_totales_visual()
 
     def procesar_pedido() -> None:
-        """Envía el pedido a la lógica, actualiza inventario, registra transacción."""
-        try:
-            if not carrito:
-                messagebox.showwarning("Carrito vacío", "Agregue al menos un plato.", parent=root)
-                return
+        """Envía el pedido a la lógica (en segundo plano), que actualiza inventario y registra la transacción."""
+        if en_curso("pedido"):
+            return
+        if not carrito:
+            messagebox.showwarning("Carrito vacío", "Agregue al menos un plato.", parent=root)
+            return
 
-            habit_txt = entry_habitacion.get().strip()
-            if not habit_txt.isdigit() or int(habit_txt) <= 0:
-                messagebox.showwarning("Habitación inválida", "Ingrese un número de habitación válido.", parent=root)
-                return
-            id_habitacion = int(habit_txt)
+        id_habitacion = habitaciones.get(combo_habitacion.get().strip().upper())
+        if id_habitacion is None:
+            messagebox.showwarning("Habitación inválida", "Seleccione una habitación del hotel.", parent=root)
+            return
 
-            metodo_pago = combo_pago.get().strip() or None
+        metodo_pago = combo_pago.get().strip() or None
+        items = [ItemPedido(id_plato=ci["id_plato"], cantidad=ci["cantidad"]) for ci in carrito]
 
-            items = [ItemPedido(id_plato=ci["id_plato"], cantidad=ci["cantidad"]) for ci in carrito]
+        def registrar():
             resumen = logica.procesar_pedido(id_habitacion=id_habitacion, items=items, metodo_pago=metodo_pago)
+            # Las alertas de este pedido se muestran en el resumen, no al recargar inventario
+            return resumen, logica.marca_alertas_stock()
+
+        tareas["pedido"] = ejecutor_gui.en_segundo_plano(
+            root, registrar,
+            al_terminar=pedido_procesado,
+            al_fallar=lambda e: messagebox.showerror("Error al procesar pedido", str(e), parent=root),
+            deshabilitar=[btn_procesar],
+        )
+
+    def pedido_procesado(resultado) -> None:
+        resumen, alertas["marca"] = resultado
+        # Mostrar resumen
+        msg = (
+            f"Pedido #{resumen['id_pedido']} procesado.\n"
+            f"Subtotal: Q{resumen['subtotal']:.2f}\n"
+            f"Servicio (10%): Q{resumen['cargo_servicio']:.2f}\n"
+            f"Total: Q{resumen['total']:.2f}\n"
+        )
+
+        if resumen["advertencias"]:
+            msg += "\nAdvertencias:\n- " + "\n- ".join(resumen["advertencias"])
+
+        messagebox.showinfo("Éxito", msg, parent=root)
+
+        # Reset de carrito
+        carrito.clear()
+        recargar_carrito()
+        actualizar_totales_visual()
 
-            # Mostrar resumen
-            msg = (
-                f"Pedido #{resumen['id_pedido']} procesado.\n"
-                f"Subtotal: Q{resumen['subtotal']:.2f}\n"
-                f"Servicio (10%): Q{resumen['cargo_servicio']:.2f}\n"
-                f"Total: Q{resumen['total']:.2f}\n"
-            )
-
-            if resumen["advertencias"]:
-                msg += "\nAdvertencias:\n- " + "\n- ".join(resumen["advertencias"])
-
-            messagebox.showinfo("Éxito", msg, parent=root)
-
-            # Reset de carrito
-            carrito.clear()
-            recargar_carrito()
-            actualizar_totales_visual()
-
-            # Recargar inventario tab
-            cargar_inventario_tabla()
-
-        except Exception as e:
-            messagebox.showerror("Error al procesar pedido", str(e), parent=root)
+        # Recargar inventario tab
+        cargar_inventario_tabla()
 
     def cargar_inventario_tabla() -> None:
-        """Recarga la tabla de inventario y muestra alertas de bajo stock."""
-        for item in tree_inv.get_children():
-            tree_inv.delete(item)
+        """
+        Recarga la tabla de inventario. La primera vez muestra todo el bajo
+        stock actual; después, solo los mínimos cruzados desde la última alerta.
+        """
+        if en_curso("inventario"):
+            return
+        marca = alertas["marca"]
 
-        try:
+        def leer():
             inv = logica.listar_inventario()
-            for r in inv:
-                tree_inv.insert(
-                    "",
-                    tk.END,
-                    iid=f"ing-{r['id_ingrediente']}",
-                    values=(r["nombre_ingrediente"], r["cantidad"], r["unidad_medida"], r["stock_minimo"]),
-                )
-
-            # Alertas
-            advertencias = logica.verificar_bajo_stock()
-            if advertencias:
-                messagebox.showwarning("Inventario - Bajo stock", "\n".join(advertencias), parent=root)
+            if marca is None:
+                return inv, logica.verificar_bajo_stock(), logica.marca_alertas_stock()
+            return (inv, *logica.alertas_stock_desde(marca))
+
+        tareas["inventario"] = ejecutor_gui.en_segundo_plano(
+            root, leer,
+            al_terminar=mostrar_inventario,
+            al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo cargar inventario:\n{e}", parent=root),
+            deshabilitar=[btn_recargar_inv],
+        )
+
+    def mostrar_inventario(resultado) -> None:
+        inv, advertencias, alertas["marca"] = resultado
+        enlace_inv.actualizar(inv)
+        if advertencias:
+            messagebox.showwarning("Inventario - Bajo stock", "\n".join(advertencias), parent=root)
+
+    def buscar_historial() -> None:
+        """Valida los filtros, limpia la tabla y carga la primera página."""
+        # Misma selección por número que en Pedidos; vacío = todas las habitaciones
+        hab_txt = combo_hist_habitacion.get().strip().upper()
+        if hab_txt and hab_txt not in habitaciones:
+            messagebox.showwarning("Validación", "Seleccione una habitación del hotel.", parent=root)
+            return
+        estado = combo_hist_estado.get()
+        historial["filtros"] = {
+            "fecha_desde": entry_hist_desde.get().strip(),
+            "fecha_hasta": entry_hist_hasta.get().strip(),
+            "id_habitacion": habitaciones[hab_txt] if hab_txt else None,
+            "estado": None if estado == "Todos" else estado,
+        }
+        historial["cursor"] = None
+        if en_curso("historial"):
+            tareas["historial"].cancelar()  # página de la búsqueda anterior
+        tree_hist.delete(*tree_hist.get_children())
+        cargar_pagina_historial()
+
+    def cargar_pagina_historial() -> None:
+        """Pide la página siguiente en segundo plano; se agrega al final de la tabla al llegar."""
+        if historial["filtros"] is None or en_curso("historial"):
+            return
+        tareas["historial"] = ejecutor_gui.en_segundo_plano(
+            root, logica.listar_historial_pedidos,
+            cursor=historial["cursor"], tam_pagina=TAM_PAGINA_HISTORIAL, **historial["filtros"],
+            al_terminar=mostrar_pagina_historial,
+            al_fallar=error_historial,
+            deshabilitar=[btn_buscar_hist],
+        )
+
+    def error_historial(e: BaseException) -> None:
+        if isinstance(e, ValueError):
+            messagebox.showwarning("Validación", str(e), parent=root)
+        else:
+            messagebox.showerror("Error", f"No se pudo cargar el historial:\n{e}", parent=root)
+
+    def mostrar_pagina_historial(resultado) -> None:
+        """Agrega una página al final de la tabla (cada pedido con sus platos como hijos)."""
+        pedidos, historial["cursor"] = resultado
+        for p in pedidos:
+            t = p["transaccion"]
+            iid = tree_hist.insert(
+                "",
+                tk.END,
+                iid=f"ped-{p['id_pedido']}",
+                text=f"#{p['id_pedido']}",
+                values=(p["fecha_pedido"], p["hora_pedido"], p["numero_habitacion"] or "", p["estado"],
+                        f"{t['monto_total']:.2f}" if t else "", (t["metodo_pago"] or "") if t else ""),
+            )
+            for d in p["detalles"]:
+                tree_hist.insert(iid, tk.END, text=f"{d['cantidad']} x {d['nombre_plato']}",
+                                 values=("", "", "", "", f"{d['cantidad'] * d['precio_unitario']:.2f}", ""))
+        if historial["cursor"] is None:
+            # Última página: ya no hay más que pedir
+            historial["filtros"] = None
 
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo cargar inventario:\n{e}", parent=root)
+    def scroll_historial(primero: str, ultimo: str) -> None:
+        """yscrollcommand: mueve la barra y pide la página siguiente al acercarse al final."""
+        scroll_hist_y.set(primero, ultimo)
+        if float(ultimo) >= 0.95 and historial["cursor"] is not None:
+            root.after_idle(cargar_pagina_historial)
 
-    # --- Layout principal: Notebook con dos pestañas ---
+    # --- Layout principal: Notebook con tres pestañas ---
 
     notebook = ttk.Notebook(root)
     frame_pedidos = ttk.Frame(notebook)
     frame_inventario = ttk.Frame(notebook)
+    frame_historial = ttk.Frame(notebook)
     notebook.add(frame_pedidos, text="Pedidos")
     notebook.add(frame_inventario, text="Inventario")
+    notebook.add(frame_historial, text="Historial")
     notebook.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
 
     # --- Pestaña Pedidos ---
@@ -232,8 +343,13 @@ def VentanaRestaurante(root: tk.Toplevel) -> None:
 
     # Scrollbars
     scroll_y = ttk.Scrollbar(frame_pedidos, orient="vertical", command=tree_menu.yview)
-    tree_menu.configure(yscrollcommand=scroll_y.set)
     scroll_y.grid(row=1, column=4, sticky="ns")
+    enlace_menu = EnlaceTreeview(
+        tree_menu,
+        clave=lambda m: f"plato-{m['id_plato']}",
+        valores=lambda m: (m["id_plato"], m["nombre_plato"], m["descripcion"], f"{m['precio']:.2f}", m["tipo"]),
+        scrollbar=scroll_y,
+    )
 
     # Cantidad y agregar
     ttk.Label(frame_pedidos, text="Cantidad:").grid(row=2, column=0, sticky="w", padx=5, pady=5)
@@ -250,6 +366,15 @@ def VentanaRestaurante(root: tk.Toplevel) -> None:
         tree_carrito.heading(col, text=col)
         tree_carrito.column(col, width=120 if col != "Plato" else 250, stretch=True)
     tree_carrito.grid(row=4, column=0, columnspan=4, sticky="nsew", padx=5, pady=5)
+    # Filas (posición, ítem del carrito); la clave es el plato, así que agregar
+    # cantidad a un plato existente solo modifica su fila
+    enlace_carrito = EnlaceTreeview(
+        tree_carrito,
+        clave=lambda fila: f"car-{fila[1]['id_plato']}",
+        valores=lambda fila: (fila[0], fila[1]["nombre_plato"], fila[1]["cantidad"],
+                              f"{fila[1]['precio_unitario']:.2f}",
+                              f"{fila[1]['cantidad'] * fila[1]['precio_unitario']:.2f}"),
+    )
 
     ttk.Button(frame_pedidos, text="Quitar del carrito", command=quitar_del_carrito).grid(row=5, column=0, padx=5, pady=5)
 
@@ -263,16 +388,17 @@ def VentanaRestaurante(root: tk.Toplevel) -> None:
     ttk.Label(frame_pedidos, text="Total: Q").grid(row=8, column=0, sticky="e", padx=5, pady=2)
     ttk.Label(frame_pedidos, textvariable=total_var).grid(row=8, column=1, sticky="w", padx=5, pady=2)
 
-    # Datos del pedido
+    # Datos del pedido (las habitaciones se cargan en inicializar())
     ttk.Label(frame_pedidos, text="Habitación:").grid(row=9, column=0, sticky="w", padx=5, pady=5)
-    entry_habitacion = ttk.Entry(frame_pedidos, width=10)
-    entry_habitacion.grid(row=9, column=1, sticky="w", padx=5, pady=5)
+    combo_habitacion = ttk.Combobox(frame_pedidos, values=[], width=10)
+    combo_habitacion.grid(row=9, column=1, sticky="w", padx=5, pady=5)
 
     ttk.Label(frame_pedidos, text="Método de pago:").grid(row=9, column=2, sticky="e", padx=5, pady=5)
     combo_pago = ttk.Combobox(frame_pedidos, values=["Efectivo", "Tarjeta", "Cargo a habitación"], state="readonly")
     combo_pago.grid(row=9, column=3, sticky="w", padx=5, pady=5)
 
-    ttk.Button(frame_pedidos, text="Procesar pedido", command=procesar_pedido).grid(row=10, column=0, columnspan=2, padx=5, pady=10)
+    btn_procesar = ttk.Button(frame_pedidos, text="Procesar pedido", command=procesar_pedido)
+    btn_procesar.grid(row=10, column=0, columnspan=2, padx=5, pady=10)
 
     # Configurar pesos del grid
     for r in range(11):
@@ -284,7 +410,8 @@ def VentanaRestaurante(root: tk.Toplevel) -> None:
 
     # --- Pestaña Inventario ---
 
-    ttk.Button(frame_inventario, text="Recargar inventario", command=cargar_inventario_tabla).grid(row=0, column=0, padx=5, pady=5)
+    btn_recargar_inv = ttk.Button(frame_inventario, text="Recargar inventario", command=cargar_inventario_tabla)
+    btn_recargar_inv.grid(row=0, column=0, padx=5, pady=5)
 
     columns_inv = ("Ingrediente", "Cantidad", "Unidad", "Mínimo")
     tree_inv = ttk.Treeview(frame_inventario, columns=columns_inv, show="headings", height=18)
@@ -294,13 +421,56 @@ def VentanaRestaurante(root: tk.Toplevel) -> None:
     tree_inv.grid(row=1, column=0, columnspan=3, sticky="nsew", padx=5, pady=5)
 
     scroll_inv_y = ttk.Scrollbar(frame_inventario, orient="vertical", command=tree_inv.yview)
-    tree_inv.configure(yscrollcommand=scroll_inv_y.set)
     scroll_inv_y.grid(row=1, column=3, sticky="ns")
+    enlace_inv = EnlaceTreeview(
+        tree_inv,
+        clave=lambda r: f"ing-{r['id_ingrediente']}",
+        valores=lambda r: (r["nombre_ingrediente"], r["cantidad"], r["unidad_medida"], r["stock_minimo"]),
+        scrollbar=scroll_inv_y,
+    )
 
     frame_inventario.grid_rowconfigure(1, weight=1)
     for c in range(3):
         frame_inventario.grid_columnconfigure(c, weight=1)
 
-    # Inicialización de tablas al abrir
-    cargar_menu_tabla()
-    cargar_inventario_tabla()
+    # --- Pestaña Historial ---
+
+    hoy = date.today()
+    ttk.Label(frame_historial, text="Desde:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
+    entry_hist_desde = ttk.Entry(frame_historial, width=12)
+    entry_hist_desde.insert(0, hoy.replace(day=1).isoformat())
+    entry_hist_desde.grid(row=0, column=1, sticky="w", padx=5, pady=5)
+    ttk.Label(frame_historial, text="Hasta:").grid(row=0, column=2, sticky="w", padx=5, pady=5)
+    entry_hist_hasta = ttk.Entry(frame_historial, width=12)
+    entry_hist_hasta.insert(0, hoy.isoformat())
+    entry_hist_hasta.grid(row=0, column=3, sticky="w", padx=5, pady=5)
+    ttk.Label(frame_historial, text="Habitación:").grid(row=0, column=4, sticky="w", padx=5, pady=5)
+    combo_hist_habitacion = ttk.Combobox(frame_historial, values=[], width=8)
+    combo_hist_habitacion.grid(row=0, column=5, sticky="w", padx=5, pady=5)
+    ttk.Label(frame_historial, text="Estado:").grid(row=0, column=6, sticky="w", padx=5, pady=5)
+    combo_hist_estado = ttk.Combobox(frame_historial, values=["Todos", "Completado", "Pendiente"],
+                                     state="readonly", width=12)
+    combo_hist_estado.current(0)
+    combo_hist_estado.grid(row=0, column=7, sticky="w", padx=5, pady=5)
+    btn_buscar_hist = ttk.Button(frame_historial, text="Buscar", command=buscar_historial)
+    btn_buscar_hist.grid(row=0, column=8, padx=5, pady=5)
+
+    columns_hist = ("Fecha", "Hora", "Habitación", "Estado", "Total", "Pago")
+    tree_hist = ttk.Treeview(frame_historial, columns=columns_hist, show="tree headings", height=18)
+    tree_hist.heading("#0", text="Pedido")
+    tree_hist.column("#0", width=200, stretch=True)
+    for col in columns_hist:
+        tree_hist.heading(col, text=col)
+        tree_hist.column(col, width=100, stretch=True)
+    tree_hist.grid(row=1, column=0, columnspan=9, sticky="nsew", padx=5, pady=5)
+
+    scroll_hist_y = ttk.Scrollbar(frame_historial, orient="vertical", command=tree_hist.yview)
+    tree_hist.configure(yscrollcommand=scroll_historial)
+    scroll_hist_y.grid(row=1, column=9, sticky="ns")
+
+    frame_historial.grid_rowconfigure(1, weight=1)
+    for c in range(9):
+        frame_historial.grid_columnconfigure(c, weight=1 if c == 8 else 0)
+
+    # Inicialización (esquema, habitaciones y tablas) al abrir, fuera del hilo de Tk
+    inicializar()
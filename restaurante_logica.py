@@ -9,7 +9,8 @@ from dataclasses import dataclass
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
-from restaurante_db import RestauranteDB
+import migraciones
+from restaurante_db import DECIMALES_CANTIDAD, RestauranteDB
 
 
 @dataclass(frozen=True)
@@ -23,6 +24,80 @@ class ItemPedido:
     cantidad: int
 
 
+class CatalogoMenu:
+    """
+    Menú en memoria indexado por id_plato y por tipo, junto con las recetas
+    compiladas (id_plato -> [(id_ingrediente, consumo por unidad, unidad_medida)]).
+    Antes de usarse se verifica (sin leer la tabla) que siga vigente; se recarga si:
+    - cambió RestauranteDB.version_menu (add/update/delete_plato o set_receta de
+      esa instancia, o conexión nueva, p. ej. con RestauranteDB no persistente), o
+    - cambió PRAGMA data_version (otra conexión o proceso escribió en la BD).
+    Debe usarse dentro de 'with db', que serializa el acceso entre hilos.
+    """
+
+    def __init__(self) -> None:
+        self._por_id: Dict[int, Dict] = {}
+        self._por_tipo: Dict[str, List[Dict]] = {}
+        self._todos: List[Dict] = []
+        self._recetas: Dict[int, List[Tuple[int, float, str]]] = {}
+        self._firma: Optional[Tuple[int, int]] = None  # (version_menu, data_version)
+
+    def _vigente(self, db: RestauranteDB) -> None:
+        firma = (db.version_menu, db.conn.execute("PRAGMA data_version;").fetchone()[0])
+        if firma == self._firma:
+            return
+        self._todos = db.get_menu()  # ordenado por tipo y nombre_plato
+        self._por_id = {p["id_plato"]: p for p in self._todos}
+        self._por_tipo = {}
+        for p in self._todos:
+            self._por_tipo.setdefault(p["tipo"], []).append(p)
+        self._recetas = {}
+        for r in db.get_recetas():
+            self._recetas.setdefault(r["id_plato"], []).append(
+                (r["id_ingrediente"], r["consumo"], r["unidad_medida"]))
+        self._firma = firma
+
+    def plato(self, db: RestauranteDB, id_plato: int) -> Optional[Dict]:
+        """Plato por id (dict compartido: no modificar) o None."""
+        self._vigente(db)
+        return self._por_id.get(id_plato)
+
+    def platos(self, db: RestauranteDB, ids: List[int]) -> Dict[int, Dict]:
+        """Platos existentes entre 'ids', con una sola verificación de vigencia."""
+        self._vigente(db)
+        return {i: self._por_id[i] for i in ids if i in self._por_id}
+
+    def listar(self, db: RestauranteDB, tipo: Optional[str] = None) -> List[Dict]:
+        """Copia del menú (o de un tipo), en el mismo orden que RestauranteDB.get_menu()."""
+        self._vigente(db)
+        platos = self._por_tipo.get(tipo, []) if tipo else self._todos
+        return [dict(p) for p in platos]
+
+    def demanda(self, db: RestauranteDB, items: List[ItemPedido]) -> Dict[int, float]:
+        """
+        Suma en memoria el consumo de todo el pedido por ingrediente:
+        {id_ingrediente: cantidad}. En 'kg' se redondea a milésimas (como se
+        guarda en inventario); en 'unidades', al entero más cercano.
+        """
+        self._vigente(db)
+        totales: Dict[int, float] = {}
+        unidades: Dict[int, str] = {}
+        for item in items:
+            for id_ingrediente, consumo, unidad in self._recetas.get(item.id_plato, ()):
+                totales[id_ingrediente] = totales.get(id_ingrediente, 0.0) + consumo * item.cantidad
+                unidades[id_ingrediente] = unidad
+        for id_ingrediente, unidad in unidades.items():
+            if unidad == "kg":
+                totales[id_ingrediente] = round(totales[id_ingrediente], DECIMALES_CANTIDAD)
+            else:
+                totales[id_ingrediente] = int(round(totales[id_ingrediente]))
+        return {i: c for i, c in totales.items() if c > 0}
+
+    def invalidar(self) -> None:
+        """Fuerza la recarga en el próximo uso."""
+        self._firma = None
+
+
 class RestauranteLogica:
     """
     Orquestador de la lógica del módulo Restaurante.
@@ -30,21 +105,11 @@ class RestauranteLogica:
     """
 
     CARGO_SERVICIO_PORCENTAJE = 0.10  # 10%
+    PAGO_CARGO_HABITACION = "Cargo a habitación"  # se cobra en el folio, exige reserva activa
 
     def __init__(self, db: Optional[RestauranteDB] = None) -> None:
         self.db = db or RestauranteDB()
-
-        # Mapa de recetas: plato -> consumo de ingredientes por unidad
-        # Nota: Este mapping es demostrativo para los platos iniciales.
-        # Puede externalizarse a otra tabla en el futuro.
-        self.recetas_por_plato: Dict[str, Dict[str, float]] = {
-            "Tacos al Pastor": {"Carne de Cerdo": 0.20, "Piña": 0.10, "Cilantro": 0.05},  # kg / unidades
-            "Enchiladas Suizas": {"Pollo": 0.25, "Maíz": 0.20, "Cilantro": 0.03},
-            "Guacamole con Totopos": {"Aguacate": 1.00, "Maíz": 0.10, "Cilantro": 0.02},
-            "Sopa de Tortilla": {"Maíz": 0.15, "Aguacate": 0.20, "Cilantro": 0.02},
-            "Cochinita Pibil": {"Carne de Cerdo": 0.30, "Cilantro": 0.03},
-            "Agua de Jamaica": {},  # sin ingredientes del inventario controlado
-        }
+        self.catalogo = CatalogoMenu()
 
     # --- Utilidades de tiempo ---
 
@@ -62,12 +127,13 @@ class RestauranteLogica:
     def calcular_subtotal(self, items: List[ItemPedido]) -> float:
         """
         Calcula el subtotal sumando precio_unitario * cantidad de cada ítem.
-        Obtiene precios desde la tabla 'menu'.
+        Obtiene precios del catálogo en memoria (sin consultas por ítem).
         """
         subtotal = 0.0
         with self.db as db:
+            platos = self.catalogo.platos(db, [item.id_plato for item in items])
             for item in items:
-                plato = db.get_plato_por_id(item.id_plato)
+                plato = platos.get(item.id_plato)
                 if not plato:
                     raise ValueError(f"Plato con id {item.id_plato} no existe.")
                 precio = float(plato["precio"])
@@ -81,46 +147,12 @@ class RestauranteLogica:
 
     # --- Inventario ---
 
-    def _consumir_inventario_por_plato(self, nombre_plato: str, cantidad_platos: int) -> List[str]:
-        """
-        Aplica consumo al inventario según la receta declarada.
-        Retorna una lista de advertencias de bajo stock tras el consumo.
-        """
-        advertencias = []
-        receta = self.recetas_por_plato.get(nombre_plato, {})
-        if not receta:
-            return advertencias  # plato sin ingredientes controlados
-
-        with self.db as db:
-            # Convertir consumos en unidades coherentes con inventario:
-            # - Para 'kg', delta es negativo y en unidades decimales.
-            # - Para 'unidades', delta negativo entero (redondeado).
-            for ingrediente, consumo_por_unidad in receta.items():
-                ing = db.get_ingrediente_por_nombre(ingrediente)
-                if not ing:
-                    # Si el ingrediente no existe, levantamos error para mantener integridad.
-                    raise RuntimeError(f"Ingrediente requerido no encontrado: {ingrediente}")
-
-                unidad = ing["unidad_medida"]
-                consumo_total = consumo_por_unidad * cantidad_platos
-
-                # Normalizar delta según unidad
-                if unidad == "kg":
-                    # Permitimos flotantes para kg.
-                    delta = -consumo_total
-                else:
-                    # Para 'unidades', redondeamos al entero más cercano hacia arriba.
-                    delta = -int(round(consumo_total))
-
-                db.update_inventario_cantidad(ingrediente, delta)
-
-            # Verificar bajo stock tras consumo
-            bajos = db.get_bajo_stock()
-            for b in bajos:
-                advertencias.append(
-                    f"Stock bajo: {b['nombre_ingrediente']} ({b['cantidad']} {b['unidad_medida']} < mínimo {b['stock_minimo']})"
-                )
-        return advertencias
+    @staticmethod
+    def _mensajes_bajo_stock(bajos: List[Dict]) -> List[str]:
+        return [
+            f"Stock bajo: {b['nombre_ingrediente']} ({b['cantidad']} {b['unidad_medida']} < mínimo {b['stock_minimo']})"
+            for b in bajos
+        ]
 
     # --- Procesamiento de pedidos ---
 
@@ -132,53 +164,80 @@ class RestauranteLogica:
     ) -> Dict:
         """
         Crea el pedido, agrega detalles, actualiza inventario y registra la transacción.
-        Retorna un resumen con total y posibles advertencias.
+        El consumo de ingredientes de todo el pedido se suma en memoria con las
+        recetas compiladas y se descuenta con un UPDATE por ingrediente distinto.
+        Retorna un resumen con total y advertencias de los ingredientes que
+        quedaron bajo el mínimo con este pedido (una por ingrediente).
         """
         if not items:
             raise ValueError("El pedido no tiene ítems.")
 
+        # Todo el pedido (detalles, inventario, transacción y estado) se confirma
+        # en un solo commit; cualquier error lo revierte completo.
+        with self.db as db, db.transaccion():
+            return self.registrar_pedido_en(db, id_habitacion, items, metodo_pago)
+
+    def registrar_pedido_en(
+        self,
+        db: RestauranteDB,
+        id_habitacion: int,
+        items: List[ItemPedido],
+        metodo_pago: Optional[str],
+    ) -> Dict:
+        """
+        Registra el pedido sobre 'db' y retorna el mismo resumen que procesar_pedido().
+        Debe llamarse dentro de 'with db' con una transacción abierta
+        (db.transaccion()) o dentro de un SAVEPOINT de esa transacción.
+        No confirma ni revierte: de eso se encarga quien la abrió
+        (procesar_pedido o el escritor de ColaPedidos); si lanza una
+        excepción, lo ya escrito del pedido debe revertirse.
+        """
         fecha, hora = self._fecha_hora_actual()
 
-        with self.db as db:
-            # Crear pedido en estado 'Pendiente'
-            id_pedido = db.create_pedido(id_habitacion=id_habitacion, fecha=fecha, hora=hora, estado="Pendiente")
+        # Vincular con la estadía en curso (queda en el folio de esa reserva)
+        id_reserva = db.get_reserva_activa(id_habitacion, fecha)
+        if id_reserva is None and metodo_pago == self.PAGO_CARGO_HABITACION:
+            raise ValueError(f"La habitación {id_habitacion} no tiene una reserva activa para cargar el pedido.")
 
-            # Agregar detalles y consumir inventario por cada ítem
-            advertencias: List[str] = []
-            subtotal = 0.0
+        # Crear pedido en estado 'Pendiente'
+        id_pedido = db.create_pedido(id_habitacion=id_habitacion, fecha=fecha, hora=hora, estado="Pendiente",
+                                     id_reserva=id_reserva)
 
-            for item in items:
-                plato = db.get_plato_por_id(item.id_plato)
-                if not plato:
-                    raise ValueError(f"Plato con id {item.id_plato} no existe.")
-
-                precio_unitario = float(plato["precio"])
-                subtotal += precio_unitario * item.cantidad
+        # Agregar detalles (precios del catálogo)
+        subtotal = 0.0
+        detalles_nuevos = []
+        platos = self.catalogo.platos(db, [item.id_plato for item in items])
+        for item in items:
+            plato = platos.get(item.id_plato)
+            if not plato:
+                raise ValueError(f"Plato con id {item.id_plato} no existe.")
 
-                db.add_detalle_pedido(
-                    id_pedido=id_pedido,
-                    id_plato=item.id_plato,
-                    cantidad=item.cantidad,
-                    precio_unitario=precio_unitario,
-                )
+            precio_unitario = float(plato["precio"])
+            subtotal += precio_unitario * item.cantidad
+            detalles_nuevos.append((item.id_plato, item.cantidad, precio_unitario))
+        db.add_detalles_pedido(id_pedido, detalles_nuevos)
 
-                # Consumir inventario según receta
-                advert = self._consumir_inventario_por_plato(plato["nombre_plato"], item.cantidad)
-                advertencias.extend(advert)
+        # Consumir inventario según recetas (un UPDATE por ingrediente).
+        # Bajo BEGIN IMMEDIATE nadie más escribe: las alertas posteriores
+        # a la marca son exactamente los mínimos que cruzó este pedido.
+        marca = db.get_marca_alertas_stock()
+        db.descontar_inventario(self.catalogo.demanda(db, items))
+        advertencias = self._mensajes_bajo_stock(db.get_alertas_stock_desde(marca))
 
-            subtotal = round(subtotal, 2)
-            total = self.calcular_total_con_servicio(subtotal)
+        subtotal = round(subtotal, 2)
+        total = self.calcular_total_con_servicio(subtotal)
 
-            # Registrar transacción
-            db.record_transaccion(id_pedido=id_pedido, fecha=self._fecha_actual(), monto_total=total, metodo_pago=metodo_pago)
+        # Registrar transacción
+        db.record_transaccion(id_pedido=id_pedido, fecha=self._fecha_actual(), monto_total=total, metodo_pago=metodo_pago)
 
-            # Actualizar estado del pedido a 'Completado'
-            db.update_estado_pedido(id_pedido=id_pedido, estado="Completado")
+        # Actualizar estado del pedido a 'Completado'
+        db.update_estado_pedido(id_pedido=id_pedido, estado="Completado")
 
-            detalles = db.get_detalles_pedido(id_pedido)
+        detalles = db.get_detalles_pedido(id_pedido)
 
         return {
             "id_pedido": id_pedido,
+            "id_reserva": id_reserva,
             "fecha": fecha,
             "hora": hora,
             "subtotal": subtotal,
@@ -191,26 +250,86 @@ class RestauranteLogica:
     # --- Consultas auxiliares para GUI ---
 
     def listar_menu_por_tipo(self, tipo: Optional[str] = None) -> List[Dict]:
-        """Retorna el menú filtrado (o completo)."""
+        """Retorna el menú filtrado (o completo) desde el catálogo en memoria."""
         with self.db as db:
-            return db.get_menu(tipo)
+            return self.catalogo.listar(db, tipo)
+
+    def listar_habitaciones(self) -> List[Dict]:
+        """Retorna las habitaciones del hotel (id_habitacion, numero_habitacion)."""
+        with self.db as db:
+            return db.get_habitaciones()
 
     def listar_inventario(self) -> List[Dict]:
         """Retorna el inventario completo."""
         with self.db as db:
             return db.get_inventario()
 
+    def listar_historial_pedidos(
+        self,
+        fecha_desde: str,
+        fecha_hasta: str,
+        id_habitacion: Optional[int] = None,
+        estado: Optional[str] = None,
+        cursor: Optional[Tuple[str, int]] = None,
+        tam_pagina: int = 50,
+    ) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+        """
+        Una página del historial de pedidos (más recientes primero), con sus
+        detalles y transacción. Retorna (pedidos, cursor_siguiente); el cursor
+        se pasa tal cual para pedir la página siguiente y es None en la última.
+        """
+        if tam_pagina < 1:
+            raise ValueError("El tamaño de página debe ser al menos 1.")
+        with self.db as db:
+            pedidos = db.get_historial_pedidos(fecha_desde, fecha_hasta, id_habitacion, estado,
+                                               despues_de=cursor, limite=tam_pagina + 1)
+        if len(pedidos) <= tam_pagina:
+            return pedidos, None
+        pedidos = pedidos[:tam_pagina]
+        return pedidos, (pedidos[-1]["fecha_pedido"], pedidos[-1]["id_pedido"])
+
+    def cierre_del_dia(self, fecha: str) -> Dict:
+        """
+        Resumen de cierre de 'fecha' (YYYY-MM-DD) desde los resúmenes diarios:
+        total cobrado, transacciones, cobros por método de pago y ventas por plato.
+        """
+        with self.db as db:
+            cobros = db.get_cobros_por_dia(fecha, fecha)
+            platos = db.get_ventas_por_plato(fecha, fecha)
+        return {
+            "fecha": fecha,
+            "transacciones": sum(c["transacciones"] for c in cobros),
+            "total_cobrado": round(sum(c["monto_total"] for c in cobros), 2),
+            "por_metodo_pago": {c["metodo_pago"]: c["monto_total"] for c in cobros},
+            "platos": platos,
+        }
+
     def verificar_bajo_stock(self) -> List[str]:
         """Genera mensajes de bajo stock actuales."""
         with self.db as db:
             bajos = db.get_bajo_stock()
-        return [
-            f"Stock bajo: {b['nombre_ingrediente']} ({b['cantidad']} {b['unidad_medida']} < mínimo {b['stock_minimo']})"
-            for b in bajos
-        ]
+        return self._mensajes_bajo_stock(bajos)
+
+    def marca_alertas_stock(self) -> int:
+        """Marca actual de alertas, para usar luego con alertas_stock_desde()."""
+        with self.db as db:
+            return db.get_marca_alertas_stock()
+
+    def alertas_stock_desde(self, marca: int) -> Tuple[List[str], int]:
+        """
+        Mensajes de los mínimos cruzados después de 'marca' y la nueva marca.
+        Cada cruce se informa una sola vez si se pasa siempre la marca retornada.
+        """
+        with self.db as db:
+            alertas = db.get_alertas_stock_desde(marca)
+        if alertas:
+            marca = alertas[-1]["id_alerta"]
+        return self._mensajes_bajo_stock(alertas), marca
 
     def inicializar_esquema_y_datos(self) -> None:
-        """Conveniencia: crea tablas e inserta datos iniciales."""
+        """
+        Conveniencia: aplica las migraciones pendientes (tablas, datos iniciales e índices).
+        Si la BD ya está al día solo se consulta PRAGMA user_version.
+        """
         with self.db as db:
-            db.create_tables()
-            db.seed_initial_data()
+            migraciones.migrar(db.conn)
@@ -0,0 +1,274 @@
+# servicio.py
+# Servicio local HTTP/JSON sobre la lógica del hotel y del restaurante, sin GUI.
+# Varias terminales pueden compartir un solo proceso: las conexiones por hilo
+# (conexiones.py), el catálogo de habitaciones, el índice de disponibilidad y
+# el catálogo del menú se cargan una vez, y las escrituras pasan por un solo
+# escritor por módulo (un hilo para reservas y ColaPedidos para pedidos) en
+# lugar de competir entre terminales por el bloqueo de escritura de SQLite.
+#
+# Uso:
+#   python servicio.py [--db mayan_sunset.db] [--host 127.0.0.1] [--puerto 8765] [--hilos 8]
+#
+# Rutas (cuerpos y respuestas JSON):
+#   POST /login                     {"usuario", "contrasena"}
+#   GET  /habitaciones/disponibles  ?tipo=Suite&fecha_ingreso=YYYY-MM-DD&fecha_salida=YYYY-MM-DD
+#   POST /reservas                  {"numero_habitacion", "fecha_ingreso", "fecha_salida", "dpi",
+#                                    "primer_nombre", "primer_apellido"} y opcionales
+#                                    "segundo_nombre", "segundo_apellido", "nit"
+#   GET  /menu                      [?tipo=Bebida]
+#   GET  /inventario
+#   POST /pedidos                   {"id_habitacion", "items": [{"id_plato", "cantidad"}], "metodo_pago"}
+# Códigos: 400 solicitud mal formada, 401 credenciales inválidas, 404 ruta
+# inexistente, 422 rechazo de una regla de negocio, 500 error de la BD.
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import datos
+import hotel_db
+import Hotel
+from cola_pedidos import ColaPedidos
+from logica import LogicaApp
+from restaurante_db import RestauranteDB
+from restaurante_logica import ItemPedido, RestauranteLogica
+
+HOST = "127.0.0.1"   # solo conexiones locales
+PUERTO = 8765
+HILOS = 8            # solicitudes atendidas a la vez
+MAX_CUERPO = 1 << 20  # bytes
+
+# Datos de POST /reservas (ver Hotel.crear_reserva)
+CAMPOS_RESERVA = ("numero_habitacion", "fecha_ingreso", "fecha_salida", "dpi", "primer_nombre", "primer_apellido")
+CAMPOS_RESERVA_OPCIONALES = ("segundo_nombre", "segundo_apellido")
+
+
+class SolicitudInvalida(ValueError):
+    """Cuerpo o parámetros mal formados (400)."""
+
+
+class ServicioHotel:
+    """
+    Operaciones expuestas por el servicio, independientes de HTTP.
+    atender(metodo, ruta, parametros, cuerpo) -> (código HTTP, dict de respuesta).
+    Todo el servicio usa una sola BD, 'db_path' (por defecto hotel_db.DB_PATH):
+    como Hotel y el login leen las rutas globales hotel_db.DB_PATH y
+    datos.DB_PATH, el constructor las apunta a 'db_path' (un servicio por proceso).
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self.db_path = db_path or hotel_db.DB_PATH
+        hotel_db.DB_PATH = datos.DB_PATH = self.db_path
+        Hotel.inicializar_sistema()
+        self.logica = RestauranteLogica(RestauranteDB(self.db_path, persistente=True))
+        self.login = LogicaApp(None)  # sin ventanas: solo validar_credenciales
+        self.pedidos = ColaPedidos(self.logica)
+        self._reservas = ThreadPoolExecutor(max_workers=1, thread_name_prefix="servicio-reservas")
+        self._rutas: Dict[Tuple[str, str], Callable[[Dict, Dict], Tuple[int, Dict]]] = {
+            ("POST", "/login"): self._login,
+            ("GET", "/habitaciones/disponibles"): self._habitaciones_disponibles,
+            ("POST", "/reservas"): self._crear_reserva,
+            ("GET", "/menu"): self._menu,
+            ("GET", "/inventario"): self._inventario,
+            ("POST", "/pedidos"): self._procesar_pedido,
+        }
+
+    def cerrar(self) -> None:
+        """Termina las escrituras encoladas y cierra la conexión del restaurante."""
+        self.pedidos.cerrar()
+        self._reservas.shutdown(wait=True)
+        self.logica.db.close()
+
+    def atender(self, metodo: str, ruta: str, parametros: Dict, cuerpo: Dict) -> Tuple[int, Dict]:
+        operacion = self._rutas.get((metodo, ruta.rstrip("/") or "/"))
+        if operacion is None:
+            return 404, {"error": f"Ruta no encontrada: {metodo} {ruta}"}
+        try:
+            return operacion(parametros, cuerpo)
+        except SolicitudInvalida as e:
+            return 400, {"error": str(e)}
+        except ValueError as e:
+            return 422, {"error": str(e)}
+        except RuntimeError as e:
+            return 500, {"error": str(e)}
+
+    # --- Operaciones ---
+
+    def _login(self, parametros: Dict, cuerpo: Dict) -> Tuple[int, Dict]:
+        exito, usuario, mensaje = self.login.validar_credenciales(
+            _texto(cuerpo, "usuario"), _texto(cuerpo, "contrasena"))
+        if not exito:
+            return 401, {"exito": False, "mensaje": mensaje}
+        return 200, {
+            "exito": True,
+            "mensaje": mensaje,
+            "usuario": {"id": usuario["id"], "usuario": usuario["usuario"], "tipo_usuario": usuario["tipo_usuario"]},
+        }
+
+    def _habitaciones_disponibles(self, parametros: Dict, cuerpo: Dict) -> Tuple[int, Dict]:
+        fecha_ingreso = _texto(parametros, "fecha_ingreso")
+        fecha_salida = _texto(parametros, "fecha_salida")
+        if Hotel.calcular_noches(fecha_ingreso, fecha_salida) is None:
+            raise SolicitudInvalida("Fechas inválidas")
+        tipo = parametros.get("tipo") or None
+        return 200, {"habitaciones": Hotel.buscar_habitaciones_disponibles(tipo, fecha_ingreso, fecha_salida)}
+
+    def _crear_reserva(self, parametros: Dict, cuerpo: Dict) -> Tuple[int, Dict]:
+        # Solo las llaves conocidas llegan a Hotel.crear_reserva, ya validadas como texto
+        reserva = {campo: _texto(cuerpo, campo) for campo in CAMPOS_RESERVA}
+        for campo in CAMPOS_RESERVA_OPCIONALES:
+            reserva[campo] = _texto_opcional(cuerpo, campo)
+        reserva["nit"] = _texto_opcional(cuerpo, "nit") or None
+        exito, mensaje = self._reservas.submit(Hotel.crear_reserva, reserva).result()
+        return (201 if exito else 422), {"exito": exito, "mensaje": mensaje}
+
+    def _menu(self, parametros: Dict, cuerpo: Dict) -> Tuple[int, Dict]:
+        return 200, {"menu": self.logica.listar_menu_por_tipo(parametros.get("tipo") or None)}
+
+    def _inventario(self, parametros: Dict, cuerpo: Dict) -> Tuple[int, Dict]:
+        return 200, {"inventario": self.logica.listar_inventario()}
+
+    def _procesar_pedido(self, parametros: Dict, cuerpo: Dict) -> Tuple[int, Dict]:
+        id_habitacion = _entero_positivo(cuerpo, "id_habitacion")
+        items = cuerpo.get("items")
+        if not isinstance(items, list) or not items or not all(isinstance(i, dict) for i in items):
+            raise SolicitudInvalida("Se requieren items [{id_plato, cantidad}].")
+        items = [ItemPedido(id_plato=_entero_positivo(i, "id_plato"), cantidad=_entero_positivo(i, "cantidad"))
+                 for i in items]
+        metodo_pago = cuerpo.get("metodo_pago")
+        if metodo_pago is not None and not isinstance(metodo_pago, str):
+            raise SolicitudInvalida("El campo 'metodo_pago' debe ser texto o null.")
+        return 201, self.pedidos.enviar(id_habitacion, items, metodo_pago).result()
+
+
+def _entero_positivo(origen: Dict, campo: str) -> int:
+    # JSON: 2.7, "2" o true no son enteros (bool es subclase de int en Python)
+    valor = origen.get(campo)
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor <= 0:
+        raise SolicitudInvalida(f"El campo '{campo}' debe ser un entero positivo.")
+    return valor
+
+
+def _texto(origen: Dict, campo: str) -> str:
+    valor = origen.get(campo)
+    if not isinstance(valor, str) or not valor.strip():
+        raise SolicitudInvalida(f"Falta el campo '{campo}'.")
+    return valor.strip()
+
+
+def _texto_opcional(origen: Dict, campo: str) -> str:
+    valor = origen.get(campo)
+    if valor is None:
+        return ""
+    if not isinstance(valor, str):
+        raise SolicitudInvalida(f"El campo '{campo}' debe ser texto.")
+    return valor.strip()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    server_version = "MayanSunset/1.0"
+
+    def do_GET(self) -> None:
+        self._responder("GET")
+
+    def do_POST(self) -> None:
+        self._responder("POST")
+
+    def _responder(self, metodo: str) -> None:
+        url = urlsplit(self.path)
+        parametros = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            cuerpo = self._leer_cuerpo()
+        except SolicitudInvalida as e:
+            self._enviar(400, {"error": str(e)})
+            return
+        try:
+            codigo, respuesta = self.server.servicio.atender(metodo, url.path, parametros, cuerpo)
+        except Exception as e:
+            self.log_error("Error atendiendo %s %s: %r", metodo, url.path, e)
+            codigo, respuesta = 500, {"error": "Error interno del servicio."}
+        self._enviar(codigo, respuesta)
+
+    def _leer_cuerpo(self) -> Dict:
+        try:
+            largo = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise SolicitudInvalida("Content-Length inválido.")
+        if largo < 0:
+            raise SolicitudInvalida("Content-Length inválido.")
+        if largo > MAX_CUERPO:
+            raise SolicitudInvalida("El cuerpo de la solicitud es demasiado grande.")
+        if largo == 0:
+            return {}
+        try:
+            cuerpo = json.loads(self.rfile.read(largo).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise SolicitudInvalida("El cuerpo no es JSON válido.")
+        if not isinstance(cuerpo, dict):
+            raise SolicitudInvalida("El cuerpo debe ser un objeto JSON.")
+        return cuerpo
+
+    def _enviar(self, codigo: int, respuesta: Dict) -> None:
+        datos_json = json.dumps(respuesta, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos_json)))
+        self.end_headers()
+        self.wfile.write(datos_json)
+
+    def log_message(self, formato: str, *args) -> None:
+        pass  # sin una línea por solicitud; log_error sigue reportando fallos
+
+
+class ServidorHTTP(HTTPServer):
+    """
+    HTTPServer que atiende cada conexión en un pool fijo de 'hilos' hilos
+    (en lugar de un hilo nuevo por conexión como ThreadingHTTPServer), así
+    cada hilo conserva su conexión del pool de conexiones.py entre solicitudes.
+    """
+
+    def __init__(self, direccion: Tuple[str, int], servicio: ServicioHotel, hilos: int = HILOS) -> None:
+        super().__init__(direccion, _Manejador)
+        self.servicio = servicio
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="servicio-http")
+
+    def process_request(self, request, client_address) -> None:
+        self._pool.submit(self._atender_conexion, request, client_address)
+
+    def _atender_conexion(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._pool.shutdown(wait=True)
+        self.servicio.cerrar()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servicio local HTTP/JSON de Mayan Sunset.")
+    parser.add_argument("--db", default=hotel_db.DB_PATH, help="ruta del archivo SQLite")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--hilos", type=int, default=HILOS)
+    args = parser.parse_args()
+
+    servidor = ServidorHTTP((args.host, args.puerto), ServicioHotel(args.db), args.hilos)
+    print(f"Servicio en http://{args.host}:{servidor.server_address[1]} (Ctrl+C para detener)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
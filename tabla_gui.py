@@ -0,0 +1,92 @@
+# tabla_gui.py
+# Enlace entre una lista de filas y un ttk.Treeview que actualiza por clave:
+# solo inserta, modifica, mueve o borra los ítems cuyos datos cambiaron, en
+# lugar de vaciar y volver a llenar la tabla en cada cambio. Con muchas filas
+# solo se muestran las primeras páginas y se agregan más al desplazarse.
+#
+#   enlace = EnlaceTreeview(tree, clave=lambda m: f"plato-{m['id_plato']}",
+#                           valores=lambda m: (m["id_plato"], m["nombre_plato"]),
+#                           scrollbar=scroll_y)
+#   enlace.actualizar(menu)      # cada vez que cambian los datos
+
+from tkinter import ttk
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+TAM_PAGINA = 200  # filas que se agregan a la tabla por página
+
+
+class EnlaceTreeview:
+    """
+    - clave(fila): iid estable y único de la fila en el Treeview.
+    - valores(fila): tupla de valores de las columnas.
+    - tam_pagina: filas mostradas al inicio y agregadas en cada página.
+    - scrollbar: si se indica, el enlace toma el yscrollcommand del Treeview
+      y carga la página siguiente cuando la vista llega al final.
+    fila(iid) retorna la fila original mostrada con ese iid.
+    """
+
+    def __init__(
+        self,
+        tree: ttk.Treeview,
+        clave: Callable[[Any], Any],
+        valores: Callable[[Any], Iterable],
+        tam_pagina: int = TAM_PAGINA,
+        scrollbar: Optional[ttk.Scrollbar] = None,
+    ) -> None:
+        self.tree = tree
+        self.clave = clave
+        self.valores = valores
+        self.tam_pagina = tam_pagina
+        self.scrollbar = scrollbar
+        self._datos: List[Tuple[str, tuple, Any]] = []   # todas las filas, en orden: (iid, valores, fila)
+        self._mostradas: Dict[str, tuple] = {}           # iid -> valores que tiene hoy el Treeview
+        self._orden: List[str] = []                      # iids en el Treeview, en orden
+        self._filas: Dict[str, Any] = {}
+        self._limite = tam_pagina                        # cuántas filas de _datos se muestran
+        if scrollbar is not None:
+            tree.configure(yscrollcommand=self._al_desplazar)
+
+    def actualizar(self, filas: Iterable) -> None:
+        """Reemplaza los datos y aplica al Treeview solo las diferencias."""
+        self._datos = [(str(self.clave(f)), tuple(self.valores(f)), f) for f in filas]
+        self._filas = {iid: f for iid, _, f in self._datos}
+        self._sincronizar()
+
+    def fila(self, iid: str) -> Any:
+        return self._filas.get(iid)
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def _sincronizar(self) -> None:
+        visibles = self._datos[:self._limite]
+        nuevas = {iid: valores for iid, valores, _ in visibles}
+
+        # 1) Borrar lo que ya no está (o quedó fuera de las páginas mostradas)
+        borrar = [iid for iid in self._orden if iid not in nuevas]
+        if borrar:
+            self.tree.delete(*borrar)
+            for iid in borrar:
+                del self._mostradas[iid]
+
+        # 2) Reordenar las que siguen, solo si cambió su orden relativo
+        siguen = [iid for iid, _, _ in visibles if iid in self._mostradas]
+        if siguen != [iid for iid in self._orden if iid in nuevas]:
+            for posicion, iid in enumerate(siguen):
+                self.tree.move(iid, "", posicion)
+
+        # 3) Insertar las nuevas en su posición y modificar las que cambiaron
+        for posicion, (iid, valores, _) in enumerate(visibles):
+            anteriores = self._mostradas.get(iid)
+            if anteriores is None:
+                self.tree.insert("", posicion, iid=iid, values=valores)
+            elif anteriores != valores:
+                self.tree.item(iid, values=valores)
+            self._mostradas[iid] = valores
+        self._orden = [iid for iid, _, _ in visibles]
+
+    def _al_desplazar(self, primero: str, ultimo: str) -> None:
+        self.scrollbar.set(primero, ultimo)
+        if float(ultimo) >= 0.95 and len(self._datos) > self._limite:
+            self._limite += self.tam_pagina
+            self.tree.after_idle(self._sincronizar)
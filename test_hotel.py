@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas automatizadas del módulo Hotel (reservas y disponibilidad).
+Trabajan sobre una BD temporal en disco, sin necesidad de GUI.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+import arranque
+import conexiones
+import datos
+import fechas
+import hotel_db
+import Hotel
+import migraciones
+import reportes
+import servicio
+
+
+def _datos_reserva(numero_habitacion, fecha_ingreso, fecha_salida, dpi="1234567890123"):
+    return {
+        "numero_habitacion": numero_habitacion,
+        "dpi": dpi,
+        "nit": "12345678901",
+        "primer_nombre": "Carlos",
+        "segundo_nombre": "",
+        "primer_apellido": "Pérez",
+        "segundo_apellido": "",
+        "fecha_ingreso": fecha_ingreso,
+        "fecha_salida": fecha_salida,
+    }
+
+
+class TestHotelModulo(unittest.TestCase):
+
+    def setUp(self):
+        """Configura una BD temporal en disco y la inicializa con datos."""
+        self.test_db_path = "test_hotel.db"
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+        self._db_path_original = hotel_db.DB_PATH
+        hotel_db.DB_PATH = self.test_db_path
+        Hotel.inicializar_sistema()
+
+    def tearDown(self):
+        """Restaura la ruta de BD y elimina la BD temporal."""
+        Hotel._catalogos_habitaciones.pop(self.test_db_path, None)
+        indice = Hotel._indices_disponibilidad.pop(self.test_db_path, None)
+        if indice is not None:
+            indice.cerrar()
+        conexiones.gestor.cerrar_ruta(self.test_db_path)
+        hotel_db.DB_PATH = self._db_path_original
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_migraciones_aplicadas_una_vez(self):
+        """La BD queda en la última versión, con índices, y re-migrar no hace nada."""
+        conn = hotel_db.get_connection()
+        self.assertEqual(migraciones.version_actual(conn), migraciones.ULTIMA_VERSION)
+        indices = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn("idx_reserva_habitacion_dias", indices)
+        self.assertIn("idx_pedidos_dia", indices)
+        # Las columnas de día generadas coinciden con fechas.a_dia()
+        for fecha_ingreso, dia_ingreso in conn.execute("SELECT fecha_ingreso, dia_ingreso FROM reserva"):
+            self.assertEqual(dia_ingreso, fechas.a_dia(fecha_ingreso))
+        total_reservas = conn.execute("SELECT COUNT(*) FROM reserva").fetchone()[0]
+
+        self.assertEqual(migraciones.migrar(conn), migraciones.ULTIMA_VERSION)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM reserva").fetchone()[0], total_reservas)
+
+    def test_arranque_camino_rapido(self):
+        """Con la BD al día el arranque no ejecuta DDL; los usuarios semilla vienen de las migraciones."""
+        conn = hotel_db.get_connection()
+        usuarios = {u for (u,) in conn.execute("SELECT usuario FROM Usuario")}
+        self.assertTrue({"admin", "empleado1", "empleado2"} <= usuarios)
+
+        consultas = []
+        ruta_datos = datos.DB_PATH
+        datos.DB_PATH = self.test_db_path
+        conn.set_trace_callback(consultas.append)
+        try:
+            self.assertTrue(arranque.preparar_bd(self.test_db_path))
+            datos.seed_usuario()
+        finally:
+            conn.set_trace_callback(None)
+            datos.DB_PATH = ruta_datos
+        self.assertTrue(consultas)
+        self.assertTrue(all(c.strip().upper().startswith("PRAGMA") for c in consultas), consultas)
+
+        # El camino rápido no importa migraciones ni las capas de datos
+        script = ("import sys, arranque; assert arranque.preparar_bd(sys.argv[1]); "
+                  "print(sorted(m for m in ('migraciones', 'hotel_db', 'restaurante_db', 'fechas') "
+                  "if m in sys.modules))")
+        salida = subprocess.run([sys.executable, "-c", script, self.test_db_path],
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(salida.strip(), "[]")
+
+        ruta_log = "test_arranque.log"
+        tiempos = arranque.TiemposArranque()
+        tiempos.marcar("importar")
+        tiempos.marcar("bd", "al día")
+        try:
+            tiempos.registrar(ruta_log)
+            with open(ruta_log, encoding="utf-8") as f:
+                linea = f.read().strip()
+        finally:
+            if os.path.exists(ruta_log):
+                os.remove(ruta_log)
+        self.assertRegex(linea, r"importar=\d+\.\dms bd=\d+\.\dms\(al día\) total=\d+\.\dms$")
+
+    def test_conexion_compartida_sin_reaperturas(self):
+        """Las consultas repetidas reutilizan la conexión del hilo, configurada en WAL."""
+        hotel_db.get_all_habitaciones()
+        antes = conexiones.estadisticas()
+        for _ in range(50):
+            hotel_db.get_all_habitaciones()
+            hotel_db.get_precio_por_tipo("Suite")
+        self.assertEqual(conexiones.estadisticas()["aperturas"], antes["aperturas"])
+        modo = hotel_db.get_connection().execute("PRAGMA journal_mode;").fetchone()[0]
+        self.assertEqual(modo.lower(), "wal")
+
+    def test_reserva_solapada_rechazada(self):
+        """Una segunda reserva que se solapa en la misma habitación es rechazada."""
+        exito, mensaje = Hotel.crear_reserva(_datos_reserva("H115", "2025-12-01", "2025-12-05"))
+        self.assertTrue(exito, mensaje)
+
+        exito, mensaje = Hotel.crear_reserva(
+            _datos_reserva("H115", "2025-12-03", "2025-12-04", dpi="1234567890888"))
+        self.assertFalse(exito)
+        self.assertEqual(mensaje, "Habitación no disponible")
+
+    def test_salida_e_ingreso_el_mismo_dia(self):
+        """La fecha de salida queda libre para un nuevo ingreso."""
+        exito, _ = Hotel.crear_reserva(_datos_reserva("H115", "2025-12-01", "2025-12-05"))
+        self.assertTrue(exito)
+        exito, mensaje = Hotel.crear_reserva(
+            _datos_reserva("H115", "2025-12-05", "2025-12-07", dpi="1234567890888"))
+        self.assertTrue(exito, mensaje)
+
+    def test_reservas_concurrentes_sin_doble_reserva(self):
+        """Varias terminales (hilos) reservando la misma habitación: solo una lo logra."""
+        Hotel.obtener_indice_disponibilidad().disponible(15, "2025-12-01", "2025-12-05")
+        resultados = []
+
+        def terminal(n):
+            dpi = f"{3000000000000 + n}"
+            resultados.append(Hotel.crear_reserva(_datos_reserva("H115", "2025-12-01", "2025-12-05", dpi=dpi)))
+
+        hilos = [threading.Thread(target=terminal, args=(n,)) for n in range(8)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(sum(1 for exito, _ in resultados if exito), 1)
+        conn = hotel_db.get_connection()
+        # Las terminales rechazadas no dejan huéspedes huérfanos
+        self.assertEqual(conn.execute(
+            "SELECT COUNT(*) FROM huesped WHERE dpi LIKE '300000000000_'").fetchone()[0], 1)
+
+    def test_cancelacion_libera_habitacion(self):
+        """Al cancelar una reserva sus noches vuelven a estar disponibles."""
+        exito, mensaje = Hotel.crear_reserva(_datos_reserva("H115", "2025-12-01", "2025-12-05"))
+        self.assertTrue(exito, mensaje)
+        id_reserva = int(mensaje.split("ID: ")[1].split(")")[0])
+
+        exito, _ = Hotel.cancelar_reserva(id_reserva)
+        self.assertTrue(exito)
+        exito, mensaje = Hotel.crear_reserva(
+            _datos_reserva("H115", "2025-12-02", "2025-12-04", dpi="1234567890888"))
+        self.assertTrue(exito, mensaje)
+
+    def test_unidad_de_trabajo_no_confirma_transaccion_ajena(self):
+        """Una escritura anidada en la transacción abierta del hilo no la confirma."""
+        exito, mensaje = Hotel.crear_reserva(_datos_reserva("H115", "2025-12-01", "2025-12-05"))
+        self.assertTrue(exito, mensaje)
+        id_reserva = int(mensaje.split("ID: ")[1].split(")")[0])
+
+        conn = hotel_db.get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE habitacion SET estado = 'Mantenimiento' WHERE numero_habitacion = 'H101'")
+        exito, _ = Hotel.cancelar_reserva(id_reserva)
+        self.assertTrue(exito)
+        hotel_db.insert_huesped(conn, "1234567890999", "Ana", "", "Paz")
+        self.assertTrue(conn.in_transaction)
+        conn.rollback()
+
+        estado = conn.execute("SELECT estado FROM habitacion WHERE numero_habitacion = 'H101'").fetchone()[0]
+        self.assertEqual(estado, "Disponible")
+        self.assertNotEqual(hotel_db.get_reserva(conn, id_reserva)[4], hotel_db.ESTADO_CANCELADA)
+        self.assertIsNone(hotel_db.get_huesped_por_dpi(conn, "1234567890999"))
+
+    def test_calendario_de_noches(self):
+        """room_night sigue a las reservas al crear, modificar y cancelar."""
+        conn = hotel_db.get_connection()
+        ocupadas_antes = hotel_db.contar_habitaciones_ocupadas(conn, "2025-12-03")
+
+        exito, mensaje = Hotel.crear_reserva(_datos_reserva("H115", "2025-12-01", "2025-12-05"))
+        self.assertTrue(exito, mensaje)
+        id_reserva = int(mensaje.split("ID: ")[1].split(")")[0])
+        self.assertEqual(Hotel.ocupacion_del_dia("2025-12-03")["ocupadas"], ocupadas_antes + 1)
+        self.assertEqual(conn.execute(
+            "SELECT COUNT(*) FROM room_night WHERE id_reserva = ?", (id_reserva,)).fetchone()[0], 4)
+
+        # Modificar a fechas que chocan con otra reserva (H115 semilla: 2025-10-12..16) falla
+        exito, mensaje = Hotel.modificar_reserva(id_reserva, "2025-10-15", "2025-10-18")
+        self.assertFalse(exito)
+        self.assertEqual(mensaje, "Habitación no disponible")
+
+        exito, _ = Hotel.modificar_reserva(id_reserva, "2025-12-10", "2025-12-12")
+        self.assertTrue(exito)
+        self.assertEqual([r[0] for r in conn.execute(
+            "SELECT noche FROM room_night WHERE id_reserva = ? ORDER BY noche", (id_reserva,))],
+            [fechas.a_dia("2025-12-10"), fechas.a_dia("2025-12-11")])
+        self.assertTrue(Hotel.obtener_indice_disponibilidad().disponible(15, "2025-12-01", "2025-12-05"))
+
+        Hotel.cancelar_reserva(id_reserva)
+        self.assertEqual(conn.execute(
+            "SELECT COUNT(*) FROM room_night WHERE id_reserva = ?", (id_reserva,)).fetchone()[0], 0)
+
+    def test_reporte_general(self):
+        """Ocupación, ADR y RevPAR solo cuentan las noches dentro del período."""
+        exito, mensaje = Hotel.crear_reserva(_datos_reserva("H101", "2030-01-08", "2030-01-12"))
+        self.assertTrue(exito, mensaje)
+        conn = hotel_db.get_connection()
+        with conexiones.unidad_de_trabajo(conn):
+            for id_pedido, fecha, monto in [(1, "2030-01-02", 100.0), (2, "2030-01-10", 50.0), (3, "2030-02-01", 999.0)]:
+                conn.execute("INSERT INTO pedidos (id_pedido, id_habitacion, fecha_pedido, hora_pedido, estado) "
+                             "VALUES (?, 1, ?, '12:00:00', 'Completado')", (id_pedido, fecha))
+                conn.execute("INSERT INTO transacciones (id_pedido, fecha_transaccion, monto_total, metodo_pago) "
+                             "VALUES (?, ?, ?, 'Efectivo')", (id_pedido, fecha, monto))
+
+        reporte = reportes.reporte_general("2030-01-01", "2030-01-10")
+        habitaciones = conn.execute("SELECT COUNT(*) FROM habitacion").fetchone()[0]
+        self.assertEqual(reporte["noches_disponibles"], habitaciones * 10)
+        self.assertEqual(reporte["noches_vendidas"], 3)  # 8, 9 y 10 de enero
+        self.assertAlmostEqual(reporte["ingreso_habitaciones"], 750.0)
+        self.assertAlmostEqual(reporte["adr"], 250.0)
+        self.assertAlmostEqual(reporte["revpar"], round(750.0 / (habitaciones * 10), 2))
+        self.assertEqual(reporte["pedidos_cobrados"], 2)
+        self.assertAlmostEqual(reporte["ticket_promedio"], 75.0)
+        individual = next(t for t in reporte["por_tipo"] if t["tipo"] == "Individual")
+        self.assertEqual(individual["noches_vendidas"], 3)
+
+        with self.assertRaises(ValueError):
+            reportes.reporte_general("2030-01-10", "2030-01-01")
+
+    def test_buscar_habitaciones_disponibles(self):
+        """Solo se listan habitaciones libres del tipo solicitado, con su precio."""
+        # Semilla: H103 (Suite) libre en octubre; H106 (Suite) ocupada 2025-10-05..09
+        libres = Hotel.buscar_habitaciones_disponibles("Suite", "2025-10-06", "2025-10-08")
+        numeros = [h["numero_habitacion"] for h in libres]
+        self.assertIn("H103", numeros)
+        self.assertNotIn("H106", numeros)
+        self.assertTrue(all(h["precio_por_noche"] > 0 for h in libres))
+
+        exito, mensaje = Hotel.crear_reserva(_datos_reserva("H103", "2025-10-07", "2025-10-09"))
+        self.assertTrue(exito, mensaje)
+        libres = Hotel.buscar_habitaciones_disponibles("Suite", "2025-10-06", "2025-10-08")
+        self.assertNotIn("H103", [h["numero_habitacion"] for h in libres])
+
+        self.assertEqual(Hotel.buscar_habitaciones_disponibles("Suite", "2025-10-08", "2025-10-06"), [])
+
+    def test_catalogo_habitaciones(self):
+        """Tipos y precios salen de memoria y se recargan tras insert_habitacion o escrituras externas."""
+        self.assertEqual(Hotel.obtener_tipos_habitacion(), ["Doble", "Individual", "Suite"])
+        self.assertEqual(Hotel.obtener_rango_precios("Suite"), (600.0, 640.0))
+        self.assertEqual(Hotel.obtener_precio_por_tipo("Suite"), 600.0)
+        self.assertIsNone(Hotel.obtener_precio_por_tipo("Penthouse"))
+
+        # Las cotizaciones repetidas no vuelven a leer la tabla
+        consultas = []
+        conn = hotel_db.get_connection()
+        conn.set_trace_callback(consultas.append)
+        try:
+            for _ in range(20):
+                Hotel.obtener_precio_por_tipo("Doble")
+        finally:
+            conn.set_trace_callback(None)
+        self.assertFalse([c for c in consultas if "habitacion" in c])
+
+        hotel_db.insert_habitacion("Suite", 900.0, "Disponible", numero_habitacion="H116")
+        self.assertEqual(Hotel.obtener_rango_precios("Suite"), (600.0, 900.0))
+
+        otra = sqlite3.connect(self.test_db_path)
+        try:
+            with otra:
+                otra.execute("INSERT INTO habitacion (numero_habitacion, tipo, precio_por_noche, estado) "
+                             "VALUES ('H117', 'Penthouse', 1500.0, 'Disponible');")
+        finally:
+            otra.close()
+        self.assertIn("Penthouse", Hotel.obtener_tipos_habitacion())
+        self.assertEqual(Hotel.obtener_catalogo_habitaciones().habitacion("H117")["precio_por_noche"], 1500.0)
+
+    def test_servicio_http(self):
+        """El servicio local expone login, disponibilidad, reservas, menú, inventario y pedidos en JSON."""
+        ruta_datos = datos.DB_PATH
+        hotel_db.DB_PATH = self._db_path_original
+        servidor = servicio.ServidorHTTP(("127.0.0.1", 0), servicio.ServicioHotel(self.test_db_path), hilos=4)
+        # Reservas, login y restaurante quedan sobre la misma BD
+        self.assertEqual((hotel_db.DB_PATH, datos.DB_PATH), (self.test_db_path, self.test_db_path))
+        hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+        hilo.start()
+        base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+        def llamar(ruta, cuerpo=None):
+            datos_json = None if cuerpo is None else json.dumps(cuerpo).encode("utf-8")
+            solicitud = urllib.request.Request(base + ruta, data=datos_json,
+                                               headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(solicitud, timeout=10) as r:
+                    return r.status, json.loads(r.read())
+            except urllib.error.HTTPError as e:
+                return e.code, json.loads(e.read())
+
+        try:
+            codigo, respuesta = llamar("/login", {"usuario": "admin", "contrasena": "admin123"})
+            self.assertEqual(codigo, 200)
+            self.assertEqual(respuesta["usuario"]["tipo_usuario"], "Administrador")
+            self.assertNotIn("contrasena", respuesta["usuario"])
+            self.assertEqual(llamar("/login", {"usuario": "admin", "contrasena": "x"})[0], 401)
+
+            codigo, respuesta = llamar("/habitaciones/disponibles?tipo=Suite"
+                                       "&fecha_ingreso=2025-12-01&fecha_salida=2025-12-05")
+            self.assertEqual(codigo, 200)
+            self.assertIn("H115", [h["numero_habitacion"] for h in respuesta["habitaciones"]])
+
+            # Varias terminales a la vez: el escritor de reservas solo acepta una
+            resultados = []
+            def terminal(n):
+                resultados.append(llamar("/reservas", _datos_reserva(
+                    "H115", "2025-12-01", "2025-12-05", dpi=f"{4000000000000 + n}")))
+            hilos = [threading.Thread(target=terminal, args=(n,)) for n in range(6)]
+            for h in hilos:
+                h.start()
+            for h in hilos:
+                h.join()
+            self.assertEqual(sorted(c for c, _ in resultados), [201] + [422] * 5)
+
+            # Faltan datos del huésped o vienen con tipo incorrecto: 400, no error interno
+            incompleta = _datos_reserva("H114", "2025-12-01", "2025-12-05")
+            del incompleta["primer_apellido"]
+            self.assertEqual(llamar("/reservas", incompleta)[0], 400)
+            self.assertEqual(llamar("/reservas", dict(incompleta, primer_apellido="Pérez", dpi=None))[0], 400)
+
+            codigo, respuesta = llamar("/menu")
+            self.assertEqual(codigo, 200)
+            id_plato = respuesta["menu"][0]["id_plato"]
+            self.assertEqual(llamar("/inventario")[0], 200)
+
+            codigo, resumen = llamar("/pedidos", {"id_habitacion": 1, "metodo_pago": "Efectivo",
+                                                  "items": [{"id_plato": id_plato, "cantidad": 2}]})
+            self.assertEqual(codigo, 201, resumen)
+            self.assertGreater(resumen["total"], 0)
+            self.assertEqual(llamar("/pedidos", {"id_habitacion": 1, "items": [{"id_plato": 999999, "cantidad": 1}]})[0], 422)
+            self.assertEqual(llamar("/pedidos", {"id_habitacion": 1, "items": []})[0], 400)
+            # Cantidades no enteras o booleanas y método de pago que no es texto: 400
+            for item, metodo in (({"id_plato": id_plato, "cantidad": 2.7}, None),
+                                 ({"id_plato": id_plato, "cantidad": True}, None),
+                                 ({"id_plato": id_plato, "cantidad": "2"}, None),
+                                 ({"id_plato": id_plato, "cantidad": 1}, 5)):
+                self.assertEqual(llamar("/pedidos", {"id_habitacion": 1, "items": [item],
+                                                     "metodo_pago": metodo})[0], 400, (item, metodo))
+            self.assertEqual(llamar("/no-existe")[0], 404)
+
+            # Content-Length no numérico o negativo: 400 en lugar de cortar la conexión
+            for largo in ("abc", "-5"):
+                with socket.create_connection(servidor.server_address[:2], timeout=10) as s:
+                    s.sendall(f"POST /login HTTP/1.0\r\nContent-Length: {largo}\r\n\r\n".encode("ascii"))
+                    respuesta = s.makefile("rb").readline()
+                self.assertIn(b" 400 ", respuesta)
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+            datos.DB_PATH = ruta_datos
+
+    def test_crear_reservas_lote(self):
+        """El lote reporta por fila, detecta conflictos internos y acepta CSV en streaming."""
+        ruta_csv = "test_hotel_lote.csv"
+        with open(ruta_csv, "w", encoding="utf-8") as f:
+            f.write("numero_habitacion,fecha_ingreso,fecha_salida,dpi,primer_nombre,primer_apellido,nit\n")
+            f.write("H103,2026-01-10,2026-01-12,2000000000001,Ana,López,\n")
+            f.write("H103,2026-01-11,2026-01-13,2000000000002,Luis,Ruiz,\n")     # choca con la fila 1
+            f.write("H999,2026-01-10,2026-01-12,2000000000003,Eva,Mora,\n")     # habitación inexistente
+            f.write("H106,2026-01-12,2026-01-10,2000000000004,Juan,Paz,\n")     # fechas inválidas
+            f.write("H106,2026-01-10,2026-01-12,2000000000001,Ana,López,\n")
+        try:
+            reporte = Hotel.crear_reservas_lote(Hotel.leer_filas_reserva(ruta_csv), tamano_lote=2)
+        finally:
+            os.remove(ruta_csv)
+
+        self.assertEqual([r["fila"] for r in reporte], [1, 2, 3, 4, 5])
+        self.assertEqual([r["exito"] for r in reporte], [True, False, False, False, True])
+        self.assertEqual(reporte[1]["mensaje"], "Habitación no disponible")
+        self.assertEqual(reporte[3]["mensaje"], "Fechas inválidas")
+
+        # El huésped repetido se registró una sola vez y las reservas quedaron visibles
+        conn = hotel_db.get_connection()
+        self.assertEqual(conn.execute(
+            "SELECT COUNT(*) FROM huesped WHERE dpi = '2000000000001'").fetchone()[0], 1)
+        self.assertEqual(conn.execute(
+            "SELECT COUNT(*) FROM reserva WHERE dpi_huesped = '2000000000001'").fetchone()[0], 2)
+        self.assertEqual(conn.execute("SELECT numero_habitacion FROM reserva WHERE id_reserva = ?",
+                                      (reporte[4]["id_reserva"],)).fetchone()[0], "H106")
+        self.assertFalse(Hotel.obtener_indice_disponibilidad().disponible(3, "2026-01-11", "2026-01-12"))
+
+    def test_lote_aisla_conflicto_de_noches(self):
+        """Un choque que solo detecta room_night se reporta como habitación no disponible."""
+        conn = hotel_db.get_connection()
+        indice = Hotel.obtener_indice_disponibilidad()
+        id_reserva = hotel_db.insert_reserva(conn, 1, "1000000000101", 4, "H104", "Confirmada",
+                                             "2026-02-01", "2026-02-03", 500.0)
+        indice.disponible(4, "2026-02-02", "2026-02-04")
+        indice.quitar(id_reserva)  # índice desactualizado: solo room_night detecta el choque
+        self.assertTrue(indice.disponible(4, "2026-02-02", "2026-02-04"))
+
+        reporte = Hotel.crear_reservas_lote([
+            {"numero_habitacion": "H104", "fecha_ingreso": "2026-02-02", "fecha_salida": "2026-02-04",
+             "dpi": "2000000000011", "primer_nombre": "Ana", "primer_apellido": "López"},
+        ])
+        self.assertEqual((reporte[0]["exito"], reporte[0]["mensaje"]), (False, "Habitación no disponible"))
+
+    def test_indice_coincide_con_sql(self):
+        """El índice en memoria responde igual que la consulta SQL, incluso tras escrituras externas."""
+        indice = Hotel.obtener_indice_disponibilidad()
+        self.assertTrue(indice.disponible(15, "2025-12-01", "2025-12-05"))
+
+        # Escritura desde otra conexión (p. ej. otro proceso)
+        conn = sqlite3.connect(self.test_db_path)
+        hotel_db.insert_reserva(conn, 1, "1000000000101", 15, "H115", "Activa",
+                                "2025-12-02", "2025-12-03", 640.0)
+        conn.close()
+
+        conn = hotel_db.get_connection()
+        for rango in [("2025-12-01", "2025-12-02"), ("2025-12-01", "2025-12-05"),
+                      ("2025-12-03", "2025-12-04"), ("2025-10-10", "2025-10-13")]:
+            self.assertEqual(indice.disponible(15, *rango),
+                             hotel_db.validar_disponibilidad(conn, 15, *rango), rango)
+
+
+if __name__ == "__main__":
+    unittest.main()
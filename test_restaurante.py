@@ -7,7 +7,15 @@ sin necesidad de GUI.
 
 import unittest
 import os
-from restaurante_db import RestauranteDB
+import sqlite3
+import threading
+from datetime import date, timedelta
+from cola_pedidos import ColaPedidos
+import folio
+import hotel_db
+import restaurante_db
+from tabla_gui import EnlaceTreeview
+from restaurante_db import RestauranteDB, estadisticas_conexiones, reconstruir_ventas_diarias
 from restaurante_logica import RestauranteLogica, ItemPedido
 
 
@@ -71,6 +79,458 @@ class TestRestauranteModulo(unittest.TestCase):
         # Debe haber advertencias de bajo stock
         self.assertTrue(len(resumen["advertencias"]) > 0, "Debería haber advertencias de bajo stock")
 
+    def test_pedido_fallido_se_revierte_completo(self):
+        """Un ítem inválido a mitad del pedido no deja pedido, detalles ni consumo de inventario."""
+        menu = self.logica.listar_menu_por_tipo()
+        plato_guacamole = next(p for p in menu if "Guacamole" in p["nombre_plato"])
+        inventario_antes = self.logica.listar_inventario()
+
+        items = [ItemPedido(id_plato=plato_guacamole["id_plato"], cantidad=3),
+                 ItemPedido(id_plato=9999, cantidad=1)]
+        with self.assertRaises(ValueError):
+            self.logica.procesar_pedido(id_habitacion=103, items=items, metodo_pago="Efectivo")
+
+        self.assertEqual(self.logica.listar_inventario(), inventario_antes)
+        with self.db as db:
+            for tabla in ("pedidos", "detalle_pedidos", "transacciones"):
+                total = db.conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+                self.assertEqual(total, 0, f"'{tabla}' debería quedar vacía")
+
+    def _id_agua_de_jamaica(self) -> int:
+        menu = self.logica.listar_menu_por_tipo()
+        return next(p["id_plato"] for p in menu if p["nombre_plato"] == "Agua de Jamaica")
+
+    def test_with_anidado_reutiliza_conexion(self):
+        """Los 'with' anidados no reconectan y el externo cierra la conexión."""
+        abiertas_antes = estadisticas_conexiones()["abiertas"]
+        with self.db as externo:
+            conn = externo.conn
+            with self.db as interno:
+                self.assertIs(interno.conn, conn)
+            self.assertIs(self.db.conn, conn)
+            self.assertEqual(estadisticas_conexiones()["abiertas"], abiertas_antes + 1)
+        self.assertIsNone(self.db.conn)
+        self.assertEqual(estadisticas_conexiones()["abiertas"], abiertas_antes)
+
+    def test_conexiones_estables_en_10k_pedidos(self):
+        """Prueba de resistencia: 10k pedidos con conexión persistente no abren conexiones nuevas."""
+        id_agua = self._id_agua_de_jamaica()
+        db = RestauranteDB(self.test_db_path, persistente=True)
+        logica = RestauranteLogica(db)
+        try:
+            logica.procesar_pedido(id_habitacion=101, items=[ItemPedido(id_agua, 1)])
+            inicial = estadisticas_conexiones()
+            for _ in range(10_000):
+                logica.procesar_pedido(id_habitacion=101, items=[ItemPedido(id_agua, 1)])
+            final = estadisticas_conexiones()
+            self.assertEqual(final["aperturas"], inicial["aperturas"])
+            self.assertEqual(final["abiertas"], inicial["abiertas"])
+        finally:
+            db.close()
+        self.assertEqual(estadisticas_conexiones()["abiertas"], inicial["abiertas"] - 1)
+
+    def test_catalogo_menu_cacheado_e_invalidado(self):
+        """El menú se lee una vez; se recarga ante cambios propios y de otras conexiones."""
+        db = RestauranteDB(self.test_db_path, persistente=True)
+        logica = RestauranteLogica(db)
+        lecturas = []
+        get_menu_original = db.get_menu
+        db.get_menu = lambda tipo=None: lecturas.append(tipo) or get_menu_original(tipo)
+        try:
+            id_agua = self._id_agua_de_jamaica()
+            items = [ItemPedido(id_agua, 2)]
+            precio = next(p["precio"] for p in logica.listar_menu_por_tipo() if p["id_plato"] == id_agua)
+            self.assertAlmostEqual(logica.calcular_subtotal(items), precio * 2, places=2)
+            logica.listar_menu_por_tipo("Bebida")
+            logica.calcular_subtotal(items)
+            self.assertEqual(len(lecturas), 1, "El catálogo no debería releer el menú")
+
+            # Cambio propio (update_plato)
+            with db:
+                plato = db.get_plato_por_id(id_agua)
+                db.update_plato(id_agua, plato["nombre_plato"], plato["descripcion"], 20.0, plato["tipo"])
+            self.assertAlmostEqual(logica.calcular_subtotal(items), 40.0, places=2)
+            self.assertEqual(len(lecturas), 2)
+
+            # Cambio desde otra conexión (otro proceso)
+            otra = sqlite3.connect(self.test_db_path)
+            with otra:
+                otra.execute("UPDATE menu SET precio = 25.0 WHERE id_plato = ?", (id_agua,))
+            otra.close()
+            self.assertAlmostEqual(logica.calcular_subtotal(items), 50.0, places=2)
+            self.assertEqual(len(lecturas), 3)
+        finally:
+            db.close()
+
+    def test_pedido_descuenta_inventario_por_ingrediente(self):
+        """Un pedido de 20 platos descuenta la demanda sumada con un UPDATE por ingrediente."""
+        db = RestauranteDB(self.test_db_path, persistente=True)
+        logica = RestauranteLogica(db)
+        try:
+            menu = {p["nombre_plato"]: p["id_plato"] for p in logica.listar_menu_por_tipo()}
+            items = [ItemPedido(menu["Tacos al Pastor"], 1) for _ in range(10)] + \
+                    [ItemPedido(menu["Enchiladas Suizas"], 1) for _ in range(10)]
+            antes = {i["nombre_ingrediente"]: i["cantidad"] for i in logica.listar_inventario()}
+
+            sentencias = []
+            with db:
+                db.conn.set_trace_callback(sentencias.append)
+            logica.procesar_pedido(id_habitacion=104, items=items, metodo_pago="Efectivo")
+            with db:
+                db.conn.set_trace_callback(None)
+
+            despues = {i["nombre_ingrediente"]: i["cantidad"] for i in logica.listar_inventario()}
+            self.assertAlmostEqual(antes["Carne de Cerdo"] - despues["Carne de Cerdo"], 2.0)
+            self.assertAlmostEqual(antes["Pollo"] - despues["Pollo"], 2.5)
+            self.assertAlmostEqual(antes["Maíz"] - despues["Maíz"], 2.0)
+            self.assertAlmostEqual(antes["Cilantro"] - despues["Cilantro"], 0.8)
+            self.assertEqual(antes["Piña"] - despues["Piña"], 1)  # 10 x 0.10 unidades
+            # El trace repite la sentencia al entrar a los triggers de alerta_stock
+            updates = {q for q in sentencias if q.startswith("UPDATE inventario")}
+            self.assertEqual(len(updates), 5)  # Cerdo, Piña, Cilantro, Pollo, Maíz
+        finally:
+            db.close()
+
+    def test_plato_nuevo_con_receta_persistida(self):
+        """Un plato agregado con su receta descuenta inventario sin cambios de código."""
+        with self.db as db:
+            id_plato = db.add_plato("Tostadas de Pollo", "Tostadas con pollo y aguacate.", 9.0, "Entrada")
+            pollo = db.get_ingrediente_por_nombre("Pollo")
+            aguacate = db.get_ingrediente_por_nombre("Aguacate")
+            db.set_receta(id_plato, {pollo["id_ingrediente"]: 0.5, aguacate["id_ingrediente"]: 1.0})
+
+        self.logica.procesar_pedido(id_habitacion=105, items=[ItemPedido(id_plato, 2)])
+        with self.db as db:
+            self.assertAlmostEqual(db.get_ingrediente_por_nombre("Pollo")["cantidad"], pollo["cantidad"] - 1.0)
+            self.assertEqual(db.get_ingrediente_por_nombre("Aguacate")["cantidad"], aguacate["cantidad"] - 2)
+
+    def test_stock_insuficiente_revierte_pedido(self):
+        """Si un ingrediente no alcanza, no se descuenta nada ni queda el pedido."""
+        menu = {p["nombre_plato"]: p["id_plato"] for p in self.logica.listar_menu_por_tipo()}
+        antes = self.logica.listar_inventario()
+        items = [ItemPedido(menu["Tacos al Pastor"], 1), ItemPedido(menu["Guacamole con Totopos"], 500)]
+        with self.assertRaises(RuntimeError):
+            self.logica.procesar_pedido(id_habitacion=106, items=items)
+        self.assertEqual(self.logica.listar_inventario(), antes)
+        with self.db as db:
+            self.assertEqual(db.conn.execute("SELECT COUNT(*) FROM pedidos").fetchone()[0], 0)
+
+    def test_inventario_cantidad_real_tras_migracion(self):
+        with self.db as db:
+            columnas = {c["name"]: c["type"] for c in db.conn.execute("PRAGMA table_info(inventario)")}
+        self.assertEqual(columnas["cantidad"], "REAL")
+        self.assertEqual(columnas["stock_minimo"], "REAL")
+
+    def test_descuento_sin_stock_suficiente(self):
+        with self.db as db:
+            with self.assertRaises(RuntimeError):
+                db.update_inventario_cantidad("Pollo", -20.001)
+            with self.assertRaises(RuntimeError):
+                db.update_inventario_cantidad("Inexistente", -1)
+            db.update_inventario_cantidad("Pollo", -20)
+            self.assertEqual(db.get_ingrediente_por_nombre("Pollo")["cantidad"], 0)
+
+    def test_descontar_inventario_sin_culpable_dentro_de_transaccion(self):
+        """Si el UPDATE no descuenta todo pero al releer nada falta, se revierte solo el descuento."""
+        with self.db as db:
+            pollo = db.get_ingrediente_por_nombre("Pollo")
+            maiz = db.get_ingrediente_por_nombre("Maíz")
+            # El trigger ignora el UPDATE del maíz: rowcount no cuenta esa fila y el stock sí alcanza
+            db.conn.execute(f"""
+                CREATE TEMP TRIGGER ignora_maiz BEFORE UPDATE ON inventario
+                WHEN OLD.id_ingrediente = {maiz['id_ingrediente']}
+                BEGIN SELECT RAISE(IGNORE); END;""")
+            with db.transaccion():
+                db.update_inventario_cantidad("Pollo", -1)
+                with self.assertRaisesRegex(RuntimeError, "existencias cambiaron"):
+                    db.descontar_inventario({pollo["id_ingrediente"]: 2, maiz["id_ingrediente"]: 1})
+                self.assertTrue(db.conn.in_transaction)
+            db.conn.execute("DROP TRIGGER temp.ignora_maiz;")
+            # Lo hecho antes en la transacción se confirmó; el descuento fallido no
+            self.assertEqual(db.get_ingrediente_por_nombre("Pollo")["cantidad"], pollo["cantidad"] - 1)
+            self.assertEqual(db.get_ingrediente_por_nombre("Maíz")["cantidad"], maiz["cantidad"])
+
+    def test_descuentos_concurrentes_exactos(self):
+        """Terminales con su propia conexión descuentan fracciones sin perder ninguna."""
+        errores = []
+
+        def terminal():
+            try:
+                with RestauranteDB(self.test_db_path) as db:
+                    for _ in range(50):
+                        db.update_inventario_cantidad("Pollo", -0.1)
+            except Exception as e:
+                errores.append(e)
+
+        hilos = [threading.Thread(target=terminal) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+        with self.db as db:
+            self.assertEqual(db.get_ingrediente_por_nombre("Pollo")["cantidad"], 0.0)
+            with self.assertRaises(RuntimeError):
+                db.update_inventario_cantidad("Pollo", -0.001)
+
+    def test_alertas_bajo_stock_una_vez_por_cruce(self):
+        """Cada mínimo cruzado se informa una sola vez, aunque el pedido siga consumiendo."""
+        menu = {p["nombre_plato"]: p["id_plato"] for p in self.logica.listar_menu_por_tipo()}
+        guacamole = menu["Guacamole con Totopos"]
+        marca = self.logica.marca_alertas_stock()
+
+        resumen = self.logica.procesar_pedido(id_habitacion=107, items=[ItemPedido(guacamole, 41)])
+        self.assertEqual(len(resumen["advertencias"]), 1)
+        self.assertIn("Aguacate", resumen["advertencias"][0])
+        resumen = self.logica.procesar_pedido(id_habitacion=107, items=[ItemPedido(guacamole, 2)])
+        self.assertEqual(resumen["advertencias"], [])
+
+        mensajes, marca = self.logica.alertas_stock_desde(marca)
+        self.assertEqual(len(mensajes), 1)
+        self.assertEqual(self.logica.alertas_stock_desde(marca), ([], marca))
+
+        # Reponer y volver a cruzar genera una alerta nueva
+        with self.db as db:
+            db.update_inventario_cantidad("Aguacate", 20)
+            db.update_inventario_cantidad("Aguacate", -20)
+        mensajes, _ = self.logica.alertas_stock_desde(marca)
+        self.assertEqual(len(mensajes), 1)
+
+    def test_bajo_stock_usa_indice_parcial(self):
+        with self.db as db:
+            plan = " ".join(row[-1] for row in db.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM inventario WHERE cantidad < stock_minimo ORDER BY nombre_ingrediente;"))
+        self.assertIn("idx_inventario_bajo_stock", plan)
+
+    def test_cola_pedidos_agrupa_y_aisla_fallos(self):
+        """Pedidos de varios meseros se confirman por lotes; uno inválido no afecta al resto."""
+        menu = {p["nombre_plato"]: p["id_plato"] for p in self.logica.listar_menu_por_tipo()}
+        items = [ItemPedido(menu["Tacos al Pastor"], 1)]
+        futuros = []
+        db = RestauranteDB(self.test_db_path, persistente=True)
+        try:
+            with ColaPedidos(RestauranteLogica(db), tam_lote=16, espera_max=0.05) as cola:
+                def mesero():
+                    futuros.extend(cola.enviar(108, items, "Efectivo") for _ in range(10))
+
+                hilos = [threading.Thread(target=mesero) for _ in range(4)]
+                for hilo in hilos:
+                    hilo.start()
+                invalido = cola.enviar(108, [ItemPedido(9999, 1)])
+                for hilo in hilos:
+                    hilo.join()
+            self.assertLess(cola.lotes, 40)
+        finally:
+            db.close()
+
+        ids = [f.result()["id_pedido"] for f in futuros]
+        self.assertEqual(len(set(ids)), 40)
+        with self.assertRaises(ValueError):
+            invalido.result()
+        with self.db as db:
+            self.assertEqual(db.conn.execute("SELECT COUNT(*) FROM pedidos").fetchone()[0], 40)
+            self.assertEqual(db.conn.execute("SELECT COUNT(*) FROM transacciones").fetchone()[0], 40)
+        with self.assertRaises(RuntimeError):
+            cola.enviar(108, items)
+
+    def test_historial_pedidos_paginado(self):
+        """Páginas por clave sin huecos ni repetidos, con detalles y transacción en una consulta."""
+        menu = {p["nombre_plato"]: p["id_plato"] for p in self.logica.listar_menu_por_tipo()}
+        items = [ItemPedido(menu["Tacos al Pastor"], 1), ItemPedido(menu["Agua de Jamaica"], 2)]
+        for i in range(12):
+            self.logica.procesar_pedido(id_habitacion=201 + i % 3, items=items, metodo_pago="Tarjeta")
+        with self.db as db:
+            db.conn.execute("UPDATE pedidos SET fecha_pedido = '2025-01-0' || (1 + id_pedido % 3);")
+            db.conn.commit()
+
+        vistos, cursor, paginas = [], None, 0
+        sentencias = []
+        with self.db as db:
+            db.conn.set_trace_callback(sentencias.append)
+            while True:
+                pagina, cursor = self.logica.listar_historial_pedidos("2025-01-01", "2025-01-31",
+                                                                      cursor=cursor, tam_pagina=5)
+                vistos.extend(pagina)
+                paginas += 1
+                if cursor is None:
+                    break
+            db.conn.set_trace_callback(None)
+        self.assertEqual(paginas, 3)
+        self.assertEqual(len(sentencias), 3)  # una consulta por página
+        claves = [(p["fecha_pedido"], p["id_pedido"]) for p in vistos]
+        self.assertEqual(claves, sorted(claves, reverse=True))
+        self.assertEqual(len(set(claves)), 12)
+        self.assertEqual([d["nombre_plato"] for d in vistos[0]["detalles"]], ["Tacos al Pastor", "Agua de Jamaica"])
+        self.assertEqual(vistos[0]["transaccion"]["metodo_pago"], "Tarjeta")
+
+        pagina, cursor = self.logica.listar_historial_pedidos("2025-01-03", "2025-01-03", id_habitacion=202)
+        self.assertIsNone(cursor)
+        self.assertEqual(len(pagina), 4)
+        self.assertTrue(all(p["id_habitacion"] == 202 and p["fecha_pedido"] == "2025-01-03" for p in pagina))
+        self.assertEqual(self.logica.listar_historial_pedidos("2025-01-01", "2025-01-31", estado="Pendiente"),
+                         ([], None))
+
+    def test_ventas_diarias_coinciden_con_detalle(self):
+        """El resumen mantenido por triggers coincide con las líneas de venta y con su reconstrucción."""
+        menu = {p["nombre_plato"]: p["id_plato"] for p in self.logica.listar_menu_por_tipo()}
+        self.logica.procesar_pedido(301, [ItemPedido(menu["Tacos al Pastor"], 2)], "Efectivo")
+        self.logica.procesar_pedido(302, [ItemPedido(menu["Tacos al Pastor"], 1),
+                                          ItemPedido(menu["Agua de Jamaica"], 3)], "Tarjeta")
+        self.logica.procesar_pedido(303, [ItemPedido(menu["Agua de Jamaica"], 1)])
+        hoy = self.logica._fecha_actual()
+
+        cierre = self.logica.cierre_del_dia(hoy)
+        with self.db as db:
+            total, transacciones = db.conn.execute(
+                "SELECT ROUND(SUM(monto_total), 2), COUNT(*) FROM transacciones").fetchone()
+            unidades = dict(db.conn.execute(
+                "SELECT id_plato, SUM(cantidad) FROM detalle_pedidos GROUP BY id_plato").fetchall())
+        self.assertEqual(cierre["transacciones"], transacciones)
+        self.assertAlmostEqual(cierre["total_cobrado"], total, places=2)
+        self.assertEqual(set(cierre["por_metodo_pago"]), {"Efectivo", "Tarjeta", None})
+        self.assertEqual({p["id_plato"]: p["unidades"] for p in cierre["platos"]}, unidades)
+        self.assertEqual(cierre["platos"][0]["nombre_plato"], "Agua de Jamaica")  # 4 unidades
+
+        with self.db as db:
+            antes = db.conn.execute("SELECT * FROM ventas_diarias ORDER BY 1, 2, 3").fetchall()
+            reconstruir_ventas_diarias(db.conn)
+            despues = db.conn.execute("SELECT * FROM ventas_diarias ORDER BY 1, 2, 3").fetchall()
+        self.assertEqual([tuple(r) for r in antes], [tuple(r) for r in despues])
+
+        # Segundo cobro de un pedido y líneas corregidas, eliminadas y agregadas
+        with self.db as db:
+            id_pedido, id_linea = db.conn.execute(
+                "SELECT id_pedido, MIN(id_detalle_pedido) FROM detalle_pedidos GROUP BY id_pedido "
+                "HAVING COUNT(*) = 2").fetchone()
+            with db.transaccion():
+                db.conn.execute(
+                    "INSERT INTO transacciones (id_pedido, fecha_transaccion, monto_total, metodo_pago) "
+                    "VALUES (?, ?, 5, 'Efectivo');", (id_pedido, hoy))
+                db.conn.execute("UPDATE detalle_pedidos SET cantidad = 4 WHERE id_detalle_pedido = ?;", (id_linea,))
+                db.conn.execute("DELETE FROM detalle_pedidos WHERE id_pedido = ? AND id_detalle_pedido <> ?;",
+                                (id_pedido, id_linea))
+                db.conn.execute(
+                    "INSERT INTO detalle_pedidos (id_pedido, id_plato, cantidad, precio_unitario) "
+                    "VALUES (?, ?, 1, 10);", (id_pedido, menu["Agua de Jamaica"]))
+            antes = db.conn.execute("SELECT * FROM ventas_diarias ORDER BY 1, 2, 3").fetchall()
+            unidades = dict(db.conn.execute(
+                "SELECT id_plato, SUM(cantidad) FROM detalle_pedidos GROUP BY id_plato").fetchall())
+            reconstruir_ventas_diarias(db.conn)
+            despues = db.conn.execute("SELECT * FROM ventas_diarias ORDER BY 1, 2, 3").fetchall()
+        self.assertEqual([tuple(r) for r in antes], [tuple(r) for r in despues])
+        por_plato = {}
+        for r in antes:
+            por_plato[r["id_plato"]] = por_plato.get(r["id_plato"], 0) + r["unidades"]
+        self.assertEqual(por_plato, unidades)  # el segundo cobro no duplica las líneas
+
+    def test_folio_de_reserva_con_consumos(self):
+        """Los pedidos se vinculan a la estadía en curso y aparecen en su folio."""
+        hoy = date.today()
+        ingreso, salida = (hoy - timedelta(days=1)).isoformat(), (hoy + timedelta(days=2)).isoformat()
+        menu = {p["nombre_plato"]: p for p in self.logica.listar_menu_por_tipo()}
+        tacos = menu["Tacos al Pastor"]
+        with self.db as db:
+            id_habitacion, numero, _ = hotel_db.buscar_habitaciones_disponibles(db.conn, None, ingreso, salida)[0]
+            libre = hotel_db.buscar_habitaciones_disponibles(db.conn, None, ingreso, salida)[1][0]
+            id_reserva = hotel_db.insert_reserva(db.conn, 1, "1000000000101", id_habitacion, numero,
+                                                 "Confirmada", ingreso, salida, 900.0)
+
+        cargado = self.logica.procesar_pedido(id_habitacion, [ItemPedido(tacos["id_plato"], 2)], "Cargo a habitación")
+        pagado = self.logica.procesar_pedido(id_habitacion, [ItemPedido(tacos["id_plato"], 1)], "Efectivo")
+        self.assertEqual(cargado["id_reserva"], id_reserva)
+        with self.assertRaises(ValueError):
+            self.logica.procesar_pedido(libre, [ItemPedido(tacos["id_plato"], 1)], "Cargo a habitación")
+        self.assertIsNone(self.logica.procesar_pedido(libre, [ItemPedido(tacos["id_plato"], 1)], "Efectivo")["id_reserva"])
+
+        with self.db as db:
+            # Un segundo cobro del mismo pedido no lo repite en el folio
+            with db.transaccion():
+                db.conn.execute(
+                    "INSERT INTO transacciones (id_pedido, fecha_transaccion, monto_total, metodo_pago) "
+                    "VALUES (?, ?, 1, 'Efectivo');", (pagado["id_pedido"], hoy.isoformat()))
+            f = folio.obtener_folio(id_reserva, db.conn)
+            plan = " ".join(r[-1] for r in db.conn.execute("EXPLAIN QUERY PLAN " + folio.SQL_FOLIO, (id_reserva,)))
+        self.assertEqual(f["noches"], 3)
+        self.assertEqual([c["id_pedido"] for c in f["consumos"]], [cargado["id_pedido"], pagado["id_pedido"]])
+        self.assertAlmostEqual(f["subtotal_restaurante"], 3 * tacos["precio"], places=2)
+        self.assertAlmostEqual(f["cargo_servicio"], cargado["cargo_servicio"] + pagado["cargo_servicio"], places=2)
+        self.assertAlmostEqual(f["total"], 900.0 + cargado["total"] + pagado["total"], places=2)
+        self.assertAlmostEqual(f["saldo_pendiente"], 900.0 + cargado["total"], places=2)
+        self.assertIn("idx_pedidos_reserva", plan)
+        self.assertNotIn("SCAN", plan)
+
+    def test_vincular_pedidos_anteriores_por_numero(self):
+        """Los pedidos anteriores guardaban el número tecleado: se vinculan por numero_habitacion."""
+        with self.db as db:
+            id_h101 = db.conn.execute(
+                "SELECT id_habitacion FROM habitacion WHERE numero_habitacion = 'H101'").fetchone()[0]
+            id_reserva = hotel_db.insert_reserva(db.conn, 1, "1000000000101", id_h101, "H101",
+                                                 "Confirmada", "2030-03-01", "2030-03-04", 900.0)
+            with db.transaccion():
+                db.conn.executemany(
+                    "INSERT INTO pedidos (id_habitacion, fecha_pedido, hora_pedido, estado) "
+                    "VALUES (?, '2030-03-02', '12:00:00', 'Completado');", [(101,), (999,), (id_h101,)])
+                restaurante_db._vincular_pedidos_existentes(db.conn)
+            vinculos = db.conn.execute(
+                "SELECT id_habitacion, id_reserva FROM pedidos WHERE fecha_pedido = '2030-03-02' "
+                "ORDER BY id_pedido").fetchall()
+        # El id de 'H101' tecleado como número no es la habitación 'H101'
+        self.assertEqual([tuple(v) for v in vinculos], [(101, id_reserva), (999, None), (id_h101, None)])
+
+    def test_enlace_treeview_aplica_solo_diferencias(self):
+        """El enlace toca solo las filas que cambian y muestra las páginas al desplazarse."""
+        class TreeFalso:
+            def __init__(self):
+                self.filas, self.operaciones = [], []
+
+            def configure(self, **kw):
+                pass
+
+            def insert(self, padre, posicion, iid, values):
+                self.filas.insert(posicion, [iid, values])
+                self.operaciones.append(("insert", iid))
+
+            def item(self, iid, values):
+                next(f for f in self.filas if f[0] == iid)[1] = values
+                self.operaciones.append(("item", iid))
+
+            def move(self, iid, padre, posicion):
+                fila = next(f for f in self.filas if f[0] == iid)
+                self.filas.remove(fila)
+                self.filas.insert(posicion, fila)
+                self.operaciones.append(("move", iid))
+
+            def delete(self, *iids):
+                self.filas = [f for f in self.filas if f[0] not in iids]
+                self.operaciones.extend(("delete", iid) for iid in iids)
+
+            def after_idle(self, funcion):
+                funcion()
+
+        class BarraFalsa:
+            def set(self, primero, ultimo):
+                pass
+
+        tree = TreeFalso()
+        enlace = EnlaceTreeview(tree, clave=lambda r: r[0], valores=lambda r: r[1:], tam_pagina=3,
+                                scrollbar=BarraFalsa())
+        enlace.actualizar([("a", 1), ("b", 2), ("c", 3), ("d", 4)])
+        self.assertEqual([f[0] for f in tree.filas], ["a", "b", "c"])  # primera página
+
+        tree.operaciones.clear()
+        enlace.actualizar([("a", 1), ("b", 20), ("x", 0), ("c", 3), ("d", 4)])
+        self.assertEqual(tree.operaciones, [("delete", "c"), ("item", "b"), ("insert", "x")])
+        self.assertEqual(tree.filas, [["a", (1,)], ["b", (20,)], ["x", (0,)]])
+
+        tree.operaciones.clear()
+        enlace.actualizar([("b", 20), ("a", 1), ("x", 0), ("c", 3), ("d", 4)])
+        self.assertEqual([f[0] for f in tree.filas], ["b", "a", "x"])
+        self.assertNotIn("insert", [op for op, _ in tree.operaciones])
+
+        enlace._al_desplazar("0.5", "1.0")  # llegó al final: siguiente página
+        self.assertEqual([f[0] for f in tree.filas], ["b", "a", "x", "c", "d"])
+        self.assertEqual(enlace.fila("d"), ("d", 4))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,7 @@
+# version_esquema.py
+# Última versión de esquema (PRAGMA user_version) que definen las migraciones.
+# Vive aparte y sin importaciones para que el arranque pueda comprobar si la
+# BD está al día sin cargar migraciones.py ni las capas de datos.
+# Al agregar una migración en migraciones.MIGRACIONES se actualiza este número.
+
+ULTIMA_VERSION = 16